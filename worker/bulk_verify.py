@@ -0,0 +1,249 @@
+"""Bulk bank statement verification (e.g. quarterly re-validation of existing suppliers).
+
+Statements are verified in a process pool of BULK_VERIFY_WORKERS processes. Text extraction,
+OCR and the rule checks run in parallel across files. The LLM calls from every worker share
+the parent's OLLAMA_MAX_PARALLEL slots (ollama_client.shared_llm_slots), so the pool never
+sends Ollama more requests than it can run. Each worker OCRs its pages serially, because the
+pool already parallelizes across files.
+
+Results stream as JSON lines, one per file in completion order. A summary line with
+pass/fail counts and throughput comes last. POST /verify-bank-statements uses this module,
+and so does the command line:
+
+    python bulk_verify.py <dir|file.pdf> [...] [--workers 4] [--account-names names.csv]
+                          [--output results.jsonl] [--no-cache]
+
+names.csv has the columns filename,account_name. Each name is fuzzy-matched against the
+statement's account holder (name_match).
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_bulk_pool: Optional[ProcessPoolExecutor] = None
+_bulk_pool_lock = threading.Lock()
+
+
+# ----------------------------
+# WORKER POOL
+# ----------------------------
+def _bulk_worker_count() -> int:
+    """Configured pool size (BULK_VERIFY_WORKERS); 0 or less means one worker per CPU core."""
+    workers = getattr(settings, "bulk_verify_workers", 2) or 0
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def _init_bulk_worker(llm_slots: Any) -> None:
+    """Pool initializer: share the parent's LLM slots, OCR serially with single-threaded Tesseract."""
+    from ollama_client import use_llm_slots
+    use_llm_slots(llm_slots)
+    settings.ocr_workers = 1
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def create_bulk_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """A new verification pool whose workers share this process's LLM concurrency limit."""
+    from ollama_client import shared_llm_slots
+    return ProcessPoolExecutor(
+        max_workers=workers or _bulk_worker_count(),
+        initializer=_init_bulk_worker,
+        initargs=(shared_llm_slots(),),
+    )
+
+
+def get_bulk_pool() -> ProcessPoolExecutor:
+    """Return the process-wide verification pool, creating it on first use."""
+    global _bulk_pool
+    with _bulk_pool_lock:
+        if _bulk_pool is None:
+            _bulk_pool = create_bulk_pool()
+        return _bulk_pool
+
+
+def shutdown_bulk_pool() -> None:
+    """Stop the process-wide pool (pending verifications are cancelled)."""
+    global _bulk_pool
+    with _bulk_pool_lock:
+        if _bulk_pool is not None:
+            _bulk_pool.shutdown(wait=False, cancel_futures=True)
+        _bulk_pool = None
+
+
+# ----------------------------
+# VERIFICATION
+# ----------------------------
+def verify_file(
+    file_path: str,
+    form_data: Optional[Dict[str, Any]] = None,
+    no_cache: bool = False,
+    filename: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Verify one statement (runs in a pool worker). Errors are reported in the result, not raised."""
+    from bank_statement_verifier import verify_bank_statement
+    from llm_cache import llm_cache_bypassed
+    result: Dict[str, Any] = {"filename": filename or os.path.basename(file_path)}
+    start = time.perf_counter()
+    try:
+        with llm_cache_bypassed(no_cache):
+            verification = verify_bank_statement(file_path, form_data)
+        result.update(
+            passed=verification["passed"],
+            reasons=verification["reasons"],
+            extracted=verification["extracted"],
+            name_match=verification.get("name_match"),
+        )
+    except Exception as e:
+        logger.exception(f"Bulk verification of {result['filename']} failed: {e}")
+        result.update(passed=False, reasons=[f"Verification failed: {e}"], extracted=None, error=str(e))
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    return result
+
+
+def error_result(filename: str, message: str) -> Dict[str, Any]:
+    """Result line for a file that could not be verified at all (not a PDF, worker crashed)."""
+    return {"filename": filename, "passed": False, "reasons": [message], "extracted": None, "error": message, "seconds": 0.0}
+
+
+@dataclass
+class BulkSummary:
+    """Pass/fail counts and throughput of a bulk run."""
+    started: float = field(default_factory=time.perf_counter)
+    files: int = 0
+    passed: int = 0
+    failed: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0
+
+    def add(self, result: Dict[str, Any]) -> None:
+        self.files += 1
+        if result.get("error"):
+            self.errors += 1
+        elif result.get("passed"):
+            self.passed += 1
+        else:
+            self.failed += 1
+        self.busy_seconds += result.get("seconds") or 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "summary": True,
+            "files": self.files,
+            "passed": self.passed,
+            "failed": self.failed,
+            "errors": self.errors,
+            "elapsed_seconds": round(elapsed, 2),
+            "files_per_minute": round(60.0 * self.files / elapsed, 1) if elapsed > 0 else None,
+            "avg_seconds_per_file": round(self.busy_seconds / self.files, 2) if self.files else None,
+        }
+
+
+def to_json_line(result: Dict[str, Any]) -> str:
+    return json.dumps(result, default=str) + "\n"
+
+
+def collect_pdfs(inputs: Iterable[str]) -> List[str]:
+    """PDF paths from files and directories (directories are read one level deep, sorted)."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(
+                os.path.join(item, name) for name in sorted(os.listdir(item))
+                if name.lower().endswith(".pdf") and os.path.isfile(os.path.join(item, name))
+            )
+        else:
+            paths.append(item)
+    return paths
+
+
+def load_account_names(csv_path: str) -> Dict[str, str]:
+    """filename -> expected account holder, from a CSV with filename,account_name columns."""
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        return {
+            os.path.basename(row["filename"].strip()): row["account_name"].strip()
+            for row in csv.DictReader(f)
+            if (row.get("filename") or "").strip() and (row.get("account_name") or "").strip()
+        }
+
+
+def iter_verifications(
+    paths: List[str],
+    account_names: Optional[Dict[str, str]] = None,
+    workers: Optional[int] = None,
+    no_cache: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Verify `paths` in a new pool, yielding each result as it completes, then the summary."""
+    summary = BulkSummary()
+    with create_bulk_pool(workers) as pool:
+        futures = {}
+        for path in paths:
+            filename = os.path.basename(path)
+            if not filename.lower().endswith(".pdf") or not os.path.isfile(path):
+                result = error_result(filename, "Not a PDF file." if os.path.isfile(path) else "File not found.")
+                summary.add(result)
+                yield result
+                continue
+            name = (account_names or {}).get(filename)
+            form_data = {"bankAccountName": name} if name else None
+            futures[pool.submit(verify_file, path, form_data, no_cache)] = filename
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = error_result(futures[future], f"Verification worker failed: {e}")
+            summary.add(result)
+            yield result
+    yield summary.to_dict()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify many bank statements / confirmation letters; prints JSON lines.")
+    parser.add_argument("inputs", nargs="+", help="PDF files and/or directories of PDFs")
+    parser.add_argument("--workers", type=int, default=None, help="verification processes (default: BULK_VERIFY_WORKERS)")
+    parser.add_argument("--account-names", help="CSV with filename,account_name columns")
+    parser.add_argument("--output", help="write JSON lines here instead of stdout")
+    parser.add_argument("--no-cache", action="store_true", help="skip the LLM response cache")
+    args = parser.parse_args()
+
+    paths = collect_pdfs(args.inputs)
+    if not paths:
+        print("No PDF files found.", file=sys.stderr)
+        sys.exit(1)
+    account_names = load_account_names(args.account_names) if args.account_names else None
+    workers = args.workers or _bulk_worker_count()
+    print(f"Verifying {len(paths)} file(s) with {workers} worker(s)...", file=sys.stderr)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for result in iter_verifications(paths, account_names, workers, args.no_cache):
+            out.write(to_json_line(result))
+            out.flush()
+            if result.get("summary"):
+                print(
+                    f"{result['files']} file(s): {result['passed']} passed, {result['failed']} failed, "
+                    f"{result['errors']} error(s) in {result['elapsed_seconds']}s "
+                    f"({result['files_per_minute']} files/min)",
+                    file=sys.stderr,
+                )
+            else:
+                status = "ERROR" if result.get("error") else ("PASS" if result["passed"] else "FAIL")
+                print(f"  {status:5s} {result['filename']} ({result['seconds']}s)", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
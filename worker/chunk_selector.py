@@ -0,0 +1,180 @@
+"""Relevant-chunk selection for LLM prompts (instead of sending the first N characters).
+
+The extracted text is split into chunks (paragraphs, and runs of lines for OCR text
+without blank lines), each chunk is scored with BM25 against the questions asked for the
+document type (taxpayer name, expiry date, account number, ...) plus the form values being
+checked, and the best chunks are kept, in document order, until the token budget is used.
+The first chunk (letterhead and title) is always kept. Text that already fits the budget
+is returned unchanged.
+"""
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from field_extractor import document_type_key
+
+# Rough size of a token for the models we run (English text, llama tokenizers)
+CHARS_PER_TOKEN = 4
+# Target chunk size; paragraphs longer than this are split at line breaks
+_CHUNK_CHARS = 400
+_OMITTED = "[...]"
+
+# BM25 parameters (the usual defaults)
+_K1 = 1.5
+_B = 0.75
+
+# What each document type's prompt asks about: term -> weight
+QUERY_TERMS: Dict[str, Dict[str, float]] = {
+    "cipc": {
+        "cipc": 2.0, "commission": 1.0, "certificate": 1.0, "incorporation": 1.5, "registration": 2.0,
+        "enterprise": 2.0, "name": 1.0, "number": 1.0, "address": 2.0, "registered": 1.5, "office": 1.0,
+        "director": 1.0, "directors": 1.0, "date": 1.0, "type": 0.5, "status": 1.0,
+    },
+    "sars": {
+        "sars": 2.0, "revenue": 1.0, "taxpayer": 2.5, "name": 1.0, "tax": 1.5, "reference": 2.0,
+        "number": 1.0, "purpose": 2.0, "request": 1.0, "good": 1.5, "standing": 1.5, "compliance": 1.5,
+        "clearance": 1.5, "status": 1.0, "pin": 1.5, "valid": 2.0, "expiry": 2.5, "issue": 1.5,
+        "date": 1.5, "address": 1.5,
+    },
+    "bank": {
+        "bank": 1.0, "account": 2.0, "number": 1.0, "holder": 2.0, "name": 1.0, "branch": 2.0,
+        "code": 1.5, "type": 1.0, "cheque": 1.0, "current": 1.0, "savings": 1.0, "confirm": 1.5,
+        "confirmation": 1.5, "statement": 1.5, "date": 1.5, "period": 1.0, "stamp": 1.0,
+        "signature": 1.0, "signed": 1.0,
+    },
+    "bbbee": {
+        "bbbee": 2.0, "bee": 1.5, "level": 2.5, "status": 1.5, "black": 2.0, "ownership": 2.0,
+        "female": 2.0, "women": 1.5, "percentage": 1.0, "valid": 2.0, "expiry": 2.5, "date": 1.5,
+        "issue": 1.0, "sanas": 1.5, "dtic": 1.5, "competition": 1.0, "procurement": 1.0, "recognition": 1.0,
+    },
+}
+# Unknown types: names, numbers and dates are what every prompt looks for
+GENERIC_TERMS: Dict[str, float] = {
+    "name": 1.0, "company": 1.5, "registration": 1.5, "number": 1.0, "date": 1.5, "valid": 1.0,
+    "expiry": 1.0, "address": 1.0, "tax": 1.0, "bank": 1.0, "account": 1.0, "certificate": 1.0,
+}
+# Form fields whose values are looked for in the document
+_FORM_FIELDS = (
+    "companyName", "registrationNumber", "physicalAddress", "bbbeeLevel", "bankName",
+    "branchName", "branchNumber", "accountNumber", "typeOfAccount", "bankAccountName",
+)
+_FORM_TERM_WEIGHT = 1.5
+
+
+@dataclass
+class Chunk:
+    """A piece of the document and its (start, end) offsets in the text."""
+    start: int
+    end: int
+    text: str
+
+
+def tokenize(text: str) -> List[str]:
+    # "B-BBEE" -> "bbbee", "2015/123456/07" stays one token
+    text = re.sub(r"(?<=\w)[-/](?=\w)", "", (text or "").lower())
+    return re.findall(r"[a-z0-9]+", text)
+
+
+def split_chunks(text: str, chunk_chars: int = _CHUNK_CHARS) -> List[Chunk]:
+    """Paragraphs (blank-line separated), with long paragraphs split into runs of lines."""
+    chunks: List[Chunk] = []
+    start = end = None
+    position = 0
+    for line in (text or "").split("\n"):
+        line_start, line_end = position, position + len(line)
+        position = line_end + 1
+        if not line.strip():
+            if start is not None:
+                chunks.append(Chunk(start, end, text[start:end]))
+                start = None
+            continue
+        if start is not None and line_end - start > chunk_chars:
+            chunks.append(Chunk(start, end, text[start:end]))
+            start = None
+        if start is None:
+            start = line_start
+        end = line_end
+    if start is not None:
+        chunks.append(Chunk(start, end, text[start:end]))
+    return chunks
+
+
+def query_terms(document_type: str = "", form_data: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    """Weighted query for a document type, plus the tokens of the form values being checked."""
+    terms = dict(QUERY_TERMS.get(document_type_key(document_type) or "", GENERIC_TERMS))
+    for field in _FORM_FIELDS:
+        for token in tokenize(str((form_data or {}).get(field) or "")):
+            if len(token) > 2 or token.isdigit():
+                terms[token] = max(terms.get(token, 0.0), _FORM_TERM_WEIGHT)
+    return terms
+
+
+def bm25_scores(chunks: List[Chunk], terms: Dict[str, float]) -> List[float]:
+    """BM25 score of each chunk for the weighted query terms."""
+    documents = [Counter(tokenize(chunk.text)) for chunk in chunks]
+    if not documents:
+        return []
+    average_length = sum(sum(d.values()) for d in documents) / len(documents) or 1.0
+    document_frequency = Counter(term for d in documents for term in d if term in terms)
+    scores = []
+    for d in documents:
+        length = sum(d.values())
+        score = 0.0
+        for term, weight in terms.items():
+            frequency = d.get(term)
+            if not frequency:
+                continue
+            idf = math.log(1 + (len(documents) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            score += weight * idf * frequency * (_K1 + 1) / (frequency + _K1 * (1 - _B + _B * length / average_length))
+        scores.append(score)
+    return scores
+
+
+def select_text(
+    text: str,
+    document_type: str = "",
+    max_tokens: int = 600,
+    form_data: Optional[Dict[str, Any]] = None,
+    extra_terms: Iterable[str] = (),
+) -> str:
+    """The most relevant chunks of `text` for this document type, in document order, within
+    `max_tokens` (about CHARS_PER_TOKEN characters each). Omitted stretches are marked [...];
+    text that fits is returned as is."""
+    text = (text or "").strip()
+    budget = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= budget:
+        return text
+    chunks = split_chunks(text)
+    if not chunks:
+        return text[:budget]
+    terms = query_terms(document_type, form_data)
+    for term in extra_terms:
+        for token in tokenize(term):
+            terms.setdefault(token, _FORM_TERM_WEIGHT)
+    scores = bm25_scores(chunks, terms)
+
+    # Title/letterhead first, then by score (earlier chunk wins a tie); chunks matching no
+    # query term are left out even if there is budget for them
+    ranked = [0] + sorted((i for i in range(1, len(chunks)) if scores[i] > 0), key=lambda i: (-scores[i], i))
+    chosen, used = [], 0
+    for i in ranked:
+        size = len(chunks[i].text) + len(_OMITTED) + 2
+        if used + size > budget:
+            continue
+        chosen.append(i)
+        used += size
+    if not chosen:
+        return chunks[0].text[:budget]
+
+    parts = []
+    previous = -1
+    for i in sorted(chosen):
+        if i != previous + 1:
+            parts.append(_OMITTED)
+        parts.append(chunks[i].text)
+        previous = i
+    if previous != len(chunks) - 1:
+        parts.append(_OMITTED)
+    return "\n".join(parts)
@@ -16,6 +16,35 @@ class Settings(BaseSettings):
     # Ollama Configuration (main AI engine)
     ollama_base_url: str = "http://localhost:11434"
     ollama_model: str = "llama3.1"  # Default model, can be changed to llama2, mistral, etc.
+    # Concurrent LLM calls allowed against Ollama; match the server's OLLAMA_NUM_PARALLEL
+    ollama_max_parallel: int = 1
+    # How long Ollama keeps the model loaded after each request ("30m", "2h", "-1" = until restart)
+    ollama_keep_alive: str = "30m"
+    # Preload the model on startup with a one-token generation (/health reports ready once loaded)
+    ollama_warmup_on_startup: bool = True
+    # Reload / refresh keep-alive every N seconds (0 = off); keep it below OLLAMA_KEEP_ALIVE
+    ollama_rewarm_interval_seconds: int = 0
+    # Connections kept in the shared HTTP pool for direct Ollama REST calls (per process)
+    ollama_http_max_connections: int = 8
+    # Threads running blocking document analyses off the event loop (they queue for LLM slots)
+    analysis_workers: int = 4
+    # One structured LLM call per document (detection + checks + compliance + risk as JSON);
+    # false uses the detection -> analysis -> compliance -> risk chain (also the fallback)
+    ollama_single_call: bool = True
+    # Local document-type classifier: skip LLM detection when confidence (0-1) is at least this
+    doc_classifier_min_confidence: float = 0.6
+    # Optional TF-IDF model trained with scripts/train_doc_classifier.py (used if the file exists)
+    doc_classifier_model_path: str = "./models/doc_classifier.pkl"
+    # Document text per analysis prompt, in tokens (~4 characters); long documents are cut down to
+    # the chunks most relevant to the document type's checks instead of the first N characters
+    prompt_document_tokens: int = 625
+    # Rule validators decide keyword/format/equality/date checks in Python; only undecided checks go to the LLM
+    rule_validators_enabled: bool = True
+    # LLM response cache (SQLite): key = model + generation options + prompt hash
+    llm_cache_enabled: bool = True
+    llm_cache_path: str = "./cache/llm_cache.sqlite3"
+    llm_cache_ttl_seconds: int = 604800  # 7 days
+    llm_cache_max_bytes: int = 67108864  # 64MB
     
     # FastAPI
     api_host: str = "0.0.0.0"
@@ -28,6 +57,34 @@ class Settings(BaseSettings):
 
     # Bank statement verification timeout (seconds). CrewAI + Ollama can need 3–5 min on CPU.
     verify_bank_statement_timeout: int = 300
+    # Bulk verification (POST /verify-bank-statements, bulk_verify.py): processes verifying files in
+    # parallel (0 = one per CPU core); their LLM calls share the ollama_max_parallel limit
+    bulk_verify_workers: int = 2
+    bulk_verify_max_files: int = 500
+
+    # OCR backend: "pytesseract" (tesseract CLI per image) or "tesserocr" (in-process C API, pip install tesserocr)
+    ocr_backend: str = "pytesseract"
+    ocr_language: str = "eng"
+    # OCR: size of the process pool used for page-parallel Tesseract (0 = one worker per CPU core, 1 = serial)
+    ocr_workers: int = 0
+    # OCR: max rasterized pages held in memory at once when OCRing serially (pool workers hold one page each)
+    ocr_max_pages_in_memory: int = 2
+    # OCR: pages are OCRed once at ocr_dpi; pages with mean Tesseract confidence below
+    # ocr_min_confidence (0-100) are re-rasterized and OCRed at ocr_high_dpi
+    ocr_dpi: int = 200
+    ocr_high_dpi: int = 300
+    ocr_min_confidence: float = 60.0
+    # OCR: normalize images before OCR (EXIF orientation, downscale to ocr_dpi, grayscale,
+    # adaptive threshold, deskew); see image_preprocess.py
+    ocr_preprocess: bool = True
+
+    # Excel extraction: rows read per sheet (streamed in read-only mode); larger sheets are truncated
+    excel_max_rows: int = 5000
+
+    # Extraction cache: text/OCR results keyed by SHA-256 of the file contents + extractor version
+    extraction_cache_enabled: bool = True
+    extraction_cache_dir: str = "./cache/extraction"
+    extraction_cache_max_bytes: int = 268435456  # 256MB, least recently used entries evicted first
     
     # Email (optional - notifications disabled)
     smtp_host: str = "mail.theinnoverse.co.za"
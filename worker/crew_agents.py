@@ -46,11 +46,17 @@ except ImportError:
         def __init__(self, *args, **kwargs):
             pass
 
-from typing import Dict, List, Any, Optional
-from pydantic import BaseModel
+from typing import Dict, List, Any, Literal, Optional, Tuple
+from pydantic import BaseModel, Field, ValidationError, field_validator
 import json
 import logging
+import re
 from config import settings
+from ollama_client import keep_alive, llm_slot, run_in_analysis_executor
+from llm_cache import cached_llm_call
+from doc_classifier import classify_document, is_confident
+from chunk_selector import select_text
+from rule_validators import FAIL, NEEDS_REVIEW, CheckResult, run_rule_checks, undecided
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +68,7 @@ if OLLAMA_AVAILABLE:
             model=settings.ollama_model,
             base_url=settings.ollama_base_url,
             temperature=0.7,
+            keep_alive=keep_alive(),
         )
         print(f"✅ Ollama LLM initialized with model: {settings.ollama_model}")
         print(f"   Model: {settings.ollama_model}")
@@ -82,134 +89,316 @@ def is_ollama_available() -> bool:
     print(f"🔍 Ollama availability check: llm={llm is not None}, result={available}")
     return available
 
-def analyze_document_with_ollama(
-    document_text: str, 
-    document_type: str, 
-    supplier_name: str,
-    form_data: Optional[Dict[str, Any]] = None,
-    filename: str = ""
-) -> Dict[str, Any]:
-    """Analyze document using Ollama with specific validation checks."""
-    if not llm:
-        return {
-            "analysis_results": "Basic validation - document received",
-            "compliance_results": "Manual review required",
-            "risk_assessment": "To be determined",
-            "mode": "fallback"
-        }
-    
+def _invoke(prompt: str, chat_model=None) -> str:
+    """Run one LLM call inside an Ollama slot (see ollama_client) and return the response text.
+
+    Responses are cached by model, generation options and prompt (see llm_cache).
+    """
+    chat_model = chat_model or llm
+
+    def call() -> str:
+        with llm_slot():
+            result = chat_model.invoke(prompt)
+        return result.content if hasattr(result, 'content') else str(result)
+
+    options = {
+        name: getattr(chat_model, name, None)
+        for name in ("temperature", "format", "num_predict", "num_ctx", "top_p", "top_k", "seed")
+    }
+    return cached_llm_call(getattr(chat_model, "model", settings.ollama_model), options, prompt, call)
+
+
+# ----------------------------
+# SINGLE-CALL STRUCTURED ANALYSIS
+# ----------------------------
+class AnalysisCheck(BaseModel):
+    """One validation check from the analysis prompt."""
+    name: str
+    status: Literal["PASS", "FAIL"]
+    details: str = ""
+
+    @field_validator("status", mode="before")
+    @classmethod
+    def _upper_status(cls, value: Any) -> Any:
+        return value.strip().upper() if isinstance(value, str) else value
+
+
+class DocumentAnalysis(BaseModel):
+    """Detection, checks, compliance and risk for one document, returned by a single LLM call."""
+    detected_document_type: str = "unknown"
+    checks: List[AnalysisCheck] = Field(default_factory=list)
+    compliance_status: Literal["COMPLIANT", "NON_COMPLIANT", "NEEDS_REVIEW"]
+    compliance_notes: str = ""
+    risk_level: Literal["Low", "Medium", "High"]
+    risk_notes: str = ""
+
+    @field_validator("compliance_status", mode="before")
+    @classmethod
+    def _normalize_compliance(cls, value: Any) -> Any:
+        return value.strip().upper().replace(" ", "_").replace("-", "_") if isinstance(value, str) else value
+
+    @field_validator("risk_level", mode="before")
+    @classmethod
+    def _normalize_risk(cls, value: Any) -> Any:
+        return value.strip().capitalize() if isinstance(value, str) else value
+
+
+_SINGLE_CALL_INSTRUCTIONS = """
+
+ALSO:
+- Identify what type of document this actually is: one of bank_statement, bank_confirmation_letter,
+  company_registration, tax_clearance, bbbee_certificate, company_profile, organogram, unknown.
+- Decide the overall compliance status for South African supplier onboarding.
+- Assess the overall risk level (document completeness, compliance and business risk).
+
+Respond with ONLY a JSON object, no other text, in exactly this form:
+{"detected_document_type": "<type>",
+ "checks": [{"name": "<validation name>", "status": "PASS" or "FAIL", "details": "<values found and why>"}],
+ "compliance_status": "COMPLIANT" or "NON_COMPLIANT" or "NEEDS_REVIEW",
+ "compliance_notes": "<short explanation and recommendations>",
+ "risk_level": "Low" or "Medium" or "High",
+ "risk_notes": "<short explanation>"}
+Include one entry in "checks" for every numbered validation above."""
+
+_structured_llm = None
+
+
+def _get_structured_llm():
+    """ChatOllama constrained to JSON output (the DocumentAnalysis schema where supported), temperature 0."""
+    global _structured_llm
+    if _structured_llm is None:
+        options = dict(model=settings.ollama_model, base_url=settings.ollama_base_url, temperature=0, keep_alive=keep_alive())
+        try:
+            _structured_llm = ChatOllama(format=DocumentAnalysis.model_json_schema(), **options)
+        except Exception:
+            # Older langchain-ollama only accepts format="json"
+            _structured_llm = ChatOllama(format="json", **options)
+    return _structured_llm
+
+
+def _parse_document_analysis(text: str) -> Optional[DocumentAnalysis]:
+    """Validate the model's JSON against DocumentAnalysis; None if it is missing or invalid."""
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return None
     try:
-        # STEP 0: Check if we have actual content or just a placeholder
-        has_actual_content = len(document_text.strip()) > 50 and not document_text.startswith("PDF document uploaded") and not document_text.startswith("Document content extracted from") and not document_text.startswith("Document uploaded")
-        
-        # STEP 1: First detect what type of document this actually is by analyzing content
-        # If we don't have actual content, use filename as a hint
-        content_preview = document_text[:2000] if has_actual_content else "Content extraction failed - using filename analysis"
-        filename_hint = f"\nFILENAME: {filename}" if filename else ""
-        
-        detection_prompt = f"""You are a document type classifier. Analyze the following information to determine what type of document this is.
-{filename_hint}
-DOCUMENT CONTENT (first 2000 characters):
-{content_preview}
-
-Based on the content and filename, identify the document type. Look for:
-- Bank statements, bank letters, or bank confirmation letters (look for bank names, account numbers, transactions, "bank statement", "confirmation letter")
-- Company registration documents (look for "CIPC", "Companies and Intellectual Property Commission", "CM1", "CK1", "CK2", registration numbers)
-- Tax clearance certificates (look for "SARS", "South African Revenue Service", "Tax Clearance", "Good Standing")
-- BBBEE certificates (look for "B-BBEE", "Broad-Based Black Economic Empowerment", "Department: Trade, Industry and Competition")
-- Other document types
+        return DocumentAnalysis.model_validate(json.loads(text[start:end + 1]))
+    except (json.JSONDecodeError, ValidationError) as e:
+        print(f"⚠️ Single-call analysis did not match the schema: {e}")
+        return None
 
-Respond with ONLY the document type in this format:
-ACTUAL_DOCUMENT_TYPE: [type]
 
-Examples:
-ACTUAL_DOCUMENT_TYPE: bank_statement
-ACTUAL_DOCUMENT_TYPE: bank_confirmation_letter
-ACTUAL_DOCUMENT_TYPE: company_registration
-ACTUAL_DOCUMENT_TYPE: tax_clearance
-ACTUAL_DOCUMENT_TYPE: bbbee_certificate
-ACTUAL_DOCUMENT_TYPE: unknown
+def _analyze_single_call(
+    document_text: str,
+    document_type: str,
+    supplier_name: str,
+    form_data: Optional[Dict[str, Any]] = None,
+    detected_type: str = "unknown",
+    rule_results: Optional[List[CheckResult]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Detection, validation checks, compliance and risk in one structured generation.
+
+    A `detected_type` already known from the local classifier takes precedence over the
+    type the model reports. Checks already decided by `rule_results` are left out of the
+    prompt and merged into the result. Returns the same result shape as the multi-call
+    chain (plus `structured_analysis`), or None if the call fails or the output does not
+    validate, so the caller can fall back.
+    """
+    prompt = _build_analysis_prompt(document_text, document_type, supplier_name, form_data, rule_results) + _SINGLE_CALL_INSTRUCTIONS
+    try:
+        analysis = _parse_document_analysis(_invoke(prompt, chat_model=_get_structured_llm()))
+    except Exception as e:
+        print(f"⚠️ Single-call analysis failed: {e}")
+        return None
+    if analysis is None:
+        return None
+    if rule_results:
+        analysis.checks = _decided_checks(rule_results) + analysis.checks
+
+    actual_document_type = detected_type
+    if actual_document_type == "unknown":
+        actual_document_type = (analysis.detected_document_type or "unknown").strip().lower()
+        print(f"🔍 [SINGLE CALL] Detected document type: {actual_document_type}")
+    type_mismatch, mismatch_warning = _check_type_mismatch(document_type, actual_document_type)
+
+    passed = sum(1 for check in analysis.checks if check.status == "PASS")
+    analysis_text = f"DOCUMENT TYPE DETECTED: {actual_document_type}\n\nVALIDATION RESULTS:\n"
+    for i, check in enumerate(analysis.checks, start=1):
+        analysis_text += f"{i}. {check.name}: {check.status}" + (f" - {check.details}" if check.details else "") + "\n"
+    analysis_text += f"\n{passed} of {len(analysis.checks)} checks passed."
+    if type_mismatch:
+        analysis_text = "=" * 80 + "\n" + mismatch_warning + "\n" + "=" * 80 + "\n\n" + analysis_text
+
+    return {
+        "analysis_results": analysis_text,
+        "compliance_results": f"COMPLIANCE STATUS: {analysis.compliance_status}\n{analysis.compliance_notes}".strip(),
+        "risk_assessment": f"OVERALL RISK: {analysis.risk_level}\n{analysis.risk_notes}".strip(),
+        "mode": "ollama_single_call",
+        "document_type_detected": actual_document_type,
+        "document_type_mismatch": type_mismatch,
+        "structured_analysis": analysis.model_dump(),
+    }
+
+
+# ----------------------------
+# RULE VALIDATORS
+# ----------------------------
+_PROMPT_SECTION = re.compile(r"^(\d+)\. ([^:\n]+):")
+
+
+def _decided_checks(rule_results: List[CheckResult]) -> List[AnalysisCheck]:
+    """Rule checks with a PASS/FAIL outcome, as AnalysisCheck entries."""
+    return [
+        AnalysisCheck(name=result.name, status=result.status, details=result.details)
+        for result in rule_results
+        if result.status != NEEDS_REVIEW
+    ]
+
+
+def _render_rule_checks(rule_results: List[CheckResult]) -> str:
+    return "\n".join(
+        f"- {check.name}: {check.status}" + (f" - {check.details}" if check.details else "")
+        for check in _decided_checks(rule_results)
+    )
 
-If you cannot determine the type, respond with: ACTUAL_DOCUMENT_TYPE: unknown"""
 
-        # Always try filename fallback first if we don't have content, before calling LLM
-        actual_document_type = "unknown"
-        if not has_actual_content and filename:
-            # Try to infer from common filename patterns FIRST (faster than LLM)
-            filename_lower = filename.lower()
-            if "bank" in filename_lower or "confirmation" in filename_lower:
-                actual_document_type = "bank_confirmation_letter"
-                print(f"🔍 [FILENAME FALLBACK] Detected document type from filename: {actual_document_type} (filename: {filename})")
-            elif "registration" in filename_lower or "cipc" in filename_lower or "cm1" in filename_lower or "ck1" in filename_lower:
-                actual_document_type = "company_registration"
-                print(f"🔍 [FILENAME FALLBACK] Detected document type from filename: {actual_document_type} (filename: {filename})")
-            elif "tax" in filename_lower or "sars" in filename_lower or "good_standing" in filename_lower:
-                actual_document_type = "tax_clearance"
-                print(f"🔍 [FILENAME FALLBACK] Detected document type from filename: {actual_document_type} (filename: {filename})")
-            elif "bbbee" in filename_lower or "bee" in filename_lower:
-                actual_document_type = "bbbee_certificate"
-                print(f"🔍 [FILENAME FALLBACK] Detected document type from filename: {actual_document_type} (filename: {filename})")
-        
-        # If we still don't have a type and have content, try LLM detection
-        if actual_document_type == "unknown" and has_actual_content:
-            detection_result = llm.invoke(detection_prompt)
-            detection_text = detection_result.content if hasattr(detection_result, 'content') else str(detection_result)
-            
-            # Extract the detected document type
-            if "ACTUAL_DOCUMENT_TYPE:" in detection_text:
-                actual_document_type = detection_text.split("ACTUAL_DOCUMENT_TYPE:")[1].strip().split("\n")[0].strip().lower()
-                print(f"🔍 [LLM DETECTION] Detected document type: {actual_document_type}")
-        
-        print(f"🔍 [FINAL] Document type detection: expected='{document_type}', detected='{actual_document_type}', has_content={has_actual_content}, filename='{filename}'")
-        
-        # Normalize document type names for comparison
-        def normalize_type(doc_type: str) -> str:
-            doc_type = doc_type.lower().replace(" ", "_").replace("-", "_")
-            if "bank" in doc_type and ("statement" in doc_type or "confirmation" in doc_type or "letter" in doc_type):
-                return "bank_confirmation"
-            elif "company" in doc_type and ("registration" in doc_type or "cipc" in doc_type):
-                return "company_registration"
-            elif "tax" in doc_type or "good_standing" in doc_type or "sars" in doc_type:
-                return "tax_clearance"
-            elif "bbbee" in doc_type or "bee" in doc_type:
-                return "bbbee_accreditation"
-            return doc_type
-        
-        normalized_expected = normalize_type(document_type)
-        normalized_actual = normalize_type(actual_document_type)
-        
-        # Check for mismatch
-        type_mismatch = False
-        mismatch_warning = ""
-        print(f"🔍 Comparing types: normalized_expected='{normalized_expected}', normalized_actual='{normalized_actual}'")
-        if normalized_actual != "unknown" and normalized_expected != normalized_actual:
-            type_mismatch = True
-            mismatch_warning = f"\n⚠️ DOCUMENT TYPE MISMATCH DETECTED:\n"
-            mismatch_warning += f"   Expected: {document_type}\n"
-            mismatch_warning += f"   Actual: {actual_document_type}\n"
-            mismatch_warning += f"   This document appears to be a {actual_document_type} but was uploaded as {document_type}.\n"
-            mismatch_warning += f"   Please verify the correct document was uploaded.\n"
-            print(f"⚠️ MISMATCH DETECTED! Expected: {document_type}, Actual: {actual_document_type}")
-        else:
-            print(f"✅ Document type matches or could not be determined")
-        
-        # Get form data for validation
-        company_name = form_data.get('companyName', supplier_name) if form_data else supplier_name
-        registration_number = form_data.get('registrationNumber', '') if form_data else ''
-        physical_address = form_data.get('physicalAddress', '') if form_data else ''
-        bbbee_status = form_data.get('bbbeeLevel', '') if form_data else ''
-        
-        # Banking information from form
-        bank_name = form_data.get('bankName', '') if form_data else ''
-        branch_name = form_data.get('branchName', '') if form_data else ''
-        branch_number = form_data.get('branchNumber', '') if form_data else ''
-        account_number = form_data.get('accountNumber', '') if form_data else ''
-        account_type = form_data.get('typeOfAccount', '') if form_data else ''
-        bank_account_name = form_data.get('bankAccountName', '') if form_data else ''
-        
-        # Special validation for Company Registration Documents (CIPC)
-        if document_type.lower() in ['companyregistration', 'company_registration', 'company registration']:
-            analysis_prompt = f"""You are a CIPC (Companies and Intellectual Property Commission) document validator for South African businesses.
+def _apply_rule_results(analysis_prompt: str, rule_results: List[CheckResult]) -> str:
+    """Keep only the numbered validations the rules could not decide (renumbered) and list
+    the decided ones so the model takes them into account without repeating them."""
+    decided = {check.name for check in _decided_checks(rule_results)}
+    if not decided:
+        return analysis_prompt
+    paragraphs = []
+    number = 0
+    for paragraph in analysis_prompt.split("\n\n"):
+        m = _PROMPT_SECTION.match(paragraph)
+        if m:
+            if m.group(2).strip() in decided:
+                continue
+            number += 1
+            paragraph = f"{number}." + paragraph[len(m.group(1)) + 1:]
+        paragraphs.append(paragraph)
+    paragraphs.insert(-1, "ALREADY VERIFIED BY RULES (do not repeat these checks):\n" + _render_rule_checks(rule_results))
+    return "\n\n".join(paragraphs)
+
+
+def _analyze_with_rules(
+    rule_results: List[CheckResult],
+    actual_document_type: str,
+    type_mismatch: bool,
+    mismatch_warning: str,
+) -> Dict[str, Any]:
+    """Result for a document whose checks were all decided by the rule validators (no LLM call)."""
+    failed = [check for check in rule_results if check.status == FAIL]
+    passed = len(rule_results) - len(failed)
+
+    analysis_text = f"DOCUMENT TYPE DETECTED: {actual_document_type}\n\nVALIDATION RESULTS:\n"
+    for i, check in enumerate(rule_results, start=1):
+        analysis_text += f"{i}. {check.name}: {check.status}" + (f" - {check.details}" if check.details else "") + "\n"
+    analysis_text += f"\n{passed} of {len(rule_results)} checks passed."
+    if type_mismatch:
+        analysis_text = "=" * 80 + "\n" + mismatch_warning + "\n" + "=" * 80 + "\n\n" + analysis_text
+
+    if failed or type_mismatch:
+        compliance_status = "NON_COMPLIANT"
+        compliance_notes = "Failed checks: " + ", ".join(check.name for check in failed) if failed else "Document type mismatch."
+    else:
+        compliance_status = "COMPLIANT"
+        compliance_notes = "All validation checks passed."
+    if type_mismatch or len(failed) > 2:
+        risk_level = "High"
+    elif failed:
+        risk_level = "Medium"
+    else:
+        risk_level = "Low"
+    risk_notes = f"{len(failed)} of {len(rule_results)} checks failed" + ("; document type mismatch." if type_mismatch else ".")
+
+    analysis = DocumentAnalysis(
+        detected_document_type=actual_document_type,
+        checks=_decided_checks(rule_results),
+        compliance_status=compliance_status,
+        compliance_notes=compliance_notes,
+        risk_level=risk_level,
+        risk_notes=risk_notes,
+    )
+    return {
+        "analysis_results": analysis_text,
+        "compliance_results": f"COMPLIANCE STATUS: {compliance_status}\n{compliance_notes}",
+        "risk_assessment": f"OVERALL RISK: {risk_level}\n{risk_notes}",
+        "mode": "rules",
+        "document_type_detected": actual_document_type,
+        "document_type_mismatch": type_mismatch,
+        "structured_analysis": analysis.model_dump(),
+    }
+
+
+def _normalize_type(doc_type: str) -> str:
+    """Normalize document type names for comparison."""
+    doc_type = doc_type.lower().replace(" ", "_").replace("-", "_")
+    if "bank" in doc_type and ("statement" in doc_type or "confirmation" in doc_type or "letter" in doc_type):
+        return "bank_confirmation"
+    elif "company" in doc_type and ("registration" in doc_type or "cipc" in doc_type):
+        return "company_registration"
+    elif "tax" in doc_type or "good_standing" in doc_type or "sars" in doc_type:
+        return "tax_clearance"
+    elif "bbbee" in doc_type or "bee" in doc_type:
+        return "bbbee_accreditation"
+    return doc_type
+
+
+def _check_type_mismatch(document_type: str, actual_document_type: str) -> Tuple[bool, str]:
+    """Compare the expected and detected document types. Returns (mismatch, warning text)."""
+    normalized_expected = _normalize_type(document_type)
+    normalized_actual = _normalize_type(actual_document_type)
+
+    type_mismatch = False
+    mismatch_warning = ""
+    print(f"🔍 Comparing types: normalized_expected='{normalized_expected}', normalized_actual='{normalized_actual}'")
+    if normalized_actual != "unknown" and normalized_expected != normalized_actual:
+        type_mismatch = True
+        mismatch_warning = f"\n⚠️ DOCUMENT TYPE MISMATCH DETECTED:\n"
+        mismatch_warning += f"   Expected: {document_type}\n"
+        mismatch_warning += f"   Actual: {actual_document_type}\n"
+        mismatch_warning += f"   This document appears to be a {actual_document_type} but was uploaded as {document_type}.\n"
+        mismatch_warning += f"   Please verify the correct document was uploaded.\n"
+        print(f"⚠️ MISMATCH DETECTED! Expected: {document_type}, Actual: {actual_document_type}")
+    else:
+        print(f"✅ Document type matches or could not be determined")
+    return type_mismatch, mismatch_warning
+
+
+def _build_analysis_prompt(
+    document_text: str,
+    document_type: str,
+    supplier_name: str,
+    form_data: Optional[Dict[str, Any]] = None,
+    rule_results: Optional[List[CheckResult]] = None,
+) -> str:
+    """Analysis prompt with the validation checks for this document type, filled in from the form data.
+
+    The document text is cut down to the chunks most relevant to this type's checks and the
+    form values (PROMPT_DOCUMENT_TOKENS). With `rule_results`, validations already decided by
+    the rule validators are removed.
+    """
+    document_tokens = getattr(settings, "prompt_document_tokens", 625)
+    document_excerpt = select_text(document_text, document_type, document_tokens, form_data)
+    # Get form data for validation
+    company_name = form_data.get('companyName', supplier_name) if form_data else supplier_name
+    registration_number = form_data.get('registrationNumber', '') if form_data else ''
+    physical_address = form_data.get('physicalAddress', '') if form_data else ''
+    bbbee_status = form_data.get('bbbeeLevel', '') if form_data else ''
+    
+    # Banking information from form
+    bank_name = form_data.get('bankName', '') if form_data else ''
+    branch_name = form_data.get('branchName', '') if form_data else ''
+    branch_number = form_data.get('branchNumber', '') if form_data else ''
+    account_number = form_data.get('accountNumber', '') if form_data else ''
+    account_type = form_data.get('typeOfAccount', '') if form_data else ''
+    bank_account_name = form_data.get('bankAccountName', '') if form_data else ''
+    
+    # Special validation for Company Registration Documents (CIPC)
+    if document_type.lower() in ['companyregistration', 'company_registration', 'company registration']:
+        analysis_prompt = f"""You are a CIPC (Companies and Intellectual Property Commission) document validator for South African businesses.
 
 FORM DATA PROVIDED BY SUPPLIER:
 - Company Name: {company_name}
@@ -217,7 +406,7 @@ FORM DATA PROVIDED BY SUPPLIER:
 - Physical Address: {physical_address}
 
 DOCUMENT CONTENT:
-{document_text[:2000]}
+{document_excerpt}
 
 PERFORM THESE SPECIFIC VALIDATIONS:
 
@@ -249,17 +438,17 @@ PERFORM THESE SPECIFIC VALIDATIONS:
    - Any missing or illegible information?
 
 Provide a structured response with clear PASS/FAIL status for each validation."""
-        
-        elif document_type.lower() in ['bbbeeaccreditation', 'bbbee_accreditation', 'bbbee accreditation', 'bbbee']:
-            # Special validation for BBBEE Certificate
-            analysis_prompt = f"""You are a B-BBEE (Broad-Based Black Economic Empowerment) certificate validator for South African businesses.
+    
+    elif document_type.lower() in ['bbbeeaccreditation', 'bbbee_accreditation', 'bbbee accreditation', 'bbbee']:
+        # Special validation for BBBEE Certificate
+        analysis_prompt = f"""You are a B-BBEE (Broad-Based Black Economic Empowerment) certificate validator for South African businesses.
 
 FORM DATA PROVIDED BY SUPPLIER:
 - Company Name: {company_name}
 - B-BBEE Status Level: {bbbee_status}
 
 DOCUMENT CONTENT:
-{document_text[:2500]}
+{document_excerpt}
 
 PERFORM THESE SPECIFIC VALIDATIONS:
 
@@ -301,10 +490,10 @@ PERFORM THESE SPECIFIC VALIDATIONS:
    - Any missing or illegible information?
 
 Provide a structured response with clear PASS/FAIL status for each validation. Include the extracted values."""
-        
-        elif document_type.lower() in ['bankconfirmation', 'bank_confirmation', 'bank confirmation', 'bank letter']:
-            # Special validation for Bank Confirmation Letter
-            analysis_prompt = f"""You are a bank document validator specializing in verifying South African bank confirmation letters.
+    
+    elif document_type.lower() in ['bankconfirmation', 'bank_confirmation', 'bank confirmation', 'bank letter']:
+        # Special validation for Bank Confirmation Letter
+        analysis_prompt = f"""You are a bank document validator specializing in verifying South African bank confirmation letters.
 
 FORM DATA PROVIDED BY SUPPLIER:
 - Company Name: {company_name}
@@ -316,7 +505,7 @@ FORM DATA PROVIDED BY SUPPLIER:
 - Account Type: {account_type}
 
 DOCUMENT CONTENT:
-{document_text[:2500]}
+{document_excerpt}
 
 PERFORM THESE SPECIFIC VALIDATIONS:
 
@@ -368,17 +557,17 @@ PERFORM THESE SPECIFIC VALIDATIONS:
    - Any missing or illegible information?
 
 Provide a structured response with clear PASS/FAIL status for each validation. Include all extracted values."""
-        
-        elif document_type.lower() in ['taxclearance', 'tax_clearance', 'tax clearance', 'good standing', 'goodstanding']:
-            # Special validation for Tax Clearance / Good Standing Certificate
-            analysis_prompt = f"""You are a tax document validator specializing in South African Revenue Service (SARS) tax clearance and good standing certificates.
+    
+    elif document_type.lower() in ['taxclearance', 'tax_clearance', 'tax clearance', 'good standing', 'goodstanding']:
+        # Special validation for Tax Clearance / Good Standing Certificate
+        analysis_prompt = f"""You are a tax document validator specializing in South African Revenue Service (SARS) tax clearance and good standing certificates.
 
 FORM DATA PROVIDED BY SUPPLIER:
 - Company Name: {company_name}
 - Physical Address: {physical_address}
 
 DOCUMENT CONTENT:
-{document_text[:2500]}
+{document_excerpt}
 
 PERFORM THESE SPECIFIC VALIDATIONS:
 
@@ -431,17 +620,17 @@ PERFORM THESE SPECIFIC VALIDATIONS:
    - Any missing or illegible information?
 
 Provide a structured response with clear PASS/FAIL status for each validation. Include all extracted values."""
-        
-        elif document_type.lower() in ['companyprofile', 'company_profile', 'company profile', 'organogram', 'organigramme']:
-            # Optional documents - just confirm presence and basic info
-            analysis_prompt = f"""You are reviewing optional supporting documents for supplier onboarding.
+    
+    elif document_type.lower() in ['companyprofile', 'company_profile', 'company profile', 'organogram', 'organigramme']:
+        # Optional documents - just confirm presence and basic info
+        analysis_prompt = f"""You are reviewing optional supporting documents for supplier onboarding.
 
 Document Type: {document_type}
 Supplier: {supplier_name}
 Company Name (from form): {company_name}
 
 DOCUMENT CONTENT:
-{document_text[:1500]}
+{select_text(document_text, document_type, document_tokens // 2, form_data)}
 
 This is an OPTIONAL document. Perform basic analysis:
 
@@ -473,15 +662,15 @@ This is an OPTIONAL document. Perform basic analysis:
 Note: This is a SUPPORTING DOCUMENT (not mandatory). Presence is a plus, absence is acceptable.
 
 Provide a brief assessment."""
-        
-        else:
-            # Standard document analysis for other document types
-            analysis_prompt = f"""You are a document analysis specialist reviewing supplier onboarding documents.
+    
+    else:
+        # Standard document analysis for other document types
+        analysis_prompt = f"""You are a document analysis specialist reviewing supplier onboarding documents.
 
 Document Type: {document_type}
 Supplier: {supplier_name}
 Company Name (from form): {company_name}
-Document Content Preview: {document_text[:1000]}
+Document Content Preview: {select_text(document_text, document_type, document_tokens // 2, form_data)}
 
 Analyze this document and provide:
 1. Key information extracted (company details, registration numbers, dates, etc.)
@@ -498,8 +687,135 @@ If this is a financial or official document:
 
 Provide a structured analysis."""
 
-        analysis_result = llm.invoke(analysis_prompt)
-        analysis_text = analysis_result.content if hasattr(analysis_result, 'content') else str(analysis_result)
+    if rule_results:
+        analysis_prompt = _apply_rule_results(analysis_prompt, rule_results)
+    return analysis_prompt
+
+
+def analyze_document_with_ollama(
+    document_text: str, 
+    document_type: str, 
+    supplier_name: str,
+    form_data: Optional[Dict[str, Any]] = None,
+    filename: str = ""
+) -> Dict[str, Any]:
+    """Analyze document using Ollama with specific validation checks."""
+    if not llm:
+        return {
+            "analysis_results": "Basic validation - document received",
+            "compliance_results": "Manual review required",
+            "risk_assessment": "To be determined",
+            "mode": "fallback"
+        }
+    
+    try:
+        # STEP 0: Check if we have actual content or just a placeholder
+        has_actual_content = len(document_text.strip()) > 50 and not document_text.startswith("PDF document uploaded") and not document_text.startswith("Document content extracted from") and not document_text.startswith("Document uploaded")
+        
+        # STEP 1: First detect what type of document this actually is by analyzing content
+        # If we don't have actual content, use filename as a hint
+        content_preview = select_text(document_text, "", getattr(settings, "prompt_document_tokens", 625)) if has_actual_content else "Content extraction failed - using filename analysis"
+        filename_hint = f"\nFILENAME: {filename}" if filename else ""
+        
+        detection_prompt = f"""You are a document type classifier. Analyze the following information to determine what type of document this is.
+{filename_hint}
+DOCUMENT CONTENT (most relevant parts):
+{content_preview}
+
+Based on the content and filename, identify the document type. Look for:
+- Bank statements, bank letters, or bank confirmation letters (look for bank names, account numbers, transactions, "bank statement", "confirmation letter")
+- Company registration documents (look for "CIPC", "Companies and Intellectual Property Commission", "CM1", "CK1", "CK2", registration numbers)
+- Tax clearance certificates (look for "SARS", "South African Revenue Service", "Tax Clearance", "Good Standing")
+- BBBEE certificates (look for "B-BBEE", "Broad-Based Black Economic Empowerment", "Department: Trade, Industry and Competition")
+- Other document types
+
+Respond with ONLY the document type in this format:
+ACTUAL_DOCUMENT_TYPE: [type]
+
+Examples:
+ACTUAL_DOCUMENT_TYPE: bank_statement
+ACTUAL_DOCUMENT_TYPE: bank_confirmation_letter
+ACTUAL_DOCUMENT_TYPE: company_registration
+ACTUAL_DOCUMENT_TYPE: tax_clearance
+ACTUAL_DOCUMENT_TYPE: bbbee_certificate
+ACTUAL_DOCUMENT_TYPE: unknown
+
+If you cannot determine the type, respond with: ACTUAL_DOCUMENT_TYPE: unknown"""
+
+        # Always try filename fallback first if we don't have content, before calling LLM
+        actual_document_type = "unknown"
+        if not has_actual_content and filename:
+            # Try to infer from common filename patterns FIRST (faster than LLM)
+            filename_lower = filename.lower()
+            if "bank" in filename_lower or "confirmation" in filename_lower:
+                actual_document_type = "bank_confirmation_letter"
+                print(f"🔍 [FILENAME FALLBACK] Detected document type from filename: {actual_document_type} (filename: {filename})")
+            elif "registration" in filename_lower or "cipc" in filename_lower or "cm1" in filename_lower or "ck1" in filename_lower:
+                actual_document_type = "company_registration"
+                print(f"🔍 [FILENAME FALLBACK] Detected document type from filename: {actual_document_type} (filename: {filename})")
+            elif "tax" in filename_lower or "sars" in filename_lower or "good_standing" in filename_lower:
+                actual_document_type = "tax_clearance"
+                print(f"🔍 [FILENAME FALLBACK] Detected document type from filename: {actual_document_type} (filename: {filename})")
+            elif "bbbee" in filename_lower or "bee" in filename_lower:
+                actual_document_type = "bbbee_certificate"
+                print(f"🔍 [FILENAME FALLBACK] Detected document type from filename: {actual_document_type} (filename: {filename})")
+        
+        # Local classifier (keyword scoring, optional trained model): decides the type in
+        # milliseconds; the LLM detection call only runs when it is not confident.
+        if actual_document_type == "unknown" and has_actual_content:
+            classification = classify_document(document_text, filename)
+            if is_confident(classification):
+                actual_document_type = classification.label
+                print(f"🔍 [CLASSIFIER] Detected document type: {actual_document_type} ({classification.method}, confidence {classification.confidence})")
+            else:
+                print(f"🔍 [CLASSIFIER] Not confident ({classification.label}, {classification.confidence}); using LLM detection")
+        
+        # Rule validators (RULE_VALIDATORS_ENABLED): keyword, format, equality and date checks in
+        # Python. If they decide every check and the type is known, no LLM call is made;
+        # otherwise only the checks that need judgement go to the model (with type detection).
+        rule_results: List[CheckResult] = []
+        if has_actual_content and getattr(settings, "rule_validators_enabled", True):
+            rule_form = dict(form_data or {})
+            rule_form.setdefault("companyName", supplier_name)
+            rule_results = run_rule_checks(document_text, document_type, rule_form)
+            if rule_results and not undecided(rule_results) and actual_document_type != "unknown":
+                print(f"✅ [RULES] All {len(rule_results)} checks decided without the LLM")
+                type_mismatch, mismatch_warning = _check_type_mismatch(document_type, actual_document_type)
+                return _analyze_with_rules(rule_results, actual_document_type, type_mismatch, mismatch_warning)
+            if rule_results and not undecided(rule_results):
+                print(f"🔍 [RULES] All {len(rule_results)} checks decided; document type unknown, using LLM detection")
+            elif rule_results:
+                print(f"🔍 [RULES] {len(undecided(rule_results))} of {len(rule_results)} checks need the LLM")
+
+        # Single structured call (OLLAMA_SINGLE_CALL): detection, checks, compliance and risk in one
+        # generation. The multi-call chain below is the fallback if the output does not validate.
+        if has_actual_content and getattr(settings, "ollama_single_call", True):
+            single_call_result = _analyze_single_call(
+                document_text, document_type, supplier_name, form_data,
+                detected_type=actual_document_type, rule_results=rule_results,
+            )
+            if single_call_result is not None:
+                return single_call_result
+            print("⚠️ Falling back to multi-call analysis chain")
+
+        # If we still don't have a type and have content, try LLM detection
+        if actual_document_type == "unknown" and has_actual_content:
+            detection_text = _invoke(detection_prompt)
+            
+            # Extract the detected document type
+            if "ACTUAL_DOCUMENT_TYPE:" in detection_text:
+                actual_document_type = detection_text.split("ACTUAL_DOCUMENT_TYPE:")[1].strip().split("\n")[0].strip().lower()
+                print(f"🔍 [LLM DETECTION] Detected document type: {actual_document_type}")
+        
+        print(f"🔍 [FINAL] Document type detection: expected='{document_type}', detected='{actual_document_type}', has_content={has_actual_content}, filename='{filename}'")
+        
+        type_mismatch, mismatch_warning = _check_type_mismatch(document_type, actual_document_type)
+
+        analysis_prompt = _build_analysis_prompt(document_text, document_type, supplier_name, form_data, rule_results)
+
+        analysis_text = _invoke(analysis_prompt)
+        if _decided_checks(rule_results):
+            analysis_text = "VALIDATION RESULTS (RULES):\n" + _render_rule_checks(rule_results) + "\n\n" + analysis_text
         
         # Prepend mismatch warning if detected - make it VERY prominent
         if type_mismatch:
@@ -520,8 +836,7 @@ Check compliance for South African business requirements:
 
 Provide compliance status and recommendations."""
 
-        compliance_result = llm.invoke(compliance_prompt)
-        compliance_text = compliance_result.content if hasattr(compliance_result, 'content') else str(compliance_result)
+        compliance_text = _invoke(compliance_prompt)
         
         # Create risk assessment prompt
         risk_prompt = f"""Based on this analysis:
@@ -537,8 +852,7 @@ Assess the risk level:
 
 Provide risk assessment."""
 
-        risk_result = llm.invoke(risk_prompt)
-        risk_text = risk_result.content if hasattr(risk_result, 'content') else str(risk_result)
+        risk_text = _invoke(risk_prompt)
         
         return {
             "analysis_results": analysis_text,
@@ -571,6 +885,19 @@ Provide risk assessment."""
         return error_result
 
 
+async def analyze_document_with_ollama_async(
+    document_text: str,
+    document_type: str,
+    supplier_name: str,
+    form_data: Optional[Dict[str, Any]] = None,
+    filename: str = ""
+) -> Dict[str, Any]:
+    """analyze_document_with_ollama on the analysis thread pool, so the event loop keeps serving requests."""
+    return await run_in_analysis_executor(
+        analyze_document_with_ollama, document_text, document_type, supplier_name, form_data, filename=filename
+    )
+
+
 class DocumentAnalysisTool(BaseTool):
     """Tool for analyzing document content."""
     name: str = "document_analyzer"
@@ -0,0 +1,69 @@
+"""Date parsing shared by the bank statement verifier and the rule validators.
+
+parse_date reads one date value (as copied from a document or returned by the LLM);
+find_dates finds every date in running text.
+"""
+import re
+from datetime import datetime
+
+
+def parse_date(date_str: str | None) -> datetime | None:
+    """Parse common date formats; return None if unparseable."""
+    if not date_str or not isinstance(date_str, str):
+        return None
+    date_str = date_str.strip()
+    # Strip common label prefixes that the LLM may copy verbatim from the PDF
+    # e.g. "Date:2025-08-19", "Date: 2025-08-19", "Dated: 19 August 2025"
+    date_str = re.sub(r"^[Dd]ate[d]?\s*:\s*", "", date_str).strip()
+    # Handle ISO 8601 with time component (e.g. 2025-04-04T00:00:00.000Z)
+    if "T" in date_str:
+        date_str = date_str.split("T")[0]
+    formats = [
+        "%Y-%m-%d",
+        "%d/%m/%Y",
+        "%d-%m-%Y",
+        "%Y/%m/%d",
+        "%d %b %Y",
+        "%d %B %Y",
+        "%b %d %Y",
+        "%B %d %Y",
+        "%b %d, %Y",
+        "%B %d, %Y",
+        "%d %b, %Y",
+        "%d %B, %Y",
+        "%Y %m %d",
+    ]
+    for fmt in formats:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+_MONTH_NAMES = r"(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)[a-z]*"
+# Date shapes parse_date understands, as they appear in running text
+_DATE_IN_TEXT = re.compile(
+    r"\b(?:"
+    r"\d{4}[-/]\d{1,2}[-/]\d{1,2}"
+    r"|\d{1,2}[-/]\d{1,2}[-/]\d{4}"
+    rf"|\d{{1,2}} {_MONTH_NAMES},? \d{{4}}"
+    rf"|{_MONTH_NAMES} \d{{1,2}},? \d{{4}}"
+    r")\b",
+    re.IGNORECASE,
+)
+
+
+def find_dates(text: str | None) -> list[datetime]:
+    """Every date in running text that parse_date can read, in text order."""
+    if not text:
+        return []
+    dates = []
+    for m in _DATE_IN_TEXT.finditer(text):
+        value = re.sub(r"\s+", " ", m.group(0))
+        # "3 Sept 2026" -> "3 Sep 2026" so %b matches non-standard month abbreviations
+        value = re.sub(r"^(\d{1,2}) (\w{3})\w* ", r"\1 \2 ", value) if value[0].isdigit() else value
+        parsed = parse_date(value) or parse_date(m.group(0))
+        if parsed:
+            dates.append(parsed)
+    return dates
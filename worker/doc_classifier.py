@@ -0,0 +1,239 @@
+"""Local document-type classifier (replaces the LLM detection call when it is confident).
+
+Two stages, both in-process and taking milliseconds:
+
+1. Weighted keyword scoring: each type has phrases that identify it ("CIPC", "Good Standing",
+   "B-BBEE", "dtic", ...) with a weight; the filename adds a smaller hint. Confidence grows
+   with the winning score and with its margin over the best type of another family (the two
+   bank document types count as one family, as the type-mismatch check does).
+2. Optional TF-IDF + logistic regression model trained from labelled historical documents
+   (scripts/train_doc_classifier.py; needs scikit-learn). Used when keyword scoring is not
+   confident and the model file exists.
+
+classify_document() returns the label and a confidence in [0, 1]; callers fall back to the
+LLM when the confidence is below DOC_CLASSIFIER_MIN_CONFIDENCE.
+"""
+import logging
+import os
+import pickle
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN = "unknown"
+
+# Labels use the same names as the LLM detection prompt (ACTUAL_DOCUMENT_TYPE)
+LABEL_FAMILIES: Dict[str, str] = {
+    "bank_statement": "bank",
+    "bank_confirmation_letter": "bank",
+    "company_registration": "cipc",
+    "tax_clearance": "sars",
+    "bbbee_certificate": "bbbee",
+}
+
+# (regex over lowercased, whitespace-collapsed text, weight)
+_BANK_COMMON: List[Tuple[str, float]] = [
+    (r"\b(?:fnb|first national bank|standard bank|absa|nedbank|capitec|investec|tymebank|discovery bank|african bank)\b", 2.0),
+    (r"\bbranch (?:code|number|no)\b", 2.0),
+    (r"\baccount (?:number|no)\b", 1.5),
+    (r"\baccount holder\b", 1.0),
+]
+
+KEYWORD_WEIGHTS: Dict[str, List[Tuple[str, float]]] = {
+    "bank_statement": _BANK_COMMON + [
+        (r"\bbank statement\b", 3.0),
+        (r"\bstatement period\b", 3.0),
+        (r"\b(?:opening|closing) balance\b", 3.0),
+        (r"\bavailable balance\b", 1.5),
+        (r"\btransaction(?:s| date| description)?\b", 1.0),
+    ],
+    "bank_confirmation_letter": _BANK_COMMON + [
+        (r"\b(?:bank|account) confirmation\b", 3.0),
+        (r"\bconfirmation letter\b", 3.0),
+        (r"\b(?:hereby|serves to) confirm\b", 2.5),
+        (r"\bconfirm that\b", 1.0),
+        (r"\bto whom it may concern\b", 1.0),
+    ],
+    "company_registration": [
+        (r"\bcipc\b", 3.0),
+        (r"\bcompanies and intellectual property commission\b", 4.0),
+        (r"\bcertificate of (?:incorporation|registration)\b", 3.0),
+        (r"\bcor ?14\.?3\b", 3.0),
+        (r"\b(?:cm ?1|ck ?1|ck ?2)\b", 2.0),
+        (r"\benterprise (?:number|name|type)\b", 2.0),
+        (r"\bdate of incorporation\b", 2.0),
+        (r"\bcompanies act\b", 2.0),
+        (r"\b\d{4} ?/ ?\d{6} ?/ ?\d{2}\b", 3.0),
+    ],
+    "tax_clearance": [
+        (r"\bsars\b", 3.0),
+        (r"\bsouth african revenue service\b", 4.0),
+        (r"\btax clearance\b", 4.0),
+        (r"\bgood standing\b", 3.0),
+        (r"\btax compliance status\b", 4.0),
+        (r"\btcs\b", 2.0),
+        (r"\b(?:tax reference|income tax) (?:number|no)\b", 2.0),
+        (r"\bpurpose of request\b", 1.5),
+    ],
+    "bbbee_certificate": [
+        (r"\bb-?bbee\b", 3.0),
+        (r"\bbroad[- ]based black economic empowerment\b", 4.0),
+        (r"\bdtic\b", 3.0),
+        (r"\btrade,? industry and competition\b", 3.0),
+        (r"\bsanas\b", 3.0),
+        (r"\bblack (?:ownership|female|women)\b", 2.0),
+        (r"\bstatus level\b", 2.0),
+        (r"\bprocurement recognition\b", 2.0),
+        (r"\bsworn affidavit\b", 1.5),
+        (r"\bverification certificate\b", 2.0),
+    ],
+}
+
+FILENAME_HINTS: Dict[str, str] = {
+    "bank_statement": r"statement",
+    "bank_confirmation_letter": r"confirm|letter",
+    "company_registration": r"cipc|registration|cor14|cm1|ck1|ck2|incorporation",
+    "tax_clearance": r"tax|sars|tcs|good.?standing",
+    "bbbee_certificate": r"bbbee|b-bbee|bee",
+}
+_FILENAME_WEIGHT = 1.5
+_FILENAME_BANK = r"bank"  # hint for both bank types
+
+# A winning score of this much with no competition gives confidence 1.0
+_STRONG_SCORE = 6.0
+# Only the first part of the document is scored (headers and titles carry the type)
+_MAX_CLASSIFY_CHARS = 20000
+
+_COMPILED = {
+    label: [(re.compile(pattern), weight) for pattern, weight in weights]
+    for label, weights in KEYWORD_WEIGHTS.items()
+}
+
+
+@dataclass
+class Classification:
+    """Predicted type, confidence in [0, 1], how it was decided, and the per-type keyword scores."""
+    label: str
+    confidence: float
+    method: str
+    scores: Dict[str, float] = field(default_factory=dict)
+
+
+def _normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "")[:_MAX_CLASSIFY_CHARS].lower())
+
+
+def keyword_scores(text: str, filename: str = "") -> Dict[str, float]:
+    """Weighted keyword score per label (each phrase counts once)."""
+    text = _normalize_text(text)
+    name = (filename or "").lower()
+    scores: Dict[str, float] = {}
+    for label, patterns in _COMPILED.items():
+        score = sum(weight for pattern, weight in patterns if pattern.search(text))
+        if name:
+            if re.search(FILENAME_HINTS[label], name):
+                score += _FILENAME_WEIGHT
+            if LABEL_FAMILIES[label] == "bank" and re.search(_FILENAME_BANK, name):
+                score += _FILENAME_WEIGHT
+        scores[label] = score
+    return scores
+
+
+def _keyword_classification(scores: Dict[str, float]) -> Classification:
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    label, top = ranked[0]
+    if top <= 0:
+        return Classification(UNKNOWN, 0.0, "keywords", scores)
+    rival = max((s for other, s in ranked[1:] if LABEL_FAMILIES[other] != LABEL_FAMILIES[label]), default=0.0)
+    confidence = min(1.0, top / _STRONG_SCORE) * (1.0 - rival / top)
+    return Classification(label, round(confidence, 3), "keywords", scores)
+
+
+# ----------------------------
+# OPTIONAL TF-IDF MODEL
+# ----------------------------
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+
+def _load_model():
+    """Trained pipeline from DOC_CLASSIFIER_MODEL_PATH, or None (no file or scikit-learn missing)."""
+    global _model, _model_loaded
+    with _model_lock:
+        if not _model_loaded:
+            _model_loaded = True
+            path = getattr(settings, "doc_classifier_model_path", "./models/doc_classifier.pkl")
+            if path and os.path.isfile(path):
+                try:
+                    with open(path, "rb") as f:
+                        _model = pickle.load(f)  # our own trained file (scripts/train_doc_classifier.py)
+                    logger.info("Loaded document classifier model from %s", path)
+                except Exception as e:
+                    logger.warning("Could not load document classifier model %s: %s", path, e)
+        return _model
+
+
+def train_model(texts: Sequence[str], labels: Sequence[str], path: str) -> Dict[str, float]:
+    """Fit a TF-IDF + logistic regression pipeline on labelled texts and pickle it to `path`.
+
+    Returns the mean 5-fold cross-validated accuracy (when there is enough data) and the
+    number of training documents. Requires scikit-learn.
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import cross_val_score
+    from sklearn.pipeline import make_pipeline
+
+    global _model, _model_loaded
+    texts = [_normalize_text(t) for t in texts]
+    pipeline = make_pipeline(
+        TfidfVectorizer(ngram_range=(1, 2), min_df=2, sublinear_tf=True, max_features=50000),
+        LogisticRegression(max_iter=1000, class_weight="balanced"),
+    )
+    report: Dict[str, float] = {"documents": float(len(texts))}
+    smallest_class = min(labels.count(label) for label in set(labels)) if labels else 0
+    if smallest_class >= 5:
+        report["cv_accuracy"] = round(float(cross_val_score(pipeline, texts, list(labels), cv=5).mean()), 3)
+    pipeline.fit(texts, list(labels))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "wb") as f:
+        pickle.dump(pipeline, f)
+    with _model_lock:
+        _model, _model_loaded = pipeline, True
+    return report
+
+
+def _model_classification(text: str, scores: Dict[str, float]) -> Optional[Classification]:
+    model = _load_model()
+    if model is None:
+        return None
+    try:
+        probabilities = model.predict_proba([_normalize_text(text)])[0]
+    except Exception as e:
+        logger.warning("Document classifier model failed: %s", e)
+        return None
+    best = max(range(len(probabilities)), key=lambda i: probabilities[i])
+    return Classification(str(model.classes_[best]), round(float(probabilities[best]), 3), "model", scores)
+
+
+def classify_document(text: str, filename: str = "") -> Classification:
+    """Classify a document by keyword scores, then the trained model if keywords are not confident."""
+    scores = keyword_scores(text, filename)
+    result = _keyword_classification(scores)
+    if result.confidence >= getattr(settings, "doc_classifier_min_confidence", 0.6):
+        return result
+    model_result = _model_classification(text, scores)
+    if model_result is not None and model_result.confidence > result.confidence:
+        return model_result
+    return result
+
+
+def is_confident(result: Classification) -> bool:
+    """True if the classification is good enough to skip LLM detection."""
+    return result.label != UNKNOWN and result.confidence >= getattr(settings, "doc_classifier_min_confidence", 0.6)
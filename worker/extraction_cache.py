@@ -0,0 +1,168 @@
+"""On-disk cache of document extraction results, keyed by file content hash."""
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 hex digest of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Content-addressed JSON cache with size-bounded LRU eviction.
+
+    Each entry is one JSON file under `directory`. A file's mtime is its LRU clock (bumped
+    on every hit), so recency survives restarts and the cache is shared by every worker
+    process on the host. When the total size passes `max_bytes`, the least recently used
+    entries are deleted until the cache is back under 90% of the limit.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._size_bytes: Optional[int] = None  # computed on first write
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(file_path: str, kind: str, version: str) -> str:
+        """Cache key for a file: content hash plus extraction kind and extractor version."""
+        return hashlib.sha256(f"{file_sha256(file_path)}:{kind}:{version}".encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for `key`, or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            value = None
+        except (OSError, ValueError) as e:
+            logger.warning("Discarding unreadable extraction cache entry %s: %s", path, e)
+            self._remove(path)
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store `value` under `key`, evicting old entries if the cache is over its size limit."""
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            size = os.path.getsize(tmp_path)
+            # An overwritten entry's bytes are replaced, not added
+            try:
+                size -= os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Could not write extraction cache entry %s: %s", path, e)
+            self._remove(tmp_path)
+            return
+        with self._lock:
+            if self._size_bytes is None:
+                self._size_bytes = self._scan_size()
+            else:
+                self._size_bytes += size
+            if self._size_bytes > self.max_bytes:
+                self._evict()
+
+    def _scan_entries(self):
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._scan_entries())
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until under 90% of max_bytes. Caller holds the lock."""
+        entries = sorted(self._scan_entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            if self._remove(path):
+                total -= size
+                self.evictions += 1
+        self._size_bytes = total
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters for this process plus the current on-disk size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "size_bytes": self._size_bytes if self._size_bytes is not None else self._scan_size(),
+                "max_bytes": self.max_bytes,
+            }
+
+
+_cache: Optional[ExtractionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """Process-wide extraction cache, or None when disabled (EXTRACTION_CACHE_ENABLED=false)."""
+    global _cache
+    if not getattr(settings, "extraction_cache_enabled", True):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ExtractionCache(
+                    directory=getattr(settings, "extraction_cache_dir", "./cache/extraction"),
+                    max_bytes=getattr(settings, "extraction_cache_max_bytes", 256 * 1024 * 1024),
+                )
+            except OSError as e:
+                logger.warning("Extraction cache disabled: %s", e)
+                return None
+        return _cache
@@ -0,0 +1,334 @@
+"""Single-pass field extraction from document text.
+
+The label keywords of every pattern for a document type (e.g. "account", "company",
+"registration") are compiled into one trie-shaped trigger regex that is run once over the
+lowercased text. Only at trigger hits are the full field patterns tried, anchored at that
+position, so cost stays close to a single scan however many fields we look for. Every
+match is kept as a candidate with its character offset and (when page texts are supplied)
+its page number. A value ends at a tab or run of spaces (table columns, Excel cells) or at
+the next "Label:" on the line, and the scan continues right after each label, so several
+fields on one line are all found. Pattern sets are per document type on top of a common set, and can be
+extended with register_patterns().
+"""
+import bisect
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Pattern, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class FieldPattern:
+    """A label pattern for one field. `pattern` must have exactly one capturing group: the value."""
+    field_name: str
+    pattern: str
+    confidence: float = 0.8
+
+
+@dataclass
+class FieldMatch:
+    """One candidate value found in the text."""
+    field_name: str
+    value: str
+    confidence: float
+    offset: int
+    page: Optional[int] = None
+
+
+def _patterns(field_name: str, patterns: Sequence[str], confidence: float = 0.8) -> List[FieldPattern]:
+    return [FieldPattern(field_name, p, confidence) for p in patterns]
+
+
+# Common field patterns for supplier documents
+COMMON_PATTERNS: List[FieldPattern] = (
+    _patterns("company_name", [
+        r"Company\s+Name[:\s]+([^\n]+)",
+        r"Business\s+Name[:\s]+([^\n]+)",
+        r"Trading\s+Name[:\s]+([^\n]+)",
+    ])
+    + _patterns("registration_number", [
+        r"Registration\s+Number[:\s]+([^\n]+)",
+        r"Company\s+Registration[:\s]+([^\n]+)",
+        r"Reg\s+No[:\s]+([^\n]+)",
+    ])
+    + _patterns("vat_number", [
+        r"VAT\s+Number[:\s]+([^\n]+)",
+        r"VAT\s+Reg[:\s]+([^\n]+)",
+    ])
+    + _patterns("contact_person", [
+        r"Contact\s+Person[:\s]+([^\n]+)",
+        r"Responsible\s+Person[:\s]+([^\n]+)",
+    ])
+    + _patterns("phone", [
+        r"Telephone[:\s]+([^\n]+)",
+        r"Phone[:\s]+([^\n]+)",
+        r"Contact\s+Number[:\s]+([^\n]+)",
+    ])
+    + _patterns("email", [
+        r"Email[:\s]+([^\n]+)",
+        r"E-mail[:\s]+([^\n]+)",
+    ])
+    + _patterns("address", [
+        r"Physical\s+Address[:\s]+([^\n]+)",
+        r"Address[:\s]+([^\n]+)",
+    ])
+)
+
+# Extra patterns per document type (keys from document_type_key)
+DOCUMENT_TYPE_PATTERNS: Dict[str, List[FieldPattern]] = {
+    "cipc": (
+        _patterns("registration_number", [r"\b(\d{4}\s*/\s*\d{6}\s*/\s*\d{2})\b"], 0.9)
+        + _patterns("company_name", [r"Enterprise\s+Name[:\s]+([^\n]+)"], 0.9)
+        + _patterns("entity_type", [r"Enterprise\s+Type[:\s]+([^\n]+)"])
+        + _patterns("registration_date", [r"Registration\s+Date[:\s]+([^\n]+)"])
+    ),
+    "sars": (
+        _patterns("tax_reference_number", [
+            r"Income\s+Tax\s+(?:Reference\s+)?(?:Number|No\.?)[:\s]+(\d[\d\s]{8,12})",
+            r"Tax\s+(?:Reference\s+)?(?:Number|No\.?)[:\s]+(\d[\d\s]{8,12})",
+        ], 0.9)
+        + _patterns("taxpayer_name", [
+            r"Taxpayer\s+Name[:\s]+([^\n]+)",
+            r"Entity\s+Name[:\s]+([^\n]+)",
+            r"Name\s+of\s+Taxpayer[:\s]+([^\n]+)",
+        ], 0.9)
+        + _patterns("purpose", [r"Purpose(?:\s+of\s+Request)?[:\s]+([^\n]+)"])
+        + _patterns("issue_date", [r"Date\s+of\s+Issue[:\s]+([^\n]+)", r"Issue\s+Date[:\s]+([^\n]+)"])
+        + _patterns("expiry_date", [r"Expiry\s+Date[:\s]+([^\n]+)", r"Valid\s+(?:Until|To)[:\s]+([^\n]+)"])
+    ),
+    "bbbee": (
+        _patterns("bbbee_level", [
+            r"B-BBEE\s+Status(?:\s+Level)?[:\s]+(?:Level\s+)?(\w+)",
+            r"BBBEE\s+Status(?:\s+Level)?[:\s]+(?:Level\s+)?(\w+)",
+            r"BEE\s+Level[:\s]+(\w+)",
+        ], 0.9)
+        + _patterns("black_ownership", [r"Black\s+Ownership(?:\s+Percentage)?[:\s]+(\d+(?:[.,]\d+)?\s*%)"])
+        + _patterns("black_female_ownership", [
+            r"Black\s+(?:Female|Women)(?:\s+Ownership)?(?:\s+Percentage)?[:\s]+(\d+(?:[.,]\d+)?\s*%)",
+        ])
+        + _patterns("expiry_date", [
+            r"Expiry\s+Date[:\s]+([^\n]+)",
+            r"Valid\s+(?:Until|To)[:\s]+([^\n]+)",
+            r"Date\s+of\s+Expiry[:\s]+([^\n]+)",
+        ])
+    ),
+    "bank": (
+        _patterns("account_number", [r"Acc(?:ount)?\s*(?:Number|No\.?)[:\s]*(\d[\d\s]{6,18})"], 0.9)
+        + _patterns("branch_code", [
+            r"Universal\s+Branch\s+(?:Code|Number|No\.?)[:\s]*(\d{6})",
+            r"Branch\s+(?:Code|Number|No\.?)[:\s]*(\d{6})",
+        ], 0.9)
+        + _patterns("account_holder", [
+            r"Account\s+(?:Holder|Name)[:\s]+([^\n]+)",
+            r"Name\s+of\s+Account\s+Holder[:\s]+([^\n]+)",
+        ])
+        + _patterns("account_type", [r"Type\s+of\s+Account[:\s]+([^\n]+)", r"Account\s+Type[:\s]+([^\n]+)"])
+    ),
+}
+
+
+def document_type_key(document_type: str) -> Optional[str]:
+    """Map a document type label ("companyRegistration", "bank confirmation", ...) to a pattern-set key."""
+    doc_type = (document_type or "").lower().replace(" ", "").replace("_", "").replace("-", "")
+    if "bank" in doc_type:
+        return "bank"
+    if "cipc" in doc_type or "registration" in doc_type:
+        return "cipc"
+    if "tax" in doc_type or "sars" in doc_type or "goodstanding" in doc_type:
+        return "sars"
+    if "bbbee" in doc_type or "bee" in doc_type:
+        return "bbbee"
+    return None
+
+
+_REGEX_META = set("\\()[]{}?*+.|^$")
+# Column gap inside a captured value: tab or two or more spaces
+_VALUE_GAP = re.compile(r"\t| {2,}")
+
+
+def _literal_prefix(pattern: str) -> str:
+    """Lowercased literal text a pattern must start with ("" if it starts with a class or group)."""
+    prefix = ""
+    for i, ch in enumerate(pattern):
+        if ch in _REGEX_META:
+            if ch in "?*{" and prefix:
+                prefix = prefix[:-1]  # last literal is optional/repeated
+            break
+        prefix += ch
+    return prefix.lower() if len(prefix) >= 2 else ""
+
+
+def _lower_pattern(pattern: str) -> str:
+    """Lowercase literal letters in a regex, leaving escapes such as \\S or \\D untouched."""
+    return re.sub(r"(\\.)|([A-Z])", lambda m: m.group(1) or m.group(2).lower(), pattern)
+
+
+def _trigger_form(pattern: str) -> str:
+    """Pattern rewritten to run inside the trigger: lowercased, capturing groups made non-capturing."""
+    return _lower_pattern(re.sub(r"(?<!\\)\((?!\?)", "(?:", pattern))
+
+
+def _trie_regex(words: Sequence[str]) -> str:
+    """Regex matching any of `words`, factored as a trie so each position costs a few char checks."""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        alternatives = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alternatives:
+            return ""
+        optional = "" in node
+        if len(alternatives) == 1 and not optional:
+            return alternatives[0]
+        return f"(?:{'|'.join(alternatives)}){'?' if optional else ''}"
+
+    return build(trie)
+
+
+class _CompiledPatternSet:
+    """Trigger regex plus the anchored field patterns to try at each kind of trigger hit."""
+
+    def __init__(self, patterns: Sequence[FieldPattern]):
+        by_first_char: Dict[str, List[Tuple[str, Pattern, FieldPattern]]] = {}
+        free_alternatives = []
+        self.free: Dict[str, Tuple[Pattern, FieldPattern]] = {}
+        for i, fp in enumerate(patterns):
+            anchored = re.compile(fp.pattern, re.IGNORECASE)
+            prefix = _literal_prefix(fp.pattern)
+            if prefix:
+                by_first_char.setdefault(prefix[0], []).append((prefix, anchored, fp))
+            else:
+                # No literal label to trigger on: the (lowercased) pattern itself joins the trigger
+                name = f"f{i}"
+                free_alternatives.append(f"(?P<{name}>{_trigger_form(fp.pattern)})")
+                self.free[name] = (anchored, fp)
+        self.by_first_char = by_first_char
+        keywords = sorted({prefix for entries in by_first_char.values() for prefix, _, _ in entries})
+        alternatives = [f"(?P<kw>{_trie_regex(keywords)})"] if keywords else []
+        self.trigger = re.compile("|".join(alternatives + free_alternatives))
+
+
+class FieldExtractionEngine:
+    """Compiles the pattern set for each document type once and scans text in a single pass."""
+
+    def __init__(self):
+        self._extra: Dict[str, List[FieldPattern]] = {k: list(v) for k, v in DOCUMENT_TYPE_PATTERNS.items()}
+        self._compiled: Dict[Optional[str], _CompiledPatternSet] = {}
+        self._lock = threading.Lock()
+
+    def register_patterns(self, document_type: str, patterns: Sequence[FieldPattern]) -> None:
+        """Add patterns for a document type key ("cipc", "sars", "bbbee", "bank" or a new key)."""
+        for fp in patterns:
+            if re.compile(fp.pattern).groups != 1:
+                raise ValueError(f"Pattern for {fp.field_name} must have exactly one capturing group: {fp.pattern}")
+        with self._lock:
+            self._extra.setdefault(document_type, []).extend(patterns)
+            self._compiled.pop(document_type, None)
+
+    def _compiled_for(self, key: Optional[str]) -> _CompiledPatternSet:
+        with self._lock:
+            compiled = self._compiled.get(key)
+            if compiled is None:
+                # Document-type patterns first so their more specific labels win at the same position
+                patterns = self._extra.get(key, []) + COMMON_PATTERNS if key else list(COMMON_PATTERNS)
+                compiled = _CompiledPatternSet(patterns)
+                self._compiled[key] = compiled
+            return compiled
+
+    def extract(self, text: str, document_type: str = "", page_offsets: Optional[List[int]] = None) -> List[FieldMatch]:
+        """Return every field candidate in `text`, in text order.
+
+        `page_offsets` holds the start offset of each page in `text`; when given, each
+        candidate gets its 1-based page number.
+        """
+        if not text:
+            return []
+        compiled = self._compiled_for(document_type_key(document_type))
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # A few non-ASCII characters change length when lowercased; keep offsets aligned
+            lowered = "".join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+
+        matches = []
+        seen = set()
+        pos = 0
+        while True:
+            hit = compiled.trigger.search(lowered, pos)
+            if hit is None:
+                break
+            start = hit.start()
+            match = None
+            if hit.lastgroup == "kw":
+                for prefix, anchored, fp in compiled.by_first_char.get(lowered[start], []):
+                    if lowered.startswith(prefix, start):
+                        match = anchored.match(text, start)
+                        if match:
+                            break
+            else:
+                anchored, fp = compiled.free[hit.lastgroup]
+                match = anchored.match(text, start)
+
+            # Labels inside a match ("Physical Address:" then "Address:") are scanned too, so the
+            # next trigger search starts right after this hit, not after the match
+            pos = start + 1
+            if not match or match.group(1) is None:
+                continue
+            value_start = match.start(1)
+            value = text[value_start:self._value_end(compiled, text, lowered, value_start, match.end(1))].strip()
+            if not value or (fp.field_name, value_start) in seen:
+                continue
+            seen.add((fp.field_name, value_start))
+            page = bisect.bisect_right(page_offsets, start) if page_offsets else None
+            matches.append(FieldMatch(fp.field_name, value, fp.confidence, value_start, page))
+        return matches
+
+    @staticmethod
+    def _label_at(compiled: _CompiledPatternSet, text: str, lowered: str, position: int) -> bool:
+        """True if a field label followed by ':' starts at `position` ("Registration Number:")."""
+        for prefix, anchored, _ in compiled.by_first_char.get(lowered[position], []):
+            if lowered.startswith(prefix, position):
+                match = anchored.match(text, position)
+                if match and match.group(1) is not None and ":" in text[position:match.start(1)]:
+                    return True
+        return False
+
+    def _value_end(self, compiled: _CompiledPatternSet, text: str, lowered: str, start: int, end: int) -> int:
+        """Where a captured value really ends: at the first column gap or the next "Label:"."""
+        gap = _VALUE_GAP.search(text, start, end)
+        if gap and text[start:gap.start()].strip():
+            end = gap.start()
+        pos = start + 1
+        while pos < end:
+            hit = compiled.trigger.search(lowered, pos, end)
+            if hit is None:
+                break
+            if hit.lastgroup == "kw" and self._label_at(compiled, text, lowered, hit.start()):
+                return hit.start()
+            pos = hit.start() + 1
+        return end
+
+    def extract_pages(self, pages: Sequence[str], document_type: str = "") -> List[FieldMatch]:
+        """Scan page texts (joined with newlines) and tag each candidate with its page number."""
+        offsets = []
+        position = 0
+        for page in pages:
+            offsets.append(position)
+            position += len(page) + 1
+        return self.extract("\n".join(pages), document_type, page_offsets=offsets)
+
+
+_engine = FieldExtractionEngine()
+
+
+def get_field_engine() -> FieldExtractionEngine:
+    """Process-wide engine (compiled patterns are shared)."""
+    return _engine
+
+
+def register_patterns(document_type: str, patterns: Sequence[FieldPattern]) -> None:
+    """Extend the pattern set for a document type on the shared engine."""
+    _engine.register_patterns(document_type, patterns)
@@ -0,0 +1,222 @@
+"""Fuzzy matching of form values (company name, account name, address) against document text.
+
+The supplier types "Acme Trading (Pty) Ltd" on the form; the CIPC certificate says
+"ACME TRADING PROPRIETARY LIMITED", the bank letter "ACME TRADING PTY LTD" and the address
+is "12 Main Rd" instead of "12 Main Road". Values are normalized first (case, punctuation,
+'&' -> 'and', legal suffixes stripped, street abbreviations expanded), then scored 0-100
+against candidate lines of the text. Names are scored per line, with any "Label:" prefix
+removed, by token-sort ratio, so extra words on the line ("Acme" vs "Acme Mining Holdings")
+lower the score. Addresses are scored by how many of their words a line, or a short run of
+consecutive lines (addresses wrap), covers; the street number and postal code must agree.
+
+Scores of MATCH_THRESHOLD and above are MATCH, PARTIAL_THRESHOLD and above PARTIAL, anything
+lower MISMATCH. The result carries the best matching text and its character span.
+"""
+import re
+from dataclasses import asdict, dataclass
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+MATCH = "MATCH"
+PARTIAL = "PARTIAL"
+MISMATCH = "MISMATCH"
+
+MATCH_THRESHOLD = 90.0
+PARTIAL_THRESHOLD = 70.0
+
+# Candidate runs of up to this many consecutive lines (addresses span several lines)
+_MAX_WINDOW_LINES = 4
+# Lines longer than this are running prose, not a name or address field
+_MAX_CANDIDATE_CHARS = 240
+
+# Longest first, so "proprietary limited" is stripped before "limited"
+LEGAL_SUFFIXES = [
+    "proprietary limited", "pty limited", "pty ltd", "pty", "limited", "ltd",
+    "soc ltd", "soc", "rf", "npc", "inc", "incorporated", "cc", "close corporation",
+    "sole proprietor", "and co", "co",
+]
+_SUFFIX_PATTERN = re.compile(
+    r"(?:\s(?:" + "|".join(re.escape(s) for s in sorted(LEGAL_SUFFIXES, key=len, reverse=True)) + r"))+$"
+)
+
+_STREET_ABBREVIATIONS = {
+    "rd": "road", "st": "street", "str": "street", "ave": "avenue", "av": "avenue",
+    "dr": "drive", "cres": "crescent", "cr": "crescent", "ln": "lane", "pl": "place",
+    "blvd": "boulevard", "hwy": "highway", "ext": "extension", "bldg": "building",
+    "cnr": "corner", "ste": "suite", "fl": "floor", "flr": "floor",
+}
+# Words that carry no identity in an address ("Unit 4", "Physical Address:")
+_ADDRESS_NOISE = {"unit", "suite", "floor", "building", "address", "physical", "postal", "registered", "office", "the"}
+_POSTAL_CODE = re.compile(r"\b\d{4}\b")
+# "Account Holder:", "Name of Company :" - a short label before the value on the same line
+_FIELD_LABEL = re.compile(r"^\s*[A-Za-z][A-Za-z.'/()\- ]{0,40}?\s*:\s*(?=\S)")
+_STREET_NUMBER = re.compile(r"\b(\d{1,5})[a-z]?\s+[a-z]")
+
+
+@dataclass
+class MatchResult:
+    """Best fuzzy match of an expected value in a text. `span` is (start, end) in the text."""
+    status: str
+    score: float
+    expected: str
+    matched_text: Optional[str] = None
+    span: Optional[Tuple[int, int]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+# ----------------------------
+# NORMALIZATION
+# ----------------------------
+def _basic_normalize(value: str) -> str:
+    value = (value or "").lower().replace("&", " and ")
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9]+", " ", value)).strip()
+
+
+def normalize_company_name(name: str) -> str:
+    """Lowercase, punctuation removed, trading-as part and legal suffixes ("(Pty) Ltd", "CC") stripped."""
+    value = re.split(r"\b(?:t/a|trading as)\b", (name or "").lower())[0]
+    value = _basic_normalize(value)
+    stripped = _SUFFIX_PATTERN.sub("", " " + value).strip()
+    return stripped or value
+
+
+def normalize_address(address: str) -> str:
+    """Lowercase, punctuation removed, street abbreviations expanded, filler words dropped."""
+    tokens = [_STREET_ABBREVIATIONS.get(token, token) for token in _basic_normalize(address).split()]
+    return " ".join(token for token in tokens if token not in _ADDRESS_NOISE)
+
+
+def address_components(address: str) -> Dict[str, Any]:
+    """Street number, postal code and the remaining words of a normalized address."""
+    normalized = normalize_address(address)
+    postal = _POSTAL_CODE.findall(normalized)
+    number = _STREET_NUMBER.search(normalized)
+    return {
+        "street_number": number.group(1) if number else None,
+        "postal_code": postal[-1] if postal else None,
+        "words": [token for token in normalized.split() if not token.isdigit()],
+    }
+
+
+# ----------------------------
+# SCORING
+# ----------------------------
+def _ratio(a: str, b: str) -> float:
+    if not a and not b:
+        return 100.0
+    return 100.0 * SequenceMatcher(None, a, b).ratio()
+
+
+@lru_cache(maxsize=4096)
+def _similar_token(token: str, other: str) -> bool:
+    return abs(len(other) - len(token)) <= 2 and _ratio(token, other) >= 85
+
+
+def _token_coverage(expected_tokens: List[str], candidate_tokens: set) -> float:
+    """Percentage of expected tokens present in the candidate (allowing an OCR slip per token)."""
+    if not expected_tokens:
+        return 0.0
+    covered = sum(
+        1 for token in expected_tokens
+        if token in candidate_tokens or any(_similar_token(token, other) for other in candidate_tokens)
+    )
+    return 100.0 * covered / len(expected_tokens)
+
+
+def strip_label(value: str) -> str:
+    """The value part of a "Label: value" line (the line itself if it has no short label)."""
+    m = _FIELD_LABEL.match(value or "")
+    return value[m.end():] if m and len(m.group(0).split()) <= 5 else value
+
+
+def token_sort_ratio(a: str, b: str) -> float:
+    """0-100 similarity of the two strings with their tokens sorted: word order does not
+    matter, but every extra or missing word lowers the score."""
+    return _ratio(" ".join(sorted(a.split())), " ".join(sorted(b.split())))
+
+
+def _name_score(expected: str, candidate: str) -> float:
+    # Suffixes and the field label are not part of the name; any other word on either side counts against it
+    expected_name = normalize_company_name(expected)
+    candidate_name = normalize_company_name(strip_label(candidate))
+    if not expected_name or not candidate_name:
+        return 0.0
+    return max(_ratio(expected_name, candidate_name), token_sort_ratio(expected_name, candidate_name))
+
+
+def _address_score(expected: str, candidate: str) -> float:
+    want, have = address_components(expected), address_components(candidate)
+    if not have["words"]:
+        return 0.0
+    score = _token_coverage(want["words"], set(have["words"]))
+    # Conflicting street numbers or postal codes are different addresses, however similar the words
+    if want["street_number"] and have["street_number"] and want["street_number"] != have["street_number"]:
+        score = min(score, 50.0)
+    elif want["street_number"] and not have["street_number"]:
+        score *= 0.85
+    if want["postal_code"] and have["postal_code"] and want["postal_code"] != have["postal_code"]:
+        score = min(score, 60.0)
+    return score
+
+
+# ----------------------------
+# SEARCH
+# ----------------------------
+def candidate_lines(text: str) -> List[Optional[Tuple[int, int]]]:
+    """(start, end) of each line of `text` stripped, or None for blank or over-long lines."""
+    lines = []
+    position = 0
+    for line in (text or "").split("\n"):
+        stripped = line.strip()
+        if stripped and len(stripped) <= _MAX_CANDIDATE_CHARS:
+            start = position + line.index(stripped)
+            lines.append((start, start + len(stripped)))
+        else:
+            lines.append(None)
+        position += len(line) + 1
+    return lines
+
+
+def _status(score: float) -> str:
+    if score >= MATCH_THRESHOLD:
+        return MATCH
+    if score >= PARTIAL_THRESHOLD:
+        return PARTIAL
+    return MISMATCH
+
+
+def _best_match(expected: str, text: str, scorer, max_lines: int) -> MatchResult:
+    best_score, best_span = 0.0, None
+    lines = candidate_lines(text)
+    for i, first in enumerate(lines):
+        if first is None:
+            continue
+        # Runs of up to max_lines consecutive lines starting here; a run only grows from a line
+        # that shares something with the expected value
+        for j in range(i, min(i + max_lines, len(lines))):
+            if lines[j] is None:
+                break
+            start, end = first[0], lines[j][1]
+            score = scorer(expected, text[start:end])
+            # Prefer the shortest span at equal score (the line itself rather than a run around it)
+            if score > best_score or (score == best_score and best_span and end - start < best_span[1] - best_span[0]):
+                best_score, best_span = score, (start, end)
+            if score == 0:
+                break
+    score = round(best_score, 1)
+    if best_span is None:
+        return MatchResult(MISMATCH, 0.0, expected)
+    return MatchResult(_status(score), score, expected, text[best_span[0]:best_span[1]], best_span)
+
+
+def match_company_name(expected: str, text: str) -> MatchResult:
+    """Best match of a company or account name among single lines of `text` (a single value works too)."""
+    return _best_match(expected, text, _name_score, max_lines=1)
+
+
+def match_address(expected: str, text: str) -> MatchResult:
+    """Best match of an address among lines and runs of consecutive lines of `text`."""
+    return _best_match(expected, text, _address_score, max_lines=_MAX_WINDOW_LINES)
@@ -0,0 +1,190 @@
+"""Image normalization before OCR.
+
+Phone photos of certificates arrive as 12-megapixel colour JPEGs, often rotated via EXIF and
+a few degrees off square. Tesseract is far slower on those than on a small, clean bitmap and
+reads them worse. normalize_for_ocr turns any page image into a bilevel image at the OCR
+resolution:
+
+1. EXIF orientation applied (phones store portrait shots sideways plus a rotate flag)
+2. grayscale
+3. downscaled to the target DPI (never upscaled)
+4. adaptive threshold (handles shadows and uneven lighting a global threshold cannot)
+5. deskew (small rotations, estimated from the ink's horizontal projection profile)
+
+OpenCV is used when installed (opencv-python-headless); otherwise the same steps run on
+NumPy, and without NumPy only steps 1-3 run.
+"""
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from config import settings
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is a hard dependency of opencv/pandas in practice
+    np = None
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+logger = logging.getLogger(__name__)
+
+# A4 long side in inches. Used to estimate the resolution of photos whose DPI tag is
+# missing or meaningless (cameras write 72).
+_PAGE_LONG_SIDE_INCHES = 11.7
+_MIN_TRUSTED_DPI = 150
+
+_THRESHOLD_BLOCK = 31  # odd; neighbourhood size in pixels at ~200-300 DPI (about one text line)
+_THRESHOLD_OFFSET = 15  # a pixel is ink if darker than its neighbourhood mean minus this
+_DESKEW_MAX_ANGLE = 5.0
+_DESKEW_STEP = 0.25
+_DESKEW_MIN_ANGLE = 0.3  # below this, rotating costs more than it helps
+_DESKEW_SAMPLE_SIDE = 1000  # the angle is estimated on a copy at most this long
+
+
+def image_dpi(image: Image.Image) -> Optional[float]:
+    """DPI recorded in the image file, or None when absent."""
+    dpi = image.info.get("dpi")
+    if isinstance(dpi, (tuple, list)) and dpi:
+        dpi = dpi[0]
+    try:
+        return float(dpi) if dpi else None
+    except (TypeError, ValueError):
+        return None
+
+
+def page_dpi(image: Image.Image, source_dpi: Optional[float] = None) -> float:
+    """Resolution of a full-page image: `source_dpi` if trustworthy, else estimated from the page size."""
+    if source_dpi and source_dpi >= _MIN_TRUSTED_DPI:
+        return source_dpi
+    return max(image.size) / _PAGE_LONG_SIDE_INCHES
+
+
+def _scale_factor(image: Image.Image, source_dpi: Optional[float], target_dpi: int) -> float:
+    """Downscale factor to reach target_dpi (1.0 means leave as is)."""
+    return min(target_dpi / page_dpi(image, source_dpi), 1.0)
+
+
+def _resize(image: Image.Image, scale: float) -> Image.Image:
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    if cv2 is not None:
+        resized = cv2.resize(np.asarray(image), size, interpolation=cv2.INTER_AREA)
+        return Image.fromarray(resized)
+    return image.resize(size, Image.LANCZOS, reducing_gap=3.0)
+
+
+def _adaptive_threshold(gray: "np.ndarray") -> "np.ndarray":
+    """Bilevel image (0 ink, 255 background) using a local-mean threshold."""
+    if cv2 is not None:
+        return cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, _THRESHOLD_BLOCK, _THRESHOLD_OFFSET
+        )
+    # Box mean from an integral image: O(1) per pixel regardless of block size
+    half = _THRESHOLD_BLOCK // 2
+    padded = np.pad(gray.astype(np.int64), half + 1, mode="edge")
+    integral = padded.cumsum(axis=0).cumsum(axis=1)
+    h, w = gray.shape
+    b = _THRESHOLD_BLOCK
+    window_sum = (
+        integral[b:b + h, b:b + w]
+        - integral[0:h, b:b + w]
+        - integral[b:b + h, 0:w]
+        + integral[0:h, 0:w]
+    )
+    mean = window_sum / (b * b)
+    return np.where(gray > mean - _THRESHOLD_OFFSET, 255, 0).astype(np.uint8)
+
+
+def _estimate_skew(binary: "np.ndarray") -> float:
+    """Rotation in degrees that straightens the page (counter-clockwise positive, as PIL's rotate expects).
+
+    Text lines make the horizontal projection of the ink sharply peaked when the page is
+    straight. Each candidate angle is scored by shearing the ink coordinates (a good
+    approximation of rotation at a few degrees) and summing the squared row histogram.
+    """
+    step = max(1, int(np.ceil(max(binary.shape) / _DESKEW_SAMPLE_SIDE)))
+    ys, xs = np.nonzero(binary[::step, ::step] == 0)
+    if len(ys) < 100:
+        return 0.0
+    ys = ys.astype(np.float64)
+    xs = xs.astype(np.float64)
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(-_DESKEW_MAX_ANGLE, _DESKEW_MAX_ANGLE + _DESKEW_STEP / 2, _DESKEW_STEP):
+        rows = np.round(ys + xs * np.tan(np.radians(angle))).astype(np.int64)
+        counts = np.bincount(rows - rows.min())
+        score = float(np.dot(counts, counts))
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return -best_angle if best_angle else 0.0
+
+
+def normalize_for_ocr(
+    image: Image.Image,
+    source_dpi: Optional[float] = None,
+    target_dpi: Optional[int] = None,
+) -> Tuple[Image.Image, Dict[str, float]]:
+    """Return (OCR-ready image, per-step timings in ms plus the corrected `skew_angle`).
+
+    `source_dpi` is the image's resolution if known (rasterized PDF pages pass their render
+    DPI, so they are not resampled); `target_dpi` defaults to OCR_DPI. The input image is
+    not modified.
+    """
+    target_dpi = target_dpi or getattr(settings, "ocr_dpi", 200)
+    timings: Dict[str, float] = {}
+    clock = time.perf_counter()
+
+    def lap(step: str):
+        nonlocal clock
+        now = time.perf_counter()
+        timings[step] = round((now - clock) * 1000, 1)
+        clock = now
+
+    image = ImageOps.exif_transpose(image)
+    lap("exif")
+
+    image = image.convert("L")  # before resampling: one channel instead of three
+    lap("grayscale")
+
+    scale = _scale_factor(image, source_dpi, target_dpi)
+    if scale < 0.95:
+        image = _resize(image, scale)
+    lap("resample")
+
+    if np is None:
+        return image, timings
+
+    binary = _adaptive_threshold(np.asarray(image))
+    lap("threshold")
+
+    angle = _estimate_skew(binary)
+    image = Image.fromarray(binary)
+    if abs(angle) >= _DESKEW_MIN_ANGLE:
+        image = image.rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=255)
+    lap("deskew")
+    timings["skew_angle"] = angle
+    return image, timings
+
+
+def preprocess_for_ocr(
+    image: Image.Image,
+    source_dpi: Optional[float] = None,
+    target_dpi: Optional[int] = None,
+) -> Image.Image:
+    """normalize_for_ocr when OCR_PREPROCESS is on (the default), else the image unchanged.
+
+    Per-step timings are logged at DEBUG level.
+    """
+    if not getattr(settings, "ocr_preprocess", True):
+        return image
+    normalized, timings = normalize_for_ocr(image, source_dpi=source_dpi, target_dpi=target_dpi)
+    logger.debug(
+        "OCR preprocess %sx%s -> %sx%s: %s",
+        image.width, image.height, normalized.width, normalized.height,
+        ", ".join(f"{step}={value}" for step, value in timings.items()),
+    )
+    return normalized
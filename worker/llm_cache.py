@@ -0,0 +1,215 @@
+"""Persistent cache of LLM responses (SQLite), keyed by model, generation options and prompt.
+
+Re-running analysis for a supplier rebuilds the same prompts from the same document text and
+form data; each costs tens of seconds on a CPU-only Ollama. Responses are stored with the
+time the generation took, so stats() can report the inference time hits have saved.
+
+Entries expire after LLM_CACHE_TTL_SECONDS. When the stored responses exceed
+LLM_CACHE_MAX_BYTES, the least recently used are deleted until the cache is under 90% of
+the limit. The database is shared by every worker process on the host (WAL mode); each
+process has its own connection, including children forked after the cache was opened.
+
+A request can skip the cache (neither read nor written) with `with llm_cache_bypassed():`.
+The flag is a context variable, so it follows the request into executor threads started
+with contextvars.copy_context() (see ollama_client.run_in_analysis_executor).
+"""
+import contextlib
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_bypass: contextvars.ContextVar = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+@contextlib.contextmanager
+def llm_cache_bypassed(bypass: bool = True):
+    """Skip the LLM cache for calls made inside this block (when `bypass` is true)."""
+    token = _bypass.set(bypass)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+class LLMCache:
+    """SQLite-backed response cache with TTL expiry and size-bounded LRU eviction."""
+
+    def __init__(self, path: str, ttl_seconds: int, max_bytes: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " response TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " elapsed REAL NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, options: Dict[str, Any], prompt: str) -> str:
+        """Cache key: model name, generation options (temperature, format, ...) and prompt."""
+        options_json = json.dumps(options or {}, sort_keys=True, default=str)
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{model}\n{options_json}\n{prompt_hash}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for `key`, or None on a miss or an expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, elapsed, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[2] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            self.saved_seconds += row[1]
+            return row[0]
+
+    def put(self, key: str, model: str, response: str, elapsed: float) -> None:
+        """Store a response and the seconds it took to generate; evict if over the size limit."""
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, elapsed, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, elapsed, now, now),
+            )
+            self._conn.commit()
+            if self._size_bytes() > self.max_bytes:
+                self._evict(now)
+
+    def _size_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones until under 90% of max_bytes. Caller holds the lock."""
+        cursor = self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        self.evictions += cursor.rowcount
+        total = self._size_bytes()
+        target = int(self.max_bytes * 0.9)
+        if total > target:
+            doomed = []
+            for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+                if total <= target:
+                    break
+                doomed.append((key,))
+                total -= size
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+            self.evictions += len(doomed)
+        self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and inference seconds saved (this process) plus on-disk totals."""
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 1),
+                "entries": entries,
+                "size_bytes": size,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+# Caches inherited through fork: kept referenced (never used or closed) in the child
+_inherited: list = []
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Process-wide LLM cache, or None when disabled (LLM_CACHE_ENABLED=false)."""
+    global _cache
+    if not getattr(settings, "llm_cache_enabled", True):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = LLMCache(
+                    path=getattr(settings, "llm_cache_path", "./cache/llm_cache.sqlite3"),
+                    ttl_seconds=getattr(settings, "llm_cache_ttl_seconds", 7 * 24 * 3600),
+                    max_bytes=getattr(settings, "llm_cache_max_bytes", 64 * 1024 * 1024),
+                )
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("LLM cache disabled: %s", e)
+                return None
+        return _cache
+
+
+def _forget_cache() -> None:
+    # SQLite connections must not be used across fork: a forked child (bulk verification pool)
+    # opens its own. The parent's is not closed here, so its locks and WAL state are untouched.
+    global _cache, _cache_lock
+    if _cache is not None:
+        _inherited.append(_cache)
+    _cache = None
+    _cache_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_cache)
+
+
+def cached_llm_call(model: str, options: Dict[str, Any], prompt: str, call: Callable[[], str]) -> str:
+    """Return the cached response for (model, options, prompt), or run `call` and cache its result.
+
+    `call` performs the actual generation (and should take the Ollama slot itself, so cache
+    hits never wait for one). Empty responses are not cached.
+    """
+    cache = get_llm_cache()
+    if cache is None or _bypass.get():
+        return call()
+    key = cache.make_key(model, options, prompt)
+    try:
+        cached = cache.get(key)
+    except sqlite3.Error as e:
+        logger.warning("LLM cache read failed: %s", e)
+        cached = None
+    if cached is not None:
+        return cached
+    start = time.perf_counter()
+    response = call()
+    if response:
+        try:
+            cache.put(key, model, response, time.perf_counter() - start)
+        except sqlite3.Error as e:
+            logger.warning("LLM cache write failed: %s", e)
+    return response
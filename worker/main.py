@@ -1,5 +1,7 @@
 """FastAPI main application for the worker service."""
 import asyncio
+import contextvars
+import json
 import os
 
 # Set CrewAI/Ollama env before any crew_agents import so CrewAI's OpenAI provider hits /v1/chat/completions
@@ -12,12 +14,15 @@ if not os.environ.get("OPENAI_API_BASE") and not os.environ.get("OPENAI_BASE_URL
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import logging
 from datetime import datetime
 import uuid
 
+from singleflight import SingleFlight, request_key
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -53,6 +58,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Warm-up and re-warm tasks started on startup (references kept so they are not garbage collected)
+_background_tasks: set = set()
+
+
 # Create database tables on startup
 @app.on_event("startup")
 async def startup_event():
@@ -65,14 +74,37 @@ async def startup_event():
             logger.warning(f"Database initialization skipped: {e}")
     
     # Log AI configuration
+    ollama_available = False
     try:
         from crew_agents import is_ollama_available
-        logger.info(f"AI Mode: {'Ollama' if is_ollama_available() else 'Fallback'}")
+        ollama_available = is_ollama_available()
+        logger.info(f"AI Mode: {'Ollama' if ollama_available else 'Fallback'}")
     except ImportError:
         logger.warning("Could not import is_ollama_available from crew_agents - using fallback mode")
+
+    # Load the model now rather than on the first supplier request (runs in the background)
+    if ollama_available:
+        from ollama_client import rewarm_periodically, warm_up_model
+        loop = asyncio.get_running_loop()
+        if getattr(settings, "ollama_warmup_on_startup", True):
+            _background_tasks.add(loop.run_in_executor(None, warm_up_model))
+        interval = getattr(settings, "ollama_rewarm_interval_seconds", 0)
+        if interval > 0:
+            _background_tasks.add(asyncio.create_task(rewarm_periodically(interval)))
     logger.info("Worker service started successfully - Redis/Celery not required for AI processing")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the model re-warm timer and the bulk verification pool, close the Ollama HTTP pool."""
+    for task in _background_tasks:
+        task.cancel()
+    from bulk_verify import shutdown_bulk_pool
+    from ollama_client import close_http_client
+    shutdown_bulk_pool()
+    close_http_client()
+
+
 # Pydantic models
 class DocumentInfo(BaseModel):
     """Model for document information."""
@@ -137,11 +169,18 @@ async def health():
         
         # Worker status (Redis/Celery not used)
         worker_status = "active"
+
+        # Ready once the model is loaded in Ollama (first analysis will not pay the load time)
+        model_ready = False
+        if ai_mode == "ollama":
+            from ollama_client import model_resident
+            model_ready = await asyncio.get_running_loop().run_in_executor(None, model_resident)
         
         return {
             "status": "healthy",
             "timestamp": datetime.utcnow().isoformat(),
             "worker_status": worker_status,
+            "ready": model_ready,
             "ai_mode": ai_mode,
             "crewai_available": crewai_available,
             "ollama_model": settings.ollama_model if ai_mode == "ollama" else None,
@@ -158,6 +197,31 @@ async def health():
         }
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the Ollama model is loaded, 503 while it is loading or unavailable."""
+    from ollama_client import model_resident
+    if await asyncio.get_running_loop().run_in_executor(None, model_resident):
+        return {"ready": True, "ollama_model": settings.ollama_model}
+    raise HTTPException(status_code=503, detail=f"Ollama model {settings.ollama_model} is not loaded yet")
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the extraction and LLM response caches (per worker process)."""
+    from extraction_cache import get_extraction_cache
+    from llm_cache import get_llm_cache
+    cache = get_extraction_cache()
+    llm_cache = get_llm_cache()
+    return {
+        "extraction": cache.stats() if cache else {"enabled": False},
+        "llm": llm_cache.stats() if llm_cache else {"enabled": False},
+        "coalesced_requests": {
+            flights.name: flights.stats() for flights in (_analysis_flights, _verification_flights)
+        },
+    }
+
+
 @app.post("/upload")
 async def upload_document(file: UploadFile = File(...)):
     """Upload a document for processing."""
@@ -186,52 +250,25 @@ async def upload_document(file: UploadFile = File(...)):
                 with open(file_path, 'r', encoding='utf-8') as f:
                     extracted_content = f.read()
             elif file_extension == '.pdf':
-                # First try to extract text from PDF using PyPDF2
+                # Single pass: embedded text where present, OCR for scanned pages. Low-confidence
+                # pages are re-OCRed at a higher DPI inside the extractor (no second full pass here).
                 pdf_result = extractor.extract_from_pdf(file_path)
                 extracted_content = pdf_result.get("text", "")
-                
-                # If text extraction failed or returned very little, use OCR
-                if not extracted_content or len(extracted_content.strip()) < 50:
-                    logger.info(f"PDF text extraction returned minimal content ({len(extracted_content)} chars), using OCR for {file.filename}")
-                    try:
-                        # Convert PDF pages to images and use OCR
-                        from pdf2image import convert_from_path
-                        import tempfile
-                        
-                        # Convert PDF to images
-                        images = convert_from_path(file_path, dpi=300)
-                        ocr_text = ""
-                        
-                        for i, image in enumerate(images):
-                            # Save image temporarily
-                            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp_file:
-                                image_path = tmp_file.name
-                                image.save(image_path, 'PNG')
-                                
-                                # Extract text using OCR
-                                page_text = extractor.extract_from_image(image_path)
-                                if page_text:
-                                    ocr_text += f"\n--- Page {i+1} ---\n{page_text}\n"
-                                
-                                # Clean up temp file
-                                os.unlink(image_path)
-                        
-                        if ocr_text and len(ocr_text.strip()) > 50:
-                            extracted_content = ocr_text
-                            logger.info(f"Successfully extracted {len(extracted_content)} characters using OCR")
-                        else:
-                            extracted_content = f"PDF document uploaded: {file.filename} (OCR extraction returned minimal text)"
-                    except ImportError:
-                        logger.warning("pdf2image not available, cannot use OCR for PDF. Install with: pip install pdf2image")
-                        if not extracted_content:
-                            extracted_content = f"PDF document uploaded: {file.filename} (text extraction failed, OCR not available)"
-                    except Exception as e:
-                        logger.error(f"Error during OCR extraction: {e}")
-                        if not extracted_content:
-                            extracted_content = f"PDF document uploaded: {file.filename} (OCR extraction failed: {str(e)})"
+                page_sources = pdf_result.get("page_sources", [])
+                ocr_pages = page_sources.count("ocr")
+                if ocr_pages:
+                    logger.info(f"OCR used for {ocr_pages} of {pdf_result.get('page_count', 0)} pages of {file.filename}")
+                    # OCR'd pages are marked "--- Page N ---", as the OCR fallback always did
+                    extracted_content = "".join(
+                        f"\n--- Page {number} ---\n{page_text}\n" if source == "ocr" else f"{page_text}\n"
+                        for number, (page_text, source) in enumerate(zip(pdf_result.get("pages", []), page_sources), start=1)
+                        if page_text.strip()
+                    )
+                if len(extracted_content.strip()) < 50:
+                    extracted_content = f"PDF document uploaded: {file.filename} (OCR extraction returned minimal text)"
             elif file_extension in ['.docx']:
                 extracted_content = extractor.extract_from_docx(file_path)
-            elif file_extension in ['.png', '.jpg', '.jpeg', '.tiff', '.bmp']:
+            elif file_extension in ['.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp']:
                 extracted_content = extractor.extract_from_image(file_path)
             else:
                 extracted_content = f"Document uploaded: {file.filename} (content extraction not supported for this file type)"
@@ -269,29 +306,61 @@ async def upload_document(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 
+# Concurrent identical requests join the computation already in flight (see singleflight.py)
+_verification_flights = SingleFlight("verify-bank-statement")
+_analysis_flights = SingleFlight("process-document")
+
+
+async def _verify_bank_statement_bytes(
+    content: bytes, filename: str, no_cache: bool = False, form_data: Optional[Dict[str, Any]] = None
+) -> dict:
+    """Write an uploaded statement to a temp file, verify it on a worker thread, then remove the file."""
+    from bank_statement_verifier import verify_bank_statement
+    from llm_cache import llm_cache_bypassed
+    upload_dir = settings.upload_dir
+    os.makedirs(upload_dir, exist_ok=True)
+    file_path = os.path.join(upload_dir, f"{uuid.uuid4()}_{filename}")
+    try:
+        with open(file_path, "wb") as buffer:
+            buffer.write(content)
+        loop = asyncio.get_event_loop()
+        with llm_cache_bypassed(no_cache):
+            context = contextvars.copy_context()
+        return await loop.run_in_executor(None, lambda p=file_path: context.run(verify_bank_statement, p, form_data))
+    finally:
+        if os.path.isfile(file_path):
+            try:
+                os.remove(file_path)
+            except OSError as e:
+                logger.warning(f"Could not remove temp file {file_path}: {e}")
+
+
 @app.post("/verify-bank-statement")
-async def verify_bank_statement_upload(file: UploadFile = File(...)):
+async def verify_bank_statement_upload(
+    file: UploadFile = File(...),
+    account_name: Optional[str] = Form(None),
+    no_cache: bool = False,
+):
     """
     Single step: upload a bank statement or bank confirmation letter PDF and get verification.
     One request with the file returns document info + pass/fail + extracted fields.
+    Optional form field account_name is fuzzy-matched against the account holder (name_match).
+    ?no_cache=true skips the LLM response cache.
     """
     if not file.filename or not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="A PDF file is required.")
-    file_path = None
     try:
-        upload_dir = settings.upload_dir
-        os.makedirs(upload_dir, exist_ok=True)
         document_id = str(uuid.uuid4())
-        file_path = os.path.join(upload_dir, f"{document_id}_{file.filename}")
         content = await file.read()
         file_size = len(content)
-        with open(file_path, "wb") as buffer:
-            buffer.write(content)
-        from bank_statement_verifier import verify_bank_statement
-        loop = asyncio.get_event_loop()
+        form_data = {"bankAccountName": account_name} if account_name else None
         timeout_sec = getattr(settings, "verify_bank_statement_timeout", 300)
+        # Identical uploads in flight (double submit, client retry) share one verification
         verification = await asyncio.wait_for(
-            loop.run_in_executor(None, lambda p=file_path: verify_bank_statement(p)),
+            _verification_flights.do(
+                request_key(content, no_cache, form_data),
+                lambda: _verify_bank_statement_bytes(content, file.filename, no_cache, form_data),
+            ),
             timeout=timeout_sec,
         )
         return {
@@ -301,6 +370,7 @@ async def verify_bank_statement_upload(file: UploadFile = File(...)):
             "passed": verification["passed"],
             "reasons": verification["reasons"],
             "extracted": verification["extracted"],
+            "name_match": verification.get("name_match"),
         }
     except asyncio.TimeoutError:
         timeout_sec = getattr(settings, "verify_bank_statement_timeout", 300)
@@ -314,12 +384,84 @@ async def verify_bank_statement_upload(file: UploadFile = File(...)):
     except Exception as e:
         logger.exception(f"Bank statement verification failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if file_path and os.path.isfile(file_path):
-            try:
-                os.remove(file_path)
-            except OSError as e:
-                logger.warning(f"Could not remove temp file {file_path}: {e}")
+
+
+@app.post("/verify-bank-statements")
+async def verify_bank_statements_upload(
+    files: List[UploadFile] = File(...),
+    account_names: Optional[str] = Form(None),
+    no_cache: bool = False,
+):
+    """
+    Bulk verification: upload many bank statement / confirmation letter PDFs in one multipart request.
+    Streams one JSON line per file as it finishes (application/x-ndjson), then a summary line with
+    pass/fail counts and throughput. Files are verified in the bulk process pool (BULK_VERIFY_WORKERS);
+    LLM calls still share the OLLAMA_MAX_PARALLEL limit.
+    Optional form field account_names is a JSON object {filename: expected account holder}.
+    ?no_cache=true skips the LLM response cache.
+    """
+    from bulk_verify import BulkSummary, error_result, get_bulk_pool, to_json_line, verify_file
+    max_files = getattr(settings, "bulk_verify_max_files", 500)
+    if len(files) > max_files:
+        raise HTTPException(status_code=400, detail=f"At most {max_files} files per request.")
+    try:
+        names = json.loads(account_names) if account_names else {}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="account_names must be a JSON object {filename: account name}.")
+    if not isinstance(names, dict):
+        raise HTTPException(status_code=400, detail="account_names must be a JSON object {filename: account name}.")
+
+    upload_dir = settings.upload_dir
+    os.makedirs(upload_dir, exist_ok=True)
+    rejected, saved = [], []
+    for upload in files:
+        filename = upload.filename or "unnamed"
+        if not filename.lower().endswith(".pdf"):
+            rejected.append(error_result(filename, "A PDF file is required."))
+            continue
+        file_path = os.path.join(upload_dir, f"{uuid.uuid4()}_{os.path.basename(filename)}")
+        with open(file_path, "wb") as buffer:
+            buffer.write(await upload.read())
+        name = names.get(filename)
+        saved.append((file_path, filename, {"bankAccountName": name} if name else None))
+    logger.info("Bulk verification of %d file(s) (%d rejected)", len(saved), len(rejected))
+
+    async def verify(pool, file_path: str, filename: str, form_data: Optional[Dict[str, Any]]) -> dict:
+        try:
+            return await asyncio.wrap_future(pool.submit(verify_file, file_path, form_data, no_cache, filename))
+        except Exception as e:
+            return error_result(filename, f"Verification worker failed: {e}")
+
+    async def results():
+        summary = BulkSummary()
+        pool = get_bulk_pool()
+        futures = [asyncio.ensure_future(verify(pool, *item)) for item in saved]
+        try:
+            for result in rejected:
+                summary.add(result)
+                yield to_json_line(result)
+            for next_done in asyncio.as_completed(futures):
+                result = await next_done
+                summary.add(result)
+                yield to_json_line(result)
+            totals = summary.to_dict()
+            logger.info(
+                "Bulk verification done: %d file(s) in %.1fs (%s files/min)",
+                totals["files"], totals["elapsed_seconds"], totals["files_per_minute"],
+            )
+            yield to_json_line(totals)
+        finally:
+            # Client gone or done: drop queued work and the temp files
+            for future in futures:
+                future.cancel()
+            for file_path, _, _ in saved:
+                if os.path.isfile(file_path):
+                    try:
+                        os.remove(file_path)
+                    except OSError as e:
+                        logger.warning(f"Could not remove temp file {file_path}: {e}")
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
 
 
 @app.post("/process-document")
@@ -347,22 +489,34 @@ async def process_document(request: dict):
         # Initialize document type mismatch variables
         document_type_mismatch = False
         document_type_detected = "unknown"
+        structured_analysis = None
         
         try:
-            from crew_agents import is_ollama_available, analyze_document_with_ollama
+            from crew_agents import is_ollama_available, analyze_document_with_ollama_async
+            from llm_cache import llm_cache_bypassed
             
             if is_ollama_available():
                 logger.info("Using direct Ollama for AI analysis (skipping CrewAI to avoid OpenAI issues)")
                 # Use Ollama directly - pass form_data for validation
                 # Skip CrewAI as it may try to use OpenAI instead of Ollama
                 # Pass filename as part of document_type context for fallback detection
-                ai_results = analyze_document_with_ollama(content, document_type, supplier_name, form_data, filename=filename)
+                # Runs on the analysis thread pool; LLM calls wait for a free Ollama slot.
+                # "no_cache": true re-runs every LLM call instead of using cached responses.
+                # Concurrent requests for the same content, type and form data share one analysis.
+                no_cache = bool(request.get("no_cache"))
+                analysis_key = request_key(content, document_type, supplier_name, form_data, filename, no_cache)
+                with llm_cache_bypassed(no_cache):
+                    ai_results = await _analysis_flights.do(
+                        analysis_key,
+                        lambda: analyze_document_with_ollama_async(content, document_type, supplier_name, form_data, filename=filename),
+                    )
                 analysis_results = ai_results["analysis_results"]
                 compliance_results = ai_results["compliance_results"]
                 risk_assessment = ai_results["risk_assessment"]
                 decision_summary = "Analysis completed using Ollama"
                 document_type_mismatch = ai_results.get("document_type_mismatch", False)
                 document_type_detected = ai_results.get("document_type_detected", "unknown")
+                structured_analysis = ai_results.get("structured_analysis")
                 logger.info(f"Ollama analysis completed with mode: {ai_results.get('mode')}, mismatch: {document_type_mismatch}")
             else:
                 # Fallback to simplified processing
@@ -403,6 +557,10 @@ async def process_document(request: dict):
             "email_sent": bool(supplier_email)
         }
         
+        # Per-check PASS/FAIL, compliance status and risk level (single-call analysis only)
+        if structured_analysis:
+            response["structured_analysis"] = structured_analysis
+        
         # Include document type mismatch info if available (from Ollama analysis)
         if document_type_mismatch or document_type_detected != "unknown":
             response["document_type_mismatch"] = document_type_mismatch
@@ -0,0 +1,220 @@
+"""OCR backends used by OCRExtractor.
+
+Two interchangeable engines, selected with OCR_BACKEND:
+- "pytesseract" (default): runs the tesseract CLI for every image (process spawn + temp files).
+- "tesserocr": keeps a Tesseract C API handle alive per thread and passes PIL images
+  in memory. Optional dependency: pip install tesserocr.
+
+Both offer recognize() (whole-image text and confidence, optionally with a page segmentation
+mode and a character whitelist) and recognize_lines() (text lines with word boxes, used by
+region-of-interest OCR).
+"""
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import pytesseract
+from PIL import Image
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Tesseract page segmentation mode for a single line of text (e.g. one field value)
+PSM_SINGLE_LINE = 7
+
+Box = Tuple[int, int, int, int]  # left, top, right, bottom in pixels
+
+
+@dataclass
+class OcrWord:
+    text: str
+    confidence: float
+    box: Box
+
+
+@dataclass
+class OcrLine:
+    """One text line: words joined by spaces, mean word confidence, and the union of word boxes."""
+    text: str
+    confidence: float
+    box: Box
+    words: List[OcrWord] = field(default_factory=list)
+
+
+def _make_line(words: List[OcrWord]) -> OcrLine:
+    confidences = [w.confidence for w in words if w.confidence >= 0]
+    return OcrLine(
+        text=" ".join(w.text for w in words),
+        confidence=sum(confidences) / len(confidences) if confidences else 0.0,
+        box=(
+            min(w.box[0] for w in words),
+            min(w.box[1] for w in words),
+            max(w.box[2] for w in words),
+            max(w.box[3] for w in words),
+        ),
+        words=words,
+    )
+
+
+class PytesseractEngine:
+    """Tesseract via the pytesseract CLI wrapper."""
+
+    name = "pytesseract"
+
+    def __init__(self, lang: str = "eng"):
+        self.lang = lang
+
+    def _words_by_line(
+        self, image: Image.Image, psm: Optional[int] = None, whitelist: Optional[str] = None
+    ) -> Dict[Tuple[int, int, int], List[OcrWord]]:
+        """Run Tesseract once and group its word table by (block, paragraph, line)."""
+        config = []
+        if psm is not None:
+            config.append(f"--psm {psm}")
+        if whitelist:
+            config.append(f"-c tessedit_char_whitelist={whitelist}")
+        data = pytesseract.image_to_data(
+            image, lang=self.lang, config=" ".join(config), output_type=pytesseract.Output.DICT
+        )
+        lines: Dict[Tuple[int, int, int], List[OcrWord]] = {}
+        for i, word in enumerate(data["text"]):
+            word = (word or "").strip()
+            if not word:
+                continue
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            left, top = data["left"][i], data["top"][i]
+            lines.setdefault(key, []).append(OcrWord(
+                text=word,
+                confidence=float(data["conf"][i]),
+                box=(left, top, left + data["width"][i], top + data["height"][i]),
+            ))
+        return lines
+
+    def recognize(
+        self, image: Image.Image, psm: Optional[int] = None, whitelist: Optional[str] = None
+    ) -> Tuple[str, float]:
+        """OCR an image in one Tesseract call and return (text, mean word confidence 0-100).
+
+        Text is rebuilt from Tesseract's word table: words joined per line, lines per
+        paragraph, paragraphs separated by a blank line (the layout image_to_string gives).
+        `psm` and `whitelist` are passed to Tesseract as --psm and tessedit_char_whitelist.
+        """
+        lines = self._words_by_line(image, psm=psm, whitelist=whitelist)
+        confidences = [w.confidence for words in lines.values() for w in words if w.confidence >= 0]
+
+        text = ""
+        previous_paragraph = None
+        for (block_num, par_num, _), words in lines.items():
+            if previous_paragraph is not None and (block_num, par_num) != previous_paragraph:
+                text += "\n"
+            text += " ".join(w.text for w in words) + "\n"
+            previous_paragraph = (block_num, par_num)
+        confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        return text.strip(), confidence
+
+    def recognize_lines(self, image: Image.Image) -> List[OcrLine]:
+        """OCR an image and return its text lines, top to bottom, with word boxes."""
+        return [_make_line(words) for words in self._words_by_line(image).values()]
+
+
+class TesserocrEngine:
+    """In-process Tesseract via tesserocr. One API handle per thread, reused across images."""
+
+    name = "tesserocr"
+
+    def __init__(self, lang: str = "eng"):
+        import tesserocr  # noqa: F401 - fail at construction if the binding is missing
+        self.lang = lang
+        self._local = threading.local()
+
+    def _api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            import tesserocr
+            api = tesserocr.PyTessBaseAPI(lang=self.lang)
+            self._local.api = api
+        return api
+
+    def recognize(
+        self, image: Image.Image, psm: Optional[int] = None, whitelist: Optional[str] = None
+    ) -> Tuple[str, float]:
+        """OCR an image in memory and return (text, mean word confidence 0-100).
+
+        `psm` and `whitelist` apply to this call only; the handle is reset afterwards.
+        """
+        import tesserocr
+        api = self._api()
+        if psm is not None:
+            api.SetPageSegMode(psm)
+        if whitelist:
+            api.SetVariable("tessedit_char_whitelist", whitelist)
+        try:
+            api.SetImage(image)
+            text = api.GetUTF8Text() or ""
+            confidences = [c for c in api.AllWordConfidences() if c >= 0]
+        finally:
+            api.Clear()
+            if psm is not None:
+                api.SetPageSegMode(tesserocr.PSM.AUTO)
+            if whitelist:
+                api.SetVariable("tessedit_char_whitelist", "")
+        confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        return text.strip(), float(confidence)
+
+    def recognize_lines(self, image: Image.Image) -> List[OcrLine]:
+        """OCR an image and return its text lines, top to bottom, with word boxes."""
+        import tesserocr
+        api = self._api()
+        lines: List[OcrLine] = []
+        words: List[OcrWord] = []
+        try:
+            api.SetImage(image)
+            api.Recognize()
+            iterator = api.GetIterator()
+            level = tesserocr.RIL.WORD
+            for word in tesserocr.iterate_level(iterator, level):
+                text = (word.GetUTF8Text(level) or "").strip()
+                if not text:
+                    continue
+                if word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE) and words:
+                    lines.append(_make_line(words))
+                    words = []
+                words.append(OcrWord(text=text, confidence=float(word.Confidence(level)), box=word.BoundingBox(level)))
+        finally:
+            api.Clear()
+        if words:
+            lines.append(_make_line(words))
+        return lines
+
+
+_ENGINES = {
+    PytesseractEngine.name: PytesseractEngine,
+    TesserocrEngine.name: TesserocrEngine,
+}
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def create_ocr_engine(backend: str, lang: Optional[str] = None):
+    """Build an engine by name ("pytesseract" or "tesserocr")."""
+    engine_cls = _ENGINES.get(backend)
+    if engine_cls is None:
+        raise ValueError(f"Unknown OCR backend '{backend}'. Use one of: {', '.join(_ENGINES)}")
+    return engine_cls(lang=lang or getattr(settings, "ocr_language", "eng"))
+
+
+def get_ocr_engine():
+    """Process-wide OCR engine for OCR_BACKEND; falls back to pytesseract if tesserocr is unavailable."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            backend = (getattr(settings, "ocr_backend", "pytesseract") or "pytesseract").lower()
+            try:
+                _engine = create_ocr_engine(backend)
+            except (ImportError, ValueError) as e:
+                logger.warning("OCR backend '%s' unavailable (%s); using pytesseract", backend, e)
+                _engine = create_ocr_engine(PytesseractEngine.name)
+        return _engine
@@ -1,16 +1,34 @@
 """OCR and document extraction capabilities."""
 import os
 import io
+import re
 import contextlib
-from typing import Dict, List, Any, Optional
+from datetime import date, datetime
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Any, Callable, Iterator, Optional, Tuple
 from pathlib import Path
-import pytesseract
-from PIL import Image
+from PIL import Image, ImageOps
 import PyPDF2
 from docx import Document
+from docx.table import Table
 import openpyxl
 from pydantic import BaseModel
 
+from config import settings
+from extraction_cache import get_extraction_cache
+from ocr_engines import PSM_SINGLE_LINE, OcrLine, get_ocr_engine
+from ocr_regions import NumericField, RegionTemplate, get_region_template
+from image_preprocess import image_dpi, page_dpi, preprocess_for_ocr
+from field_extractor import get_field_engine
+
+# Bump whenever extraction output changes so cached results from older code are not reused.
+EXTRACTOR_VERSION = "6"
+
+# A PDF page whose text layer is shorter than this is treated as image-only and OCRed
+_MIN_PAGE_TEXT_LENGTH = 40
+
 
 class ExtractedField(BaseModel):
     """Model for extracted field data."""
@@ -18,6 +36,7 @@ class ExtractedField(BaseModel):
     value: str
     confidence: float
     source_page: Optional[int] = None
+    offset: Optional[int] = None
 
 
 class DocumentExtractionResult(BaseModel):
@@ -29,6 +48,282 @@ class DocumentExtractionResult(BaseModel):
     processing_time: float
 
 
+# ----------------------------
+# STRUCTURED CELL FIELDS (Excel / DOCX tables)
+# ----------------------------
+def _cell_text(value: Any) -> str:
+    """Render a spreadsheet cell value as text (whole floats without .0, dates as ISO)."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == datetime.min.time() else value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value).strip()
+
+
+def _dedupe_merged(cells: List[str]) -> List[str]:
+    """python-docx repeats a merged cell once per grid column; keep one copy."""
+    deduped = []
+    for cell in cells:
+        if not deduped or cell != deduped[-1]:
+            deduped.append(cell)
+    return deduped
+
+
+def _looks_like_label(cell: str) -> bool:
+    return len(cell) <= 60 and any(ch.isalpha() for ch in cell) and not any(ch.isdigit() for ch in cell)
+
+
+def _pair_fields(cells: List[str], source_page: Optional[int]) -> List[Dict[str, Any]]:
+    """Label/value fields from one row of cells.
+
+    A cell ending in ":" labels the next non-empty cell; a row of exactly two cells whose
+    first cell reads like a label ("Company Name", "VAT Number") is a pair as well.
+    """
+    cells = [c for c in cells if c]
+    pairs = []
+    if len(cells) == 2 and _looks_like_label(cells[0]):
+        pairs.append((cells[0], cells[1]))
+    else:
+        for label, value in zip(cells, cells[1:]):
+            if label.endswith(":") and len(label) > 1 and not value.endswith(":"):
+                pairs.append((label, value))
+    fields = []
+    for label, value in pairs:
+        field_name = re.sub(r"[^a-z0-9]+", "_", label.rstrip(":").lower()).strip("_")
+        if field_name:
+            fields.append({
+                "field_name": field_name,
+                "value": value,
+                "confidence": 0.7,
+                "source_page": source_page,
+            })
+    return fields
+
+
+def _ocr_settings_key() -> str:
+    """The OCR settings that change extraction output, for the extraction cache key."""
+    return "|".join(str(getattr(settings, name, "")) for name in (
+        "ocr_language", "ocr_dpi", "ocr_high_dpi", "ocr_min_confidence", "ocr_preprocess",
+    ))
+
+
+# ----------------------------
+# PAGE-PARALLEL OCR
+# ----------------------------
+# Scanned PDFs are OCRed one page per task in a shared process pool. Tesseract uses OpenMP
+# internally, so each pool worker is limited to a single Tesseract thread; N workers then
+# use N cores instead of oversubscribing the machine with N x cores threads.
+# Pages submitted to the pool are capped process-wide at one per worker (_page_slots), so
+# concurrent requests share the workers instead of each queueing its whole document.
+_ocr_pool: Optional[ProcessPoolExecutor] = None
+_ocr_pool_lock = threading.Lock()
+_page_slots: Optional[threading.BoundedSemaphore] = None
+
+
+def _ocr_worker_count() -> int:
+    """Configured OCR pool size (OCR_WORKERS); 0 or less means one worker per CPU core."""
+    workers = getattr(settings, "ocr_workers", 0) or 0
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def _init_ocr_worker():
+    """Pool initializer: keep Tesseract single-threaded inside each worker process."""
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def _get_ocr_pool() -> ProcessPoolExecutor:
+    """Return the process-wide OCR pool, creating it on first use."""
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            _ocr_pool = ProcessPoolExecutor(
+                max_workers=_ocr_worker_count(),
+                initializer=_init_ocr_worker,
+            )
+        return _ocr_pool
+
+
+def _get_page_slots() -> threading.BoundedSemaphore:
+    """Process-wide limit on pages submitted to the OCR pool: one per worker."""
+    global _page_slots
+    with _ocr_pool_lock:
+        if _page_slots is None:
+            _page_slots = threading.BoundedSemaphore(_ocr_worker_count())
+        return _page_slots
+
+
+def _bounded_pool_map(pool: Any, func: Callable, arg_tuples: List[tuple], slots: threading.BoundedSemaphore) -> List[Any]:
+    """Like pool.map, but each task holds one of `slots` from submission until it finishes, so
+    no more tasks are pending than the semaphore allows (across all callers). Results are in order."""
+    futures = []
+    for args in arg_tuples:
+        slots.acquire()
+        try:
+            future = pool.submit(func, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        futures.append(future)
+    return [future.result() for future in futures]
+
+
+def _reset_ocr_pool():
+    """Drop a broken pool so the next call starts a fresh one."""
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is not None:
+            _ocr_pool.shutdown(wait=False, cancel_futures=True)
+        _ocr_pool = None
+
+
+def _rasterize_pdf(pdf_path: str, dpi: int, first_page: Optional[int] = None, last_page: Optional[int] = None) -> List[Image.Image]:
+    """Render PDF pages to PIL images with Poppler (all pages unless a range is given)."""
+    from pdf2image import convert_from_path
+    # Suppress Poppler stderr (e.g. "Illegal character in hex string", "Syntax Error") for corrupted PDFs
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stderr(devnull):
+            return convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page)
+
+
+def _pdf_page_count(pdf_path: str) -> Optional[int]:
+    """Page count via Poppler's pdfinfo (works on PDFs PyPDF2 cannot open). None if unavailable."""
+    try:
+        from pdf2image import pdfinfo_from_path
+        return int(pdfinfo_from_path(pdf_path)["Pages"])
+    except Exception:
+        return None
+
+
+def _ocr_image_frame(image_path: str, frame: int) -> Tuple[str, float]:
+    """Decode and OCR one frame of an image file. Runs inside an OCR pool worker."""
+    with Image.open(image_path) as image:
+        image.seek(frame)
+        frame_image = image.copy()  # decodes only this frame
+    try:
+        return _ocr_with_confidence(frame_image, source_dpi=image_dpi(frame_image))
+    finally:
+        frame_image.close()
+
+
+@contextlib.contextmanager
+def _normalized(image: Image.Image, dpi: float) -> Iterator[Image.Image]:
+    """preprocess_for_ocr(image), closed on exit unless it is `image` itself."""
+    normalized = preprocess_for_ocr(image, source_dpi=dpi)
+    try:
+        yield normalized
+    finally:
+        if normalized is not image:
+            normalized.close()
+
+
+def _read_numeric_field(engine, image: Image.Image, lines: List[OcrLine], field: NumericField) -> Optional[str]:
+    """Re-read a labelled number with a digit-whitelisted single-line pass over just the value.
+
+    The value box is the words after the label on the label's line. Returns None if no line
+    has the label or the whitelisted read does not match the field's value pattern.
+    """
+    for line in lines:
+        m = re.search(field.label, line.text, re.IGNORECASE)
+        if not m:
+            continue
+        value_words = []
+        position = 0
+        for word in line.words:
+            start = line.text.find(word.text, position)
+            position = start + len(word.text)
+            if start >= m.end():
+                value_words.append(word)
+        if not value_words:
+            continue
+        pad = 4
+        box = (
+            max(0, min(w.box[0] for w in value_words) - pad),
+            max(0, min(w.box[1] for w in value_words) - pad),
+            min(image.width, max(w.box[2] for w in value_words) + pad),
+            min(image.height, max(w.box[3] for w in value_words) + pad),
+        )
+        with image.crop(box) as value_image:
+            text, _ = engine.recognize(value_image, psm=PSM_SINGLE_LINE, whitelist=field.whitelist)
+        value = field.parse(text)
+        if value:
+            return value
+    return None
+
+
+def _page_windows(pages, window: int) -> Iterator[Tuple[int, int]]:
+    """Group sorted page numbers into (first, last) runs of consecutive pages, at most `window` long."""
+    first = last = None
+    for page_number in pages:
+        if first is not None and page_number == last + 1 and page_number - first < window:
+            last = page_number
+            continue
+        if first is not None:
+            yield first, last
+        first = last = page_number
+    if first is not None:
+        yield first, last
+
+
+def _ocr_with_confidence(
+    image: Image.Image,
+    source_dpi: Optional[float] = None,
+    target_dpi: Optional[int] = None,
+) -> Tuple[str, float]:
+    """Normalize an image for OCR (see image_preprocess) and OCR it with the configured backend.
+
+    Returns (text, mean confidence 0-100). Uploaded images are downscaled to OCR_DPI; PDF pages
+    pass their render DPI as both source and target, so they keep their resolution.
+    """
+    normalized = preprocess_for_ocr(image, source_dpi=source_dpi, target_dpi=target_dpi)
+    try:
+        return get_ocr_engine().recognize(normalized)
+    finally:
+        if normalized is not image:
+            normalized.close()
+
+
+def _ocr_page_adaptive(
+    pdf_path: str,
+    page_number: int,
+    image: Image.Image,
+    dpi: int,
+    high_dpi: int,
+    min_confidence: float,
+) -> Tuple[str, float]:
+    """OCR a page rendered at the base DPI; re-render at `high_dpi` only if Tesseract is unsure.
+
+    The higher-DPI result replaces the first one only when its confidence is better.
+    """
+    text, confidence = _ocr_with_confidence(image, source_dpi=dpi, target_dpi=dpi)
+    if confidence >= min_confidence or high_dpi <= 0:
+        return text, confidence
+    for high_res in _rasterize_pdf(pdf_path, high_dpi, first_page=page_number, last_page=page_number):
+        try:
+            high_text, high_confidence = _ocr_with_confidence(high_res, source_dpi=high_dpi, target_dpi=high_dpi)
+        finally:
+            high_res.close()
+        if high_confidence > confidence:
+            return high_text, high_confidence
+    return text, confidence
+
+
+def _ocr_pdf_page(pdf_path: str, page_number: int, dpi: int, high_dpi: int, min_confidence: float) -> Tuple[str, float]:
+    """Rasterize and OCR a single PDF page with DPI escalation. Runs inside an OCR pool worker."""
+    images = _rasterize_pdf(pdf_path, dpi, first_page=page_number, last_page=page_number)
+    try:
+        if not images:
+            return "", 0.0
+        return _ocr_page_adaptive(pdf_path, page_number, images[0], dpi, high_dpi, min_confidence)
+    finally:
+        for image in images:
+            image.close()
+
+
 class OCRExtractor:
     """OCR and document extraction service."""
     
@@ -38,152 +333,530 @@ class OCRExtractor:
         # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
         pass
     
+    def _cached(self, file_path: str, kind: str, extract: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Return the cached extraction result for this file's contents, or run `extract` and cache it.
+
+        The key includes the extractor version, OCR backend and OCR settings (language, DPIs,
+        confidence threshold, preprocessing), since all of them change the output.
+
+        Only results with text are cached, so a failed extraction (e.g. Poppler missing) is retried next time.
+        """
+        cache = get_extraction_cache()
+        if cache is None:
+            return extract()
+        try:
+            key = cache.make_key(file_path, kind, f"{EXTRACTOR_VERSION}/{get_ocr_engine().name}/{_ocr_settings_key()}")
+        except OSError:
+            return extract()
+        result = cache.get(key)
+        if result is not None:
+            return result
+        result = extract()
+        if result.get("text"):
+            cache.put(key, result)
+        return result
+
     def extract_from_image(self, image_path: str) -> str:
-        """Extract text from image using OCR."""
+        """Extract text from image using OCR (every frame of a multi-page TIFF)."""
+        return self.extract_image_pages(image_path)["text"]
+
+    def extract_image_pages(self, image_path: str) -> Dict[str, Any]:
+        """OCR an image file and return the same result shape as extract_from_pdf.
+
+        Multi-frame images (multi-page TIFFs from office scanners and fax software) yield one
+        page per frame, joined the way PDF pages are. Frames are decoded lazily, one per task,
+        and OCRed concurrently on the OCR process pool. Results are cached by file content.
+        """
+        return self._cached(image_path, "image", lambda: self._extract_image(image_path))
+
+    def _extract_image(self, image_path: str) -> Dict[str, Any]:
         try:
-            image = Image.open(image_path)
-            text = pytesseract.image_to_string(image)
-            return text.strip()
+            with Image.open(image_path) as image:
+                frame_count = getattr(image, "n_frames", 1)
+            results = None
+            if frame_count > 1 and _ocr_worker_count() > 1:
+                try:
+                    pool = _get_ocr_pool()
+                    results = _bounded_pool_map(
+                        pool, _ocr_image_frame, [(image_path, frame) for frame in range(frame_count)], _get_page_slots()
+                    )
+                except BrokenProcessPool as e:
+                    print(f"OCR process pool failed, falling back to serial OCR: {e}")
+                    _reset_ocr_pool()
+            if results is None:
+                results = [_ocr_image_frame(image_path, frame) for frame in range(frame_count)]
+            pages = [text for text, _ in results]
+            return {
+                "text": "\n".join(pages).strip(),
+                "page_count": frame_count,
+                "pages": pages,
+                "page_sources": ["ocr"] * frame_count,
+                "page_confidences": [round(confidence, 1) for _, confidence in results],
+            }
         except Exception as e:
             print(f"Error extracting text from image {image_path}: {e}")
-            return ""
+            return {"text": "", "page_count": 0, "pages": [], "page_sources": [], "page_confidences": []}
     
+    def ocr_pdf_pages(
+        self,
+        pdf_path: str,
+        dpi: Optional[int] = None,
+        page_count: Optional[int] = None,
+        pages: Optional[List[int]] = None,
+    ) -> List[str]:
+        """OCR PDF pages and return their texts in page order (see _ocr_pdf_pages)."""
+        return [text for text, _ in self._ocr_pdf_pages(pdf_path, dpi=dpi, page_count=page_count, pages=pages)]
+
+    def _ocr_pdf_pages(
+        self,
+        pdf_path: str,
+        dpi: Optional[int] = None,
+        page_count: Optional[int] = None,
+        pages: Optional[List[int]] = None,
+    ) -> List[Tuple[str, float]]:
+        """OCR PDF pages and return (text, confidence) per page in page order.
+
+        OCRs every page unless `pages` (1-based page numbers) is given. Each page is OCRed
+        once at OCR_DPI; only pages whose mean Tesseract confidence is below
+        OCR_MIN_CONFIDENCE are re-rasterized and OCRed at OCR_HIGH_DPI. Multiple pages are
+        spread across the OCR process pool (see OCR_WORKERS); each worker rasterizes and holds
+        one page, and at most one page per worker is pending across all requests. A single
+        page, or a pool size of 1, is OCRed in this process.
+        """
+        dpi = dpi or getattr(settings, "ocr_dpi", 200)
+        high_dpi = getattr(settings, "ocr_high_dpi", 300)
+        if high_dpi <= dpi:
+            high_dpi = 0
+        min_confidence = getattr(settings, "ocr_min_confidence", 60.0)
+
+        if pages is None:
+            if page_count is None:
+                page_count = _pdf_page_count(pdf_path)
+            pages = list(range(1, page_count + 1)) if page_count else None
+        if pages is not None and len(pages) > 1 and _ocr_worker_count() > 1:
+            try:
+                pool = _get_ocr_pool()
+                return _bounded_pool_map(
+                    pool, _ocr_pdf_page,
+                    [(pdf_path, page, dpi, high_dpi, min_confidence) for page in pages],
+                    _get_page_slots(),
+                )
+            except BrokenProcessPool as e:
+                print(f"OCR process pool failed, falling back to serial OCR: {e}")
+                _reset_ocr_pool()
+        return [
+            _ocr_page_adaptive(pdf_path, page_number, image, dpi, high_dpi, min_confidence)
+            for page_number, image in self.iter_pdf_pages(pdf_path, dpi=dpi, pages=pages)
+        ]
+
+    def iter_pdf_pages(
+        self,
+        pdf_path: str,
+        dpi: int = 200,
+        page_count: Optional[int] = None,
+        pages: Optional[List[int]] = None,
+    ) -> Iterator[Tuple[int, Image.Image]]:
+        """Yield (page_number, image) for PDF pages, rasterizing a small window at a time.
+
+        Renders every page unless `pages` is given. At most OCR_MAX_PAGES_IN_MEMORY pages are
+        rendered per Poppler call and each window is closed before the next one is rendered,
+        so peak memory does not grow with page count.
+        """
+        if pages is None:
+            if page_count is None:
+                page_count = _pdf_page_count(pdf_path)
+            if not page_count:
+                # Page count unknown: let Poppler render (or fail on) the whole document
+                images = _rasterize_pdf(pdf_path, dpi)
+                try:
+                    yield from enumerate(images, start=1)
+                finally:
+                    for image in images:
+                        image.close()
+                return
+            pages = range(1, page_count + 1)
+
+        window = max(1, getattr(settings, "ocr_max_pages_in_memory", 2))
+        for first, last in _page_windows(pages, window):
+            images = _rasterize_pdf(pdf_path, dpi, first_page=first, last_page=last)
+            try:
+                yield from enumerate(images, start=first)
+            finally:
+                for image in images:
+                    image.close()
+
     def _pdf_via_ocr_only(self, pdf_path: str) -> Dict[str, Any]:
         """When PyPDF2 fails (e.g. EOF marker not found), try to extract text via pdf2image + Tesseract."""
         try:
-            from pdf2image import convert_from_path
-            # Suppress Poppler stderr (e.g. "Illegal character in hex string", "Syntax Error") for corrupted PDFs
-            with open(os.devnull, "w") as devnull:
-                with contextlib.redirect_stderr(devnull):
-                    images = convert_from_path(pdf_path, dpi=200)
-            page_count = len(images)
-            ocr_parts = [pytesseract.image_to_string(img) for img in images]
+            ocr_results = self._ocr_pdf_pages(pdf_path)
+            page_count = len(ocr_results)
+            ocr_parts = [text for text, _ in ocr_results]
             text = "\n".join(ocr_parts).strip()
-            return {"text": text, "page_count": page_count, "metadata": {}}
+            return {
+                "text": text,
+                "page_count": page_count,
+                "metadata": {},
+                "pages": ocr_parts,
+                "page_sources": ["ocr"] * page_count,
+                "page_confidences": [round(confidence, 1) for _, confidence in ocr_results],
+            }
         except Exception as e:
             print(f"OCR-only fallback for PDF failed: {e}")
-            return {"text": "", "page_count": 0, "metadata": {}}
+            return {"text": "", "page_count": 0, "metadata": {}, "pages": [], "page_sources": [], "page_confidences": []}
+
+    def extract_from_pdf(
+        self,
+        pdf_path: str,
+        max_pages: Optional[int] = None,
+        max_chars: Optional[int] = None,
+        stop_when: Optional[Callable[[str], bool]] = None,
+    ) -> Dict[str, Any]:
+        """Extract text and metadata from PDF, deciding per page between the text layer and OCR.
+
+        Pages with an embedded text layer keep their PyPDF2 text; only pages whose text layer
+        is missing or too short (scanned/image-only pages) are rasterized and OCRed. The result
+        has the joined `text`, per-page `pages`, and `page_sources` with one of "text", "ocr"
+        or "none" (nothing readable) per page. Results are cached by file content.
+
+        Page-budgeted mode (any of `max_pages`, `max_chars`, `stop_when`): pages are read in
+        order, a few at a time, and reading stops after `max_pages` pages, once the text
+        reaches `max_chars` (the last batch is kept whole), or once `stop_when(text so far)` is true. Only the pages read are
+        rasterized. The result also has `pages_read` and `truncated` (pages were left unread).
+        Results with a `stop_when` callable are not cached.
+        """
+        if max_pages is None and max_chars is None and stop_when is None:
+            return self._cached(pdf_path, "pdf", lambda: self._extract_pdf(pdf_path))
+        extract = lambda: self._extract_pdf_budgeted(pdf_path, max_pages, max_chars, stop_when)
+        if stop_when is not None:
+            return extract()
+        return self._cached(pdf_path, f"pdf-p{max_pages}-c{max_chars}", extract)
+
+    def _text_or_ocr(
+        self, pdf_path: str, page_count: int, texts: Dict[int, str]
+    ) -> List[Tuple[str, str, Optional[float]]]:
+        """Decide per page between the text layer and OCR, for the pages in `texts` (page number ->
+        text layer), in page order. Pages whose text layer is missing or shorter than
+        _MIN_PAGE_TEXT_LENGTH are OCRed and keep the OCR text if it is longer. Returns
+        (text, source, OCR confidence) per page; source is "text", "ocr" or "none"."""
+        resolved = {
+            number: (text, "text" if text.strip() else "none", None) for number, text in texts.items()
+        }
+        image_pages = [number for number in sorted(texts) if len(texts[number].strip()) < _MIN_PAGE_TEXT_LENGTH]
+        if image_pages:
+            try:
+                ocr_results = self._ocr_pdf_pages(pdf_path, page_count=page_count, pages=image_pages)
+                for number, (ocr_text, confidence) in zip(image_pages, ocr_results):
+                    if len(ocr_text.strip()) > len(texts[number].strip()):
+                        resolved[number] = (ocr_text, "ocr", round(confidence, 1))
+            except Exception as e:
+                print(f"OCR fallback for PDF failed (poppler may be missing): {e}")
+        return [resolved[number] for number in sorted(resolved)]
+
+    def _extract_pdf_budgeted(
+        self,
+        pdf_path: str,
+        max_pages: Optional[int],
+        max_chars: Optional[int],
+        stop_when: Optional[Callable[[str], bool]],
+    ) -> Dict[str, Any]:
+        reader = None
+        metadata: Dict[str, str] = {}
+        try:
+            file = open(pdf_path, "rb")
+        except OSError as e:
+            print(f"Error extracting text from PDF {pdf_path}: {e}")
+            return {"text": "", "page_count": 0, "metadata": {}, "pages": [], "page_sources": [],
+                    "page_confidences": [], "pages_read": 0, "truncated": False}
+        with file:
+            try:
+                reader = PyPDF2.PdfReader(file)
+                page_count = len(reader.pages)
+                metadata = {str(k): str(v) for k, v in (reader.metadata or {}).items()}
+            except Exception as e:
+                # Malformed PDF (e.g. "EOF marker not found"): every page goes through OCR
+                print(f"Error extracting text from PDF {pdf_path}: {e}")
+                reader = None
+                page_count = _pdf_page_count(pdf_path) or 0
+
+            last_page = min(page_count, max_pages) if max_pages else page_count
+            # Pages are read in batches the size of the OCR pool, so OCR still runs in parallel
+            batch_size = _ocr_worker_count()
+            page_texts: List[str] = []
+            page_sources: List[str] = []
+            page_confidences: List[Optional[float]] = []
+            length = 0
+            page_number = 1
+            while page_number <= last_page:
+                batch = list(range(page_number, min(page_number + batch_size, last_page + 1)))
+                texts = {}
+                for number in batch:
+                    try:
+                        texts[number] = (reader.pages[number - 1].extract_text() or "") if reader else ""
+                    except Exception:
+                        texts[number] = ""
+                for text, source, confidence in self._text_or_ocr(pdf_path, page_count, texts):
+                    page_texts.append(text)
+                    page_sources.append(source)
+                    page_confidences.append(confidence)
+                    length += len(text) + 1
+                page_number = batch[-1] + 1
+                if max_chars and length >= max_chars:
+                    break
+                if stop_when is not None and stop_when("\n".join(page_texts)):
+                    break
 
-    def extract_from_pdf(self, pdf_path: str) -> Dict[str, Any]:
-        """Extract text and metadata from PDF. Uses embedded text first; if insufficient (e.g. scanned PDF), falls back to OCR."""
-        _MIN_TEXT_LENGTH = 80  # below this we try OCR (scanned/image-only PDFs)
+        return {
+            "text": "\n".join(page_texts).strip(),
+            "page_count": page_count,
+            "metadata": metadata,
+            "pages": page_texts,
+            "page_sources": page_sources,
+            "page_confidences": page_confidences,
+            "pages_read": len(page_texts),
+            "truncated": len(page_texts) < page_count,
+        }
 
+    def _extract_pdf(self, pdf_path: str) -> Dict[str, Any]:
         try:
             with open(pdf_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
                 page_count = len(pdf_reader.pages)
-                metadata = pdf_reader.metadata or {}
-                text = ""
-                for page_num in range(page_count):
-                    text += (pdf_reader.pages[page_num].extract_text() or "") + "\n"
-                text = text.strip()
+                metadata = {str(k): str(v) for k, v in (pdf_reader.metadata or {}).items()}
+                page_texts = [(page.extract_text() or "") for page in pdf_reader.pages]
         except Exception as e:
             print(f"Error extracting text from PDF {pdf_path}: {e}")
             # PyPDF2 can fail on truncated/malformed PDFs (e.g. "EOF marker not found"). Try OCR path.
             return self._pdf_via_ocr_only(pdf_path)
 
-        # Fallback: if embedded text is missing or too short, run OCR on each page (for scanned PDFs)
-        if len(text) < _MIN_TEXT_LENGTH and page_count > 0:
-            try:
-                from pdf2image import convert_from_path
-                with open(os.devnull, "w") as devnull:
-                    with contextlib.redirect_stderr(devnull):
-                        images = convert_from_path(pdf_path, dpi=200)
-                ocr_parts = [pytesseract.image_to_string(img) for img in images]
-                ocr_text = "\n".join(ocr_parts).strip()
-                if len(ocr_text) > len(text):
-                    text = ocr_text
-            except Exception as e:
-                print(f"OCR fallback for PDF failed (poppler may be missing): {e}")
+        resolved = self._text_or_ocr(pdf_path, page_count, dict(enumerate(page_texts, start=1)))
+        page_texts = [text for text, _, _ in resolved]
+        page_sources = [source for _, source, _ in resolved]
+        page_confidences = [confidence for _, _, confidence in resolved]
 
-        return {"text": text.strip(), "page_count": page_count, "metadata": metadata}
+        text = "\n".join(page_texts).strip()
+        return {
+            "text": text,
+            "page_count": page_count,
+            "metadata": metadata,
+            "pages": page_texts,
+            "page_sources": page_sources,
+            "page_confidences": page_confidences,
+        }
     
+    def extract_regions(self, file_path: str, document_type: str) -> Optional[Dict[str, Any]]:
+        """Region-of-interest OCR: read only the parts of a document a header check needs.
+
+        Uses the region template for `document_type` (see ocr_regions; e.g. the top third of
+        page 1 for bank documents). PDF pages with a text layer are not OCRed at all. Otherwise
+        only the template's pages are rasterized and only its regions normalized and OCRed;
+        numeric fields (e.g. the account number) are re-read with a digit-whitelisted
+        single-line pass. If the required fields are still missing, the template pages are
+        OCRed in full. Returns None if the document type has no template, else a dict with
+        `text`, `fields` (field name -> value) and `source` ("text", "roi" or "full_page").
+        Results are cached by file content.
+        """
+        template = get_region_template(document_type)
+        if template is None:
+            return None
+        return self._cached(file_path, f"roi-{template.name}", lambda: self._extract_regions(file_path, template))
+
+    def _pdf_text_layer(self, pdf_path: str, pages: Tuple[int, ...]) -> Dict[int, str]:
+        """Text layer of the given 1-based PDF pages (empty dict if PyPDF2 cannot read the file)."""
+        try:
+            with open(pdf_path, "rb") as file:
+                reader = PyPDF2.PdfReader(file)
+                return {
+                    page_number: reader.pages[page_number - 1].extract_text() or ""
+                    for page_number in pages
+                    if page_number <= len(reader.pages)
+                }
+        except Exception:
+            return {}
+
+    def _template_page_images(self, file_path: str, pages: Tuple[int, ...]) -> Dict[int, Tuple[Image.Image, float]]:
+        """Rasterize (PDF) or decode (image frames) only the given pages, upright.
+
+        Returns page number -> (image, resolution in DPI). The images are not normalized:
+        _extract_regions normalizes each crop, so template regions follow the page layout.
+        """
+        images: Dict[int, Tuple[Image.Image, float]] = {}
+        if file_path.lower().endswith(".pdf"):
+            dpi = getattr(settings, "ocr_dpi", 200)
+            for first, last in _page_windows(pages, len(pages)):
+                for page_number, image in enumerate(_rasterize_pdf(file_path, dpi, first_page=first, last_page=last), start=first):
+                    images[page_number] = (image, dpi)
+            return images
+        with Image.open(file_path) as image:
+            for page_number in pages:
+                if page_number > getattr(image, "n_frames", 1):
+                    break
+                image.seek(page_number - 1)
+                frame = image.copy()
+                # EXIF orientation before cropping: region boxes are fractions of the upright page
+                upright = ImageOps.exif_transpose(frame)
+                if upright is not frame:
+                    frame.close()
+                images[page_number] = (upright, page_dpi(upright, image_dpi(frame)))
+        return images
+
+    def _extract_regions(self, file_path: str, template: RegionTemplate) -> Dict[str, Any]:
+        pages = template.pages
+        if file_path.lower().endswith(".pdf"):
+            text_layer = self._pdf_text_layer(file_path, pages)
+            if text_layer and all(len(text_layer.get(p, "").strip()) >= _MIN_PAGE_TEXT_LENGTH for p in pages):
+                text = "\n".join(text_layer[p] for p in pages).strip()
+                return {"text": text, "fields": template.find_fields(text), "source": "text"}
+
+        try:
+            page_images = self._template_page_images(file_path, pages)
+        except Exception as e:
+            print(f"Region OCR could not render {file_path}: {e}")
+            return {"text": "", "fields": {}, "source": "none"}
+        try:
+            engine = get_ocr_engine()
+            region_texts = []
+            fields: Dict[str, str] = {}
+            for region in template.regions:
+                if region.page not in page_images:
+                    continue
+                page_image, dpi = page_images[region.page]
+                left, top, right, bottom = region.box
+                box = (
+                    int(left * page_image.width), int(top * page_image.height),
+                    int(right * page_image.width), int(bottom * page_image.height),
+                )
+                with page_image.crop(box) as crop, _normalized(crop, dpi) as region_image:
+                    lines = engine.recognize_lines(region_image)
+                    for numeric_field in template.numeric_fields:
+                        if numeric_field.field_name not in fields:
+                            value = _read_numeric_field(engine, region_image, lines, numeric_field)
+                            if value:
+                                fields[numeric_field.field_name] = value
+                region_texts.append("\n".join(line.text for line in lines))
+            text = "\n".join(region_texts).strip()
+            for name, value in template.find_fields(text).items():
+                fields.setdefault(name, value)
+            source = "roi"
+
+            if not all(name in fields for name in template.required):
+                # ROI pass failed (unusual layout): OCR the template pages in full
+                page_texts = []
+                for p in pages:
+                    if p in page_images:
+                        with _normalized(*page_images[p]) as page_image:
+                            page_texts.append(engine.recognize(page_image)[0])
+                text = "\n".join(page_texts).strip()
+                for name, value in template.find_fields(text).items():
+                    fields.setdefault(name, value)
+                source = "full_page"
+            return {"text": text, "fields": fields, "source": source}
+        except Exception as e:
+            print(f"Region OCR failed for {file_path}: {e}")
+            return {"text": "", "fields": {}, "source": "none"}
+        finally:
+            for image, _dpi in page_images.values():
+                image.close()
+
     def extract_from_docx(self, docx_path: str) -> str:
-        """Extract text from DOCX file."""
+        """Extract text from DOCX file (paragraphs and table rows, in document order)."""
+        return self.extract_structured_from_docx(docx_path)["text"]
+
+    def extract_structured_from_docx(self, docx_path: str) -> Dict[str, Any]:
+        """Extract DOCX text plus label/value fields from table rows.
+
+        Table rows become tab-separated text lines; two-cell rows such as
+        "Company Name" / "ACME (Pty) Ltd" (or "Label:" cells) are emitted directly as fields.
+        """
         try:
             doc = Document(docx_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text.strip()
+            lines = []
+            fields = []
+            for block in doc.iter_inner_content():
+                if isinstance(block, Table):
+                    for row in block.rows:
+                        cells = _dedupe_merged([cell.text.strip() for cell in row.cells])
+                        if not any(cells):
+                            continue
+                        lines.append("\t".join(c for c in cells if c))
+                        fields.extend(_pair_fields(cells, source_page=None))
+                else:
+                    lines.append(block.text)
+            return {"text": "\n".join(lines).strip(), "fields": fields}
         except Exception as e:
             print(f"Error extracting text from DOCX {docx_path}: {e}")
-            return ""
+            return {"text": "", "fields": []}
+
+    def iter_excel_rows(self, excel_path: str, max_rows: Optional[int] = None) -> Iterator[Tuple[int, str, tuple]]:
+        """Yield (sheet_index, sheet_name, row_values) for non-empty rows.
+
+        Uses openpyxl's read-only mode, so rows are streamed from the file rather than the
+        whole workbook being loaded; at most EXCEL_MAX_ROWS rows are read per sheet.
+        """
+        max_rows = max_rows or getattr(settings, "excel_max_rows", 5000)
+        workbook = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
+        try:
+            for sheet_index, sheet_name in enumerate(workbook.sheetnames, start=1):
+                for row in workbook[sheet_name].iter_rows(max_row=max_rows, values_only=True):
+                    if any(cell is not None for cell in row):
+                        yield sheet_index, sheet_name, row
+        finally:
+            workbook.close()
     
     def extract_from_excel(self, excel_path: str) -> Dict[str, Any]:
         """Extract data from Excel file."""
         try:
-            workbook = openpyxl.load_workbook(excel_path)
             data = {}
-            
-            for sheet_name in workbook.sheetnames:
-                sheet = workbook[sheet_name]
-                sheet_data = []
-                
-                for row in sheet.iter_rows(values_only=True):
-                    if any(cell is not None for cell in row):
-                        sheet_data.append(list(row))
-                
-                data[sheet_name] = sheet_data
-            
+            for _, sheet_name, row in self.iter_excel_rows(excel_path):
+                data.setdefault(sheet_name, []).append(list(row))
             return data
         except Exception as e:
             print(f"Error extracting data from Excel {excel_path}: {e}")
             return {}
+
+    def extract_structured_from_excel(self, excel_path: str) -> Dict[str, Any]:
+        """Extract Excel text (one tab-separated line per row) plus label/value fields from cell pairs.
+
+        Fields carry the sheet number (1-based) as source_page.
+        """
+        try:
+            lines = []
+            fields = []
+            current_sheet = None
+            for sheet_index, sheet_name, row in self.iter_excel_rows(excel_path):
+                if sheet_name != current_sheet:
+                    lines.append(f"[{sheet_name}]")
+                    current_sheet = sheet_name
+                cells = [_cell_text(value) for value in row]
+                lines.append("\t".join(c for c in cells if c))
+                fields.extend(_pair_fields(cells, source_page=sheet_index))
+            return {"text": "\n".join(lines), "fields": fields}
+        except Exception as e:
+            print(f"Error extracting data from Excel {excel_path}: {e}")
+            return {"text": "", "fields": []}
     
-    def extract_fields_from_text(self, text: str, document_type: str) -> List[ExtractedField]:
-        """Extract specific fields from document text."""
-        fields = []
-        
-        # Common field patterns for supplier documents
-        field_patterns = {
-            "company_name": [
-                r"Company\s+Name[:\s]+([^\n]+)",
-                r"Business\s+Name[:\s]+([^\n]+)",
-                r"Trading\s+Name[:\s]+([^\n]+)"
-            ],
-            "registration_number": [
-                r"Registration\s+Number[:\s]+([^\n]+)",
-                r"Company\s+Registration[:\s]+([^\n]+)",
-                r"Reg\s+No[:\s]+([^\n]+)"
-            ],
-            "vat_number": [
-                r"VAT\s+Number[:\s]+([^\n]+)",
-                r"VAT\s+Reg[:\s]+([^\n]+)"
-            ],
-            "contact_person": [
-                r"Contact\s+Person[:\s]+([^\n]+)",
-                r"Responsible\s+Person[:\s]+([^\n]+)"
-            ],
-            "phone": [
-                r"Phone[:\s]+([^\n]+)",
-                r"Telephone[:\s]+([^\n]+)",
-                r"Contact\s+Number[:\s]+([^\n]+)"
-            ],
-            "email": [
-                r"Email[:\s]+([^\n]+)",
-                r"E-mail[:\s]+([^\n]+)"
-            ],
-            "address": [
-                r"Address[:\s]+([^\n]+)",
-                r"Physical\s+Address[:\s]+([^\n]+)"
-            ]
-        }
-        
-        import re
-        
-        for field_name, patterns in field_patterns.items():
-            for pattern in patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    fields.append(ExtractedField(
-                        field_name=field_name,
-                        value=match.group(1).strip(),
-                        confidence=0.8  # Basic confidence score
-                    ))
-                    break
-        
-        return fields
+    def extract_fields_from_text(
+        self, text: str, document_type: str, pages: Optional[List[str]] = None
+    ) -> List[ExtractedField]:
+        """Extract every field candidate from document text in one scan (see field_extractor).
+
+        When per-page texts are given they are scanned instead of `text`, and each field
+        gets its source page; `offset` is the value's position in the scanned text.
+        """
+        engine = get_field_engine()
+        if pages:
+            matches = engine.extract_pages(pages, document_type)
+        else:
+            matches = engine.extract(text, document_type)
+        return [
+            ExtractedField(
+                field_name=m.field_name,
+                value=m.value,
+                confidence=m.confidence,
+                source_page=m.page,
+                offset=m.offset,
+            )
+            for m in matches
+        ]
     
     def process_document(self, file_path: str, document_type: str) -> DocumentExtractionResult:
         """Process a document and extract text and fields."""
@@ -193,25 +866,32 @@ class OCRExtractor:
         file_extension = Path(file_path).suffix.lower()
         extracted_text = ""
         extracted_fields = []
+        pages = None
         
         try:
             if file_extension in ['.pdf']:
                 pdf_result = self.extract_from_pdf(file_path)
                 extracted_text = pdf_result["text"]
+                pages = pdf_result.get("pages")
             elif file_extension in ['.docx']:
-                extracted_text = self.extract_from_docx(file_path)
+                docx_result = self._cached(file_path, "docx", lambda: self.extract_structured_from_docx(file_path))
+                extracted_text = docx_result["text"]
+                extracted_fields = [ExtractedField(**f) for f in docx_result["fields"]]
             elif file_extension in ['.xlsx', '.xls']:
-                excel_data = self.extract_from_excel(file_path)
-                # Convert Excel data to text for field extraction
-                extracted_text = str(excel_data)
-            elif file_extension in ['.png', '.jpg', '.jpeg', '.tiff', '.bmp']:
-                extracted_text = self.extract_from_image(file_path)
+                # Row text (not the Python repr of every row) for field extraction, plus cell-pair fields
+                excel_result = self._cached(file_path, "excel", lambda: self.extract_structured_from_excel(file_path))
+                extracted_text = excel_result["text"]
+                extracted_fields = [ExtractedField(**f) for f in excel_result["fields"]]
+            elif file_extension in ['.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp']:
+                image_result = self.extract_image_pages(file_path)
+                extracted_text = image_result["text"]
+                pages = image_result.get("pages")
             else:
                 # Try OCR for unknown formats
                 extracted_text = self.extract_from_image(file_path)
             
             # Extract specific fields
-            extracted_fields = self.extract_fields_from_text(extracted_text, document_type)
+            extracted_fields += self.extract_fields_from_text(extracted_text, document_type, pages=pages)
             
             processing_time = time.time() - start_time
             
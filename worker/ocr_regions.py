@@ -0,0 +1,90 @@
+"""Region templates for region-of-interest (ROI) OCR.
+
+Bank header checks (confirmation letters and statements) only need a handful of fields that
+always sit in a known part of the first page. A template lists those regions as fractions of
+the page, so only they are OCRed, plus the numeric fields to re-read with a digit-whitelisted
+single-line Tesseract pass. CIPC and SARS documents have no template: their checks receive
+text already extracted by /upload, not the file.
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from field_extractor import document_type_key
+
+
+@dataclass(frozen=True)
+class Region:
+    """Part of a page to OCR. `box` is (left, top, right, bottom) as fractions of the page size."""
+    name: str
+    box: Tuple[float, float, float, float]
+    page: int = 1
+
+
+@dataclass(frozen=True)
+class NumericField:
+    """A number printed after a label on the same line (e.g. "Account number: 62 1234 5678").
+
+    `value` is the regex the number must match; `whitelist` restricts the characters
+    Tesseract may output when the value is re-read on its own.
+    """
+    field_name: str
+    label: str
+    value: str
+    whitelist: str = "0123456789"
+
+    def find(self, text: str) -> Optional[str]:
+        """Value following the label in `text`, normalized (spaces removed), or None."""
+        m = re.search(rf"(?:{self.label})[\s:.#-]*({self.value})", text, re.IGNORECASE)
+        return self.normalize(m.group(1)) if m else None
+
+    def parse(self, text: str) -> Optional[str]:
+        """Value in the output of a whitelisted single-line OCR pass, or None."""
+        m = re.search(self.value, text)
+        return self.normalize(m.group(0)) if m else None
+
+    @staticmethod
+    def normalize(value: str) -> str:
+        return re.sub(r"\s+", "", value)
+
+
+@dataclass(frozen=True)
+class RegionTemplate:
+    """Regions to OCR for a document type; the ROI pass fails unless every `required` field is found."""
+    name: str
+    regions: Tuple[Region, ...]
+    numeric_fields: Tuple[NumericField, ...] = ()
+    required: Tuple[str, ...] = ()
+
+    @property
+    def pages(self) -> Tuple[int, ...]:
+        return tuple(sorted({region.page for region in self.regions}))
+
+    def find_fields(self, text: str) -> Dict[str, str]:
+        """Numeric field values found by label in `text`."""
+        fields = {}
+        for numeric_field in self.numeric_fields:
+            value = numeric_field.find(text)
+            if value:
+                fields[numeric_field.field_name] = value
+        return fields
+
+
+# Keys from field_extractor.document_type_key
+REGION_TEMPLATES: Dict[str, RegionTemplate] = {
+    "bank": RegionTemplate(
+        name="bank",
+        # Bank name, holder, account number and statement/letter date: top third of page 1
+        regions=(Region("header", (0.0, 0.0, 1.0, 0.36)),),
+        numeric_fields=(
+            NumericField("account_number", r"Acc(?:ount)?\s*(?:Number|No\.?|Nr\.?)", r"\d(?:\s?\d){7,17}"),
+        ),
+        required=("account_number",),
+    ),
+}
+
+
+def get_region_template(document_type: str) -> Optional[RegionTemplate]:
+    """Region template for a document type label, or None if the type has none."""
+    key = document_type_key(document_type)
+    return REGION_TEMPLATES.get(key) if key else None
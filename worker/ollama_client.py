@@ -0,0 +1,210 @@
+"""Shared plumbing for calls to the Ollama server.
+
+Ollama generates OLLAMA_NUM_PARALLEL responses at a time and queues the rest. Every LLM call
+in the worker takes one of OLLAMA_MAX_PARALLEL slots (set it to the server's parallel
+setting) so we never pile more requests onto Ollama than it can run, and a burst of
+analyses waits here instead of timing out inside Ollama's queue. Worker processes (bulk
+verification) share the parent's limit through shared_llm_slots / use_llm_slots.
+
+Blocking analysis code (several synchronous llm.invoke calls) runs on a dedicated thread
+pool via run_in_analysis_executor, keeping it off the FastAPI event loop so /health,
+/upload and the other endpoints stay responsive while an analysis is in progress.
+
+Loading the model into memory takes 30-90 s on CPU. The worker preloads it on startup with
+a one-token generation (warm_up_model), sends OLLAMA_KEEP_ALIVE with every request so
+Ollama keeps it loaded between analyses, and can reload it on a timer
+(OLLAMA_REWARM_INTERVAL_SECONDS). The worker is ready once the model is in memory
+(model_resident, from Ollama's /api/ps).
+
+Direct REST calls (warm-up, readiness, bank statement extraction) share one keep-alive
+connection pool per process (get_http_client, OLLAMA_HTTP_MAX_CONNECTIONS).
+"""
+import asyncio
+import contextlib
+import contextvars
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import httpx
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_llm_slots = threading.BoundedSemaphore(max(1, getattr(settings, "ollama_max_parallel", 1)))
+_shared_llm_slots: Optional[Any] = None
+_shared_llm_slots_lock = threading.Lock()
+
+_analysis_executor: Optional[ThreadPoolExecutor] = None
+_analysis_executor_lock = threading.Lock()
+
+_http_client: Optional[httpx.Client] = None
+_http_client_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def llm_slot():
+    """Hold one of the OLLAMA_MAX_PARALLEL generation slots for the duration of an LLM call."""
+    slots = _llm_slots
+    start = time.perf_counter()
+    slots.acquire()
+    waited = time.perf_counter() - start
+    if waited >= 1.0:
+        logger.info("Waited %.1fs for a free Ollama slot", waited)
+    try:
+        yield
+    finally:
+        slots.release()
+
+
+def use_llm_slots(slots: Any) -> None:
+    """Take generation slots from `slots` (a multiprocessing semaphore shared with other processes)."""
+    global _llm_slots
+    _llm_slots = slots
+
+
+def shared_llm_slots() -> Any:
+    """Switch this process to an OLLAMA_MAX_PARALLEL semaphore that child processes can share.
+
+    Pass the result to worker processes (pool initargs) and call use_llm_slots there, so the
+    limit holds across the parent and all workers rather than per process.
+    """
+    global _shared_llm_slots
+    with _shared_llm_slots_lock:
+        if _shared_llm_slots is None:
+            _shared_llm_slots = multiprocessing.BoundedSemaphore(max(1, getattr(settings, "ollama_max_parallel", 1)))
+            use_llm_slots(_shared_llm_slots)
+        return _shared_llm_slots
+
+
+def get_analysis_executor() -> ThreadPoolExecutor:
+    """Thread pool for blocking LLM analysis (ANALYSIS_WORKERS threads), created on first use."""
+    global _analysis_executor
+    with _analysis_executor_lock:
+        if _analysis_executor is None:
+            _analysis_executor = ThreadPoolExecutor(
+                max_workers=max(1, getattr(settings, "analysis_workers", 4)),
+                thread_name_prefix="llm-analysis",
+            )
+        return _analysis_executor
+
+
+async def run_in_analysis_executor(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Await a blocking function on the analysis thread pool without blocking the event loop.
+
+    The caller's context variables (e.g. the LLM cache bypass flag) are visible to `func`.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_analysis_executor(), functools.partial(context.run, func, *args, **kwargs))
+
+
+# ----------------------------
+# HTTP CLIENT
+# ----------------------------
+# One keep-alive connection pool per process for direct calls to Ollama's REST API, instead of
+# a new TCP connection (and client setup) per request. httpx.Client is safe to share between
+# threads; per-call timeouts are passed to each request.
+def get_http_client() -> httpx.Client:
+    """Return the process-wide Ollama HTTP client, creating it on first use."""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            connections = max(1, getattr(settings, "ollama_http_max_connections", 8))
+            _http_client = httpx.Client(
+                base_url=settings.ollama_base_url.rstrip("/"),
+                timeout=httpx.Timeout(120.0, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=connections,
+                    max_keepalive_connections=connections,
+                    keepalive_expiry=60.0,
+                ),
+            )
+        return _http_client
+
+
+def close_http_client() -> None:
+    """Close the pooled client (shutdown); the next call creates a new one."""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = None
+
+
+def _forget_http_client() -> None:
+    # A forked child (bulk verification pool) must not reuse the parent's sockets or lock
+    global _http_client, _http_client_lock
+    _http_client = None
+    _http_client_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_http_client)
+
+
+# ----------------------------
+# WARM-UP AND READINESS
+# ----------------------------
+def keep_alive() -> str:
+    """How long Ollama keeps the model loaded after a request (e.g. "30m", "-1" = forever)."""
+    return str(getattr(settings, "ollama_keep_alive", "30m"))
+
+
+def _full_model_name(name: str) -> str:
+    return name if ":" in name else f"{name}:latest"
+
+
+def model_resident(timeout: float = 2.0) -> bool:
+    """True if OLLAMA_MODEL is loaded in Ollama's memory (GET /api/ps)."""
+    try:
+        r = get_http_client().get("/api/ps", timeout=timeout)
+        r.raise_for_status()
+        loaded = {_full_model_name(m.get("name") or m.get("model") or "") for m in r.json().get("models", [])}
+        resident = _full_model_name(settings.ollama_model) in loaded
+    except Exception as e:
+        logger.debug("Could not query loaded Ollama models: %s", e)
+        resident = False
+    return resident
+
+
+def warm_up_model(generate: bool = True, timeout: float = 300.0) -> bool:
+    """Load OLLAMA_MODEL with OLLAMA_KEEP_ALIVE and report whether it is resident.
+
+    With `generate`, runs a one-token generation (also allocates the context, so the first
+    real request does not pay for it) in an LLM slot; otherwise sends an empty prompt, which
+    only loads the model or refreshes its keep-alive.
+    """
+    payload = {"model": settings.ollama_model, "prompt": "", "stream": False, "keep_alive": keep_alive()}
+    if generate:
+        payload.update(prompt="Hi", options={"num_predict": 1, "temperature": 0})
+    start = time.perf_counter()
+    try:
+        with llm_slot() if generate else contextlib.nullcontext():
+            r = get_http_client().post("/api/generate", json=payload, timeout=timeout)
+            r.raise_for_status()
+    except Exception as e:
+        logger.warning("Ollama warm-up of %s failed: %s", settings.ollama_model, e)
+        return False
+    resident = model_resident()
+    logger.info("Ollama model %s %s in %.1fs (keep_alive=%s)",
+                settings.ollama_model, "loaded" if resident else "not resident", time.perf_counter() - start, keep_alive())
+    return resident
+
+
+async def rewarm_periodically(interval_seconds: float) -> None:
+    """Every `interval_seconds`, load the model (if it was unloaded) or refresh its keep-alive.
+
+    Runs until cancelled; an interval shorter than OLLAMA_KEEP_ALIVE keeps the model resident
+    through idle periods.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval_seconds)
+        await loop.run_in_executor(None, functools.partial(warm_up_model, generate=False))
@@ -0,0 +1,458 @@
+"""Deterministic validation checks per document type (CIPC, SARS, bank, B-BBEE).
+
+Most checks in the analysis prompts are string logic: is the keyword "CIPC" present, does
+the registration number look like YYYY/NNNNNN/NN, does the account number equal the one on
+the form, has the certificate expired. These run here in Python against the extracted text
+and form_data and return PASS or FAIL. Names and addresses are compared with fuzzy_match.
+Checks that need judgement (a partial name or address match, a date the rules cannot find,
+letterhead, stamp and signature) return NEEDS_REVIEW, and only those are sent to the LLM
+(see crew_agents). Numbers are compared as whole digit groups, never as part of other digits.
+
+Check names match the numbered sections of the analysis prompts. A comparison check is
+skipped (no result) when the form has no value to compare against.
+"""
+import re
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from dateutil.relativedelta import relativedelta
+
+from date_parsing import find_dates, parse_date
+from field_extractor import document_type_key, get_field_engine
+from fuzzy_match import MATCH, PARTIAL, MatchResult, match_address, match_company_name
+
+PASS = "PASS"
+FAIL = "FAIL"
+NEEDS_REVIEW = "NEEDS_REVIEW"
+
+# Documents older than this fail recency checks (bank letters, tax clearance)
+_MAX_DOCUMENT_AGE_MONTHS = 3
+_EXPIRING_SOON_DAYS = 30
+
+
+@dataclass
+class CheckResult:
+    """Outcome of one validation check. `found` is the value read from the document, if any."""
+    name: str
+    status: str
+    details: str = ""
+    found: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+# ----------------------------
+# HELPERS
+# ----------------------------
+def normalize_name(value: str) -> str:
+    """Lowercase, '&' as 'and', punctuation removed, whitespace collapsed."""
+    value = (value or "").lower().replace("&", " and ")
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9]+", " ", value)).strip()
+
+
+def digits_only(value: str) -> str:
+    return re.sub(r"\D", "", value or "")
+
+
+# A run of digits, optionally split by single spaces ("6298 765 4321"), with a non-digit on each side
+_DIGIT_GROUP = re.compile(r"(?<!\d)\d+(?: \d+)*(?!\d)")
+
+
+def digit_group_present(number: str, text: str) -> bool:
+    """True if `number` appears in the text as a whole digit group (spaces inside allowed).
+
+    Never matches part of a longer number or digits joined across separate numbers, so a
+    form account number is not "found" inside a phone number or another account number.
+    """
+    number = digits_only(number)
+    return bool(number) and any(digits_only(m.group(0)) == number for m in _DIGIT_GROUP.finditer(text or ""))
+
+
+def _form_value(form_data: Optional[Dict[str, Any]], *keys: str) -> str:
+    for key in keys:
+        value = (form_data or {}).get(key)
+        if value not in (None, ""):
+            return str(value).strip()
+    return ""
+
+
+def _has_any(text: str, *phrases: str) -> bool:
+    lowered = text.lower()
+    return any(phrase in lowered for phrase in phrases)
+
+
+def _extracted_fields(text: str, document_type: str) -> Dict[str, str]:
+    """First candidate per field from the field extractor (label patterns for this document type)."""
+    fields: Dict[str, str] = {}
+    for match in get_field_engine().extract(text, document_type):
+        fields.setdefault(match.field_name, match.value.strip())
+    return fields
+
+
+def _first_date(value: str) -> Optional[datetime]:
+    dates = find_dates(value)
+    return dates[0] if dates else parse_date(value)
+
+
+def _fuzzy_check(name: str, match: MatchResult, mismatch_status: str = FAIL) -> CheckResult:
+    """MATCH passes, PARTIAL needs judgement, MISMATCH gets `mismatch_status`."""
+    found = match.matched_text
+    if match.status == MATCH:
+        return CheckResult(name, PASS, f"MATCH ({match.score:.0f}): '{found}'", found)
+    if match.status == PARTIAL:
+        return CheckResult(name, NEEDS_REVIEW, f"PARTIAL MATCH ({match.score:.0f}): '{found}', form has '{match.expected}'", found)
+    details = f"MISMATCH ({match.score:.0f}): form has '{match.expected}'" + (f", closest is '{found}'" if found else "")
+    return CheckResult(name, mismatch_status, details, found)
+
+
+def _name_check(name: str, form_name: str, text: str, found: Optional[str]) -> CheckResult:
+    """Fuzzy company-name match against the extracted field, or every line of the text if that is better."""
+    match = match_company_name(form_name, found) if found else None
+    if match is None or match.status != MATCH:
+        in_text = match_company_name(form_name, text)
+        if match is None or in_text.score > match.score:
+            match = in_text
+    return _fuzzy_check(name, match)
+
+
+def _address_check(name: str, form_address: str, text: str, mismatch_status: str = FAIL) -> CheckResult:
+    return _fuzzy_check(name, match_address(form_address, text), mismatch_status)
+
+
+def _recency_check(name: str, text: str) -> CheckResult:
+    """Most recent date in the document must be within the last 3 months."""
+    today = datetime.today()
+    dates = [d for d in find_dates(text) if d <= today + timedelta(days=1)]
+    if not dates:
+        return CheckResult(name, NEEDS_REVIEW, "No document date found")
+    latest = max(dates)
+    found = latest.strftime("%Y-%m-%d")
+    if latest < today - relativedelta(months=_MAX_DOCUMENT_AGE_MONTHS):
+        return CheckResult(name, FAIL, f"Most recent date {found} is older than {_MAX_DOCUMENT_AGE_MONTHS} months", found)
+    return CheckResult(name, PASS, f"Dated {found}", found)
+
+
+def _authenticity_check(text: str) -> CheckResult:
+    """Letterhead, stamp and signature need judgement; only an out-of-date document decides it (FAIL)."""
+    dated = _recency_check("DOCUMENT AUTHENTICITY", text)
+    if dated.status == FAIL:
+        return dated
+    prefix = f"{dated.details}; " if dated.found else ""
+    return CheckResult("DOCUMENT AUTHENTICITY", NEEDS_REVIEW, prefix + "letterhead, stamp and signature need review", dated.found)
+
+
+def _expiry_check(name: str, expiry_value: Optional[str]) -> CheckResult:
+    expiry = _first_date(expiry_value) if expiry_value else None
+    if expiry is None:
+        return CheckResult(name, NEEDS_REVIEW, "Expiry date not found", expiry_value)
+    found = expiry.strftime("%Y-%m-%d")
+    days_left = (expiry - datetime.today()).days
+    if days_left < 0:
+        return CheckResult(name, FAIL, f"EXPIRED on {found}", found)
+    if days_left <= _EXPIRING_SOON_DAYS:
+        return CheckResult(name, PASS, f"VALID, EXPIRING SOON: {found} ({days_left} days)", found)
+    return CheckResult(name, PASS, f"VALID until {found} ({days_left} days)", found)
+
+
+def _completeness_check(fields: Dict[str, str], required: Dict[str, str]) -> CheckResult:
+    missing = [label for field_name, label in required.items() if not fields.get(field_name)]
+    if missing:
+        return CheckResult("DOCUMENT COMPLETENESS", FAIL, "Missing: " + ", ".join(missing))
+    return CheckResult("DOCUMENT COMPLETENESS", PASS, "All critical fields found")
+
+
+# ----------------------------
+# SOUTH AFRICAN BANKS
+# ----------------------------
+# Canonical name -> aliases as they appear on letters and statements (lowercase)
+SA_BANKS: Dict[str, List[str]] = {
+    "FNB": ["fnb", "first national bank", "firstrand"],
+    "ABSA": ["absa"],
+    "Standard Bank": ["standard bank", "stanbic"],
+    "Nedbank": ["nedbank"],
+    "Capitec": ["capitec"],
+    "Investec": ["investec"],
+    "TymeBank": ["tymebank", "tyme bank"],
+    "Discovery Bank": ["discovery bank"],
+    "African Bank": ["african bank"],
+    "Bidvest Bank": ["bidvest bank"],
+    "Sasfin": ["sasfin"],
+    "Grindrod Bank": ["grindrod bank"],
+    "Mercantile Bank": ["mercantile bank"],
+    "Access Bank": ["access bank"],
+    "Bank Zero": ["bank zero"],
+}
+_BANK_ALIASES = sorted(
+    ((alias, bank) for bank, aliases in SA_BANKS.items() for alias in aliases),
+    key=lambda item: len(item[0]),
+    reverse=True,
+)
+_BANK_PATTERN = re.compile(r"\b(" + "|".join(re.escape(alias) for alias, _ in _BANK_ALIASES) + r")\b", re.IGNORECASE)
+_ALIAS_TO_BANK = {alias: bank for alias, bank in _BANK_ALIASES}
+
+
+def canonical_bank(name: str) -> Optional[str]:
+    """Canonical bank for a name ("First National Bank" -> "FNB"), or None if unknown."""
+    m = _BANK_PATTERN.search(name or "")
+    return _ALIAS_TO_BANK[m.group(1).lower()] if m else None
+
+
+def find_banks(text: str) -> List[str]:
+    """Canonical banks mentioned in the text, most frequent first."""
+    counts: Dict[str, int] = {}
+    for m in _BANK_PATTERN.finditer(text or ""):
+        bank = _ALIAS_TO_BANK[m.group(1).lower()]
+        counts[bank] = counts.get(bank, 0) + 1
+    return sorted(counts, key=lambda bank: counts[bank], reverse=True)
+
+
+# Universal branch codes; a letter may show one of these while the form has the branch-specific code
+UNIVERSAL_BRANCH_CODES: Dict[str, str] = {
+    "250655": "FNB", "632005": "ABSA", "051001": "Standard Bank", "198765": "Nedbank",
+    "470010": "Capitec", "580105": "Investec", "678910": "TymeBank", "679000": "Discovery Bank",
+    "430000": "African Bank", "462005": "Bidvest Bank",
+}
+_MASKED_NUMBER = re.compile(r"[*xX]{2,}\s*(\d{3,})")
+
+_ACCOUNT_TYPES = {
+    "cheque": ["cheque", "current", "business account", "gold business", "biz"],
+    "savings": ["savings"],
+    "transmission": ["transmission"],
+}
+
+
+# ----------------------------
+# VALIDATORS PER DOCUMENT TYPE
+# ----------------------------
+_CIPC_NUMBER = re.compile(r"\b(\d{4})\s*/\s*(\d{6})\s*/\s*(\d{2})\b")
+
+
+def validate_cipc(text: str, form_data: Optional[Dict[str, Any]]) -> List[CheckResult]:
+    fields = _extracted_fields(text, "cipc")
+    results = []
+
+    if _has_any(text, "cipc", "companies and intellectual property commission"):
+        results.append(CheckResult("CIPC DOCUMENT VERIFICATION", PASS, "VALID CIPC DOCUMENT"))
+    else:
+        results.append(CheckResult("CIPC DOCUMENT VERIFICATION", FAIL, "NOT A VALID CIPC DOCUMENT: no CIPC reference"))
+
+    company_name = _form_value(form_data, "companyName")
+    if company_name:
+        results.append(_name_check("COMPANY NAME VALIDATION", company_name, text, fields.get("company_name")))
+
+    m = _CIPC_NUMBER.search(fields.get("registration_number", "")) or _CIPC_NUMBER.search(text)
+    found_number = "/".join(m.groups()) if m else None
+    if found_number:
+        fields["registration_number"] = found_number
+    form_number = _form_value(form_data, "registrationNumber")
+    if not found_number:
+        results.append(CheckResult("REGISTRATION NUMBER VALIDATION", FAIL, "No registration number in YYYY/NNNNNN/NN format"))
+    elif form_number:
+        if digits_only(form_number) == digits_only(found_number):
+            results.append(CheckResult("REGISTRATION NUMBER VALIDATION", PASS, f"{found_number} matches the form", found_number))
+        else:
+            results.append(CheckResult("REGISTRATION NUMBER VALIDATION", FAIL, f"MISMATCH: document {found_number}, form {form_number}", found_number))
+
+    address = _form_value(form_data, "physicalAddress")
+    if address:
+        results.append(_address_check("ADDRESS VALIDATION", address, text))
+
+    results.append(_completeness_check(fields, {"registration_number": "registration number", "company_name": "enterprise name"}))
+    return results
+
+
+_TAX_PURPOSES = ("good standing", "tax compliance", "tax clearance", "tender")
+
+
+def validate_tax_clearance(text: str, form_data: Optional[Dict[str, Any]]) -> List[CheckResult]:
+    fields = _extracted_fields(text, "sars")
+    results = []
+
+    company_name = _form_value(form_data, "companyName")
+    if company_name:
+        results.append(_name_check("COMPANY NAME VALIDATION", company_name, text, None))
+        results.append(_name_check("TAXPAYER NAME VALIDATION", company_name, text, fields.get("taxpayer_name")))
+
+    address = _form_value(form_data, "physicalAddress")
+    if address:
+        results.append(_address_check("ADDRESS VALIDATION", address, text))
+
+    purpose = fields.get("purpose")
+    if purpose and _has_any(purpose, *_TAX_PURPOSES):
+        results.append(CheckResult("PURPOSE OF REQUEST VALIDATION", PASS, "CORRECT PURPOSE", purpose))
+    elif purpose:
+        results.append(CheckResult("PURPOSE OF REQUEST VALIDATION", NEEDS_REVIEW, f"Purpose stated: '{purpose}'", purpose))
+    elif _has_any(text, "good standing", "tax compliance status"):
+        results.append(CheckResult("PURPOSE OF REQUEST VALIDATION", PASS, "Good standing / tax compliance status certificate"))
+    else:
+        results.append(CheckResult("PURPOSE OF REQUEST VALIDATION", NEEDS_REVIEW, "Purpose of request not found"))
+
+    tax_number = digits_only(fields.get("tax_reference_number", ""))
+    if len(tax_number) == 10:
+        results.append(CheckResult("TAX REFERENCE NUMBER", PASS, f"Tax reference number {tax_number}", tax_number))
+    else:
+        results.append(CheckResult("TAX REFERENCE NUMBER", NEEDS_REVIEW, "No 10-digit tax reference number found"))
+
+    if fields.get("expiry_date"):
+        results.append(_expiry_check("VALIDITY/EXPIRY CHECK", fields["expiry_date"]))
+    else:
+        results.append(_recency_check("VALIDITY/EXPIRY CHECK", fields.get("issue_date") or text))
+
+    if _has_any(text, "sars", "south african revenue service"):
+        results.append(CheckResult("SARS/GOVERNMENT AUTHENTICITY", PASS, "SARS reference present"))
+    else:
+        results.append(CheckResult("SARS/GOVERNMENT AUTHENTICITY", NEEDS_REVIEW, "No SARS reference found"))
+
+    results.append(_completeness_check(fields, {"taxpayer_name": "taxpayer name", "tax_reference_number": "tax reference number"}))
+    return results
+
+
+def validate_bank_confirmation(text: str, form_data: Optional[Dict[str, Any]]) -> List[CheckResult]:
+    fields = _extracted_fields(text, "bank")
+    results = []
+
+    company_name = _form_value(form_data, "bankAccountName", "companyName")
+    if company_name:
+        results.append(_name_check("COMPANY NAME VALIDATION", company_name, text, fields.get("account_holder")))
+
+    banks = find_banks(text)
+    if banks:
+        fields["bank_name"] = banks[0]
+    form_bank = _form_value(form_data, "bankName")
+    if form_bank:
+        wanted = canonical_bank(form_bank)
+        if wanted and wanted in banks:
+            results.append(CheckResult("BANK NAME VALIDATION", PASS, f"{wanted} matches the form", wanted))
+        elif wanted and banks:
+            results.append(CheckResult("BANK NAME VALIDATION", FAIL, f"MISMATCH: document is from {banks[0]}, form has {form_bank}", banks[0]))
+        elif normalize_name(form_bank) and normalize_name(form_bank) in normalize_name(text):
+            results.append(CheckResult("BANK NAME VALIDATION", PASS, f"'{form_bank}' appears in the document", form_bank))
+        else:
+            results.append(CheckResult("BANK NAME VALIDATION", NEEDS_REVIEW, f"'{form_bank}' not recognised in the document"))
+
+    branch_name = _form_value(form_data, "branchName")
+    if branch_name:
+        # Letters often carry only the universal branch code, so a missing branch name is not a failure
+        results.append(_address_check("BRANCH NAME VALIDATION", branch_name, text, mismatch_status=NEEDS_REVIEW))
+
+    branch_code = digits_only(_form_value(form_data, "branchNumber"))
+    found_code = digits_only(fields.get("branch_code", ""))
+    if branch_code:
+        if found_code == branch_code:
+            results.append(CheckResult("BRANCH CODE VALIDATION", PASS, f"{branch_code} matches the form", branch_code))
+        elif found_code and (found_code in UNIVERSAL_BRANCH_CODES or branch_code in UNIVERSAL_BRANCH_CODES):
+            # A universal branch code on one side and a branch-specific one on the other are both valid
+            results.append(CheckResult("BRANCH CODE VALIDATION", NEEDS_REVIEW, f"Document has {found_code}, form has {branch_code}", found_code))
+        elif found_code:
+            results.append(CheckResult("BRANCH CODE VALIDATION", FAIL, f"MISMATCH: document {found_code}, form {branch_code}", found_code))
+        elif len(branch_code) >= 5 and digit_group_present(branch_code, text):
+            results.append(CheckResult("BRANCH CODE VALIDATION", PASS, f"{branch_code} appears in the document", branch_code))
+        else:
+            results.append(CheckResult("BRANCH CODE VALIDATION", NEEDS_REVIEW, "Branch code not found"))
+
+    form_account = digits_only(_form_value(form_data, "accountNumber"))
+    found_account = fields.get("account_number", "")
+    if form_account:
+        # The labelled account number decides; the rest of the text is only searched when there is none
+        found_digits = digits_only(found_account)
+        masked = _MASKED_NUMBER.search(found_account) if found_account else None
+        if not found_account and not digit_group_present(form_account, text):
+            masked = _MASKED_NUMBER.search(text)
+        if masked:
+            if form_account.endswith(masked.group(1)):
+                results.append(CheckResult("ACCOUNT NUMBER VALIDATION", PASS, f"PARTIAL MATCH: masked number ends in {masked.group(1)}", masked.group(0)))
+            else:
+                results.append(CheckResult("ACCOUNT NUMBER VALIDATION", FAIL, f"MISMATCH: masked number ends in {masked.group(1)}, form {form_account}", masked.group(0)))
+        elif found_digits:
+            if found_digits == form_account:
+                results.append(CheckResult("ACCOUNT NUMBER VALIDATION", PASS, "Account number matches the form", found_digits))
+            else:
+                results.append(CheckResult("ACCOUNT NUMBER VALIDATION", FAIL, f"MISMATCH: document {found_digits}, form {form_account}", found_digits))
+        elif digit_group_present(form_account, text):
+            results.append(CheckResult("ACCOUNT NUMBER VALIDATION", PASS, "Form account number appears in the document", form_account))
+        else:
+            results.append(CheckResult("ACCOUNT NUMBER VALIDATION", FAIL, "Account number not found in the document"))
+
+    account_type = _form_value(form_data, "typeOfAccount")
+    if account_type:
+        synonyms = next((words for key, words in _ACCOUNT_TYPES.items() if key in account_type.lower()), [account_type.lower()])
+        if _has_any(text, *synonyms):
+            results.append(CheckResult("ACCOUNT TYPE VALIDATION", PASS, f"'{account_type}' account type found", account_type))
+        else:
+            results.append(CheckResult("ACCOUNT TYPE VALIDATION", NEEDS_REVIEW, f"'{account_type}' not found in the document"))
+
+    results.append(_authenticity_check(text))
+    if found_account:
+        fields["account_number"] = found_account
+    results.append(_completeness_check(fields, {"bank_name": "bank name", "account_number": "account number"}))
+    return results
+
+
+_LEVEL_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8}
+
+
+def _bbbee_level(value: str) -> Optional[int]:
+    value = (value or "").lower()
+    if "non" in value and "compliant" in value:
+        return 0
+    m = re.search(r"\b([1-8])\b", value)
+    if m:
+        return int(m.group(1))
+    return next((number for word, number in _LEVEL_WORDS.items() if re.search(rf"\b{word}\b", value)), None)
+
+
+def validate_bbbee(text: str, form_data: Optional[Dict[str, Any]]) -> List[CheckResult]:
+    fields = _extracted_fields(text, "bbbee")
+    results = []
+
+    is_bbbee = _has_any(text, "b-bbee", "bbbee", "bee certificate", "broad-based black economic empowerment")
+    issuer = _has_any(text, "trade, industry and competition", "trade industry and competition", "dtic", "sanas")
+    if is_bbbee and issuer:
+        results.append(CheckResult("B-BBEE CERTIFICATE VERIFICATION", PASS, "VALID B-BBEE CERTIFICATE"))
+    elif is_bbbee:
+        results.append(CheckResult("B-BBEE CERTIFICATE VERIFICATION", NEEDS_REVIEW, "B-BBEE document without dtic/SANAS reference"))
+    else:
+        results.append(CheckResult("B-BBEE CERTIFICATE VERIFICATION", FAIL, "NOT A VALID B-BBEE CERTIFICATE"))
+
+    for name, field_name in (("BLACK OWNERSHIP PERCENTAGE", "black_ownership"), ("BLACK FEMALE PERCENTAGE", "black_female_ownership")):
+        value = fields.get(field_name)
+        if value:
+            results.append(CheckResult(name, PASS, value, value))
+        else:
+            results.append(CheckResult(name, FAIL, "NOT FOUND"))
+
+    found_level = _bbbee_level(fields.get("bbbee_level", ""))
+    form_level = _bbbee_level(_form_value(form_data, "bbbeeLevel"))
+    if found_level is None:
+        results.append(CheckResult("B-BBEE STATUS LEVEL VALIDATION", NEEDS_REVIEW, "Status level not found"))
+    elif form_level is not None:
+        if found_level == form_level:
+            results.append(CheckResult("B-BBEE STATUS LEVEL VALIDATION", PASS, f"Level {found_level} matches the form", str(found_level)))
+        else:
+            results.append(CheckResult("B-BBEE STATUS LEVEL VALIDATION", FAIL, f"MISMATCH: document Level {found_level}, form Level {form_level}", str(found_level)))
+
+    results.append(_expiry_check("EXPIRY DATE VALIDATION", fields.get("expiry_date")))
+    results.append(_completeness_check(fields, {"bbbee_level": "status level", "expiry_date": "expiry date"}))
+    return results
+
+
+# Keys from field_extractor.document_type_key
+RULE_VALIDATORS: Dict[str, Callable[[str, Optional[Dict[str, Any]]], List[CheckResult]]] = {
+    "cipc": validate_cipc,
+    "sars": validate_tax_clearance,
+    "bank": validate_bank_confirmation,
+    "bbbee": validate_bbbee,
+}
+
+
+def run_rule_checks(text: str, document_type: str, form_data: Optional[Dict[str, Any]] = None) -> List[CheckResult]:
+    """Rule checks for the document type (empty list if it has no validator)."""
+    validator = RULE_VALIDATORS.get(document_type_key(document_type) or "")
+    return validator(text or "", form_data) if validator else []
+
+
+def undecided(results: List[CheckResult]) -> List[CheckResult]:
+    """Checks the rules could not decide (to be sent to the LLM)."""
+    return [result for result in results if result.status == NEEDS_REVIEW]
@@ -0,0 +1,75 @@
+"""Compare OCR backends (pytesseract vs tesserocr) on the same pages.
+Run: python scripts/benchmark_ocr_backends.py <file.pdf|image> [--runs 3] [--dpi 200]
+tesserocr is optional (pip install tesserocr); it is skipped if not installed.
+Pages are rasterized and normalized (image_preprocess) once up front so only OCR time is
+measured; the normalization step timings are printed first.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image  # noqa: E402
+
+from image_preprocess import image_dpi, normalize_for_ocr  # noqa: E402
+from ocr_engines import create_ocr_engine  # noqa: E402
+
+
+def load_pages(path: str, dpi: int):
+    if path.lower().endswith(".pdf"):
+        from pdf2image import convert_from_path
+        return convert_from_path(path, dpi=dpi)
+    image = Image.open(path)
+    pages = []
+    for frame in range(getattr(image, "n_frames", 1)):
+        image.seek(frame)
+        pages.append(image.copy())
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("file")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--dpi", type=int, default=200)
+    args = parser.parse_args()
+
+    pages = load_pages(args.file, args.dpi)
+    print(f"{args.file}: {len(pages)} page(s) at {args.dpi} dpi, {args.runs} run(s) per backend\n")
+
+    normalized = []
+    totals = {}
+    for page in pages:
+        source_dpi = args.dpi if args.file.lower().endswith(".pdf") else image_dpi(page)
+        image, timings = normalize_for_ocr(page, source_dpi=source_dpi, target_dpi=args.dpi)
+        normalized.append(image)
+        timings.pop("skew_angle", None)
+        for step, ms in timings.items():
+            totals[step] = totals.get(step, 0.0) + ms
+    print("preprocess   " + "  ".join(f"{step} {ms / len(pages):.0f}ms" for step, ms in totals.items()) + " (per page)")
+    pages = normalized
+
+    for backend in ("pytesseract", "tesserocr"):
+        try:
+            engine = create_ocr_engine(backend)
+        except ImportError as e:
+            print(f"{backend:12s} skipped ({e})")
+            continue
+        engine.recognize(pages[0])  # warm-up (engine init / first process spawn)
+        timings = []
+        chars = 0
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            chars = sum(len(engine.recognize(page)[0]) for page in pages)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        print(
+            f"{backend:12s} best {best:.2f}s  mean {sum(timings) / len(timings):.2f}s  "
+            f"{best / len(pages) * 1000:.0f} ms/page  {chars} chars"
+        )
+
+
+if __name__ == "__main__":
+    main()
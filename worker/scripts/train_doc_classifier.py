@@ -0,0 +1,67 @@
+"""Train the TF-IDF document-type classifier from labelled historical documents.
+Run: pip install scikit-learn
+Then: python scripts/train_doc_classifier.py <data_dir> [--output ./models/doc_classifier.pkl]
+<data_dir> has one folder per label (bank_statement, bank_confirmation_letter,
+company_registration, tax_clearance, bbbee_certificate) holding PDFs, images, DOCX or .txt files.
+Text is extracted with OCRExtractor (results are cached, so re-training is fast).
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import settings  # noqa: E402
+from doc_classifier import LABEL_FAMILIES, train_model  # noqa: E402
+
+
+def load_text(extractor, path: Path) -> str:
+    suffix = path.suffix.lower()
+    if suffix == ".txt":
+        return path.read_text(encoding="utf-8", errors="ignore")
+    if suffix == ".pdf":
+        return extractor.extract_from_pdf(str(path)).get("text", "")
+    if suffix in (".png", ".jpg", ".jpeg", ".tif", ".tiff"):
+        return extractor.extract_from_image(str(path))
+    if suffix == ".docx":
+        return extractor.extract_from_docx(str(path))
+    return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("data_dir")
+    parser.add_argument("--output", default=getattr(settings, "doc_classifier_model_path", "./models/doc_classifier.pkl"))
+    args = parser.parse_args()
+
+    try:
+        import sklearn  # noqa: F401
+    except ImportError:
+        print("Install scikit-learn first: pip install scikit-learn")
+        sys.exit(1)
+    from ocr_extractor import OCRExtractor
+
+    extractor = OCRExtractor()
+    texts, labels = [], []
+    for label_dir in sorted(p for p in Path(args.data_dir).iterdir() if p.is_dir()):
+        if label_dir.name not in LABEL_FAMILIES:
+            print(f"Skipping {label_dir.name}/ (not one of: {', '.join(LABEL_FAMILIES)})")
+            continue
+        count = 0
+        for path in sorted(label_dir.rglob("*")):
+            text = load_text(extractor, path) if path.is_file() else ""
+            if len(text.strip()) >= 50:
+                texts.append(text)
+                labels.append(label_dir.name)
+                count += 1
+        print(f"{label_dir.name:26s} {count} document(s)")
+
+    if len(set(labels)) < 2:
+        print("Need labelled documents for at least two types.")
+        sys.exit(1)
+    report = train_model(texts, labels, args.output)
+    print(f"\nSaved {args.output}: {report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Coalescing of concurrent identical requests (single flight).
+
+A double-clicked "Start AI analysis", or a client retrying after its own timeout, sends the
+same document to the worker while the first request is still being processed. Requests with
+the same key join the computation already in flight and all receive its result (or its
+exception) instead of starting another one against the Ollama server.
+
+The computation runs as its own task, so a caller that disconnects or times out does not
+cancel it for the others still waiting.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(*parts: Any) -> str:
+    """Stable key for a request: SHA-256 over the JSON of its parts (bytes are hashed first)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray)):
+            digest.update(hashlib.sha256(part).digest())
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    """Runs at most one computation per key at a time; concurrent callers share its result."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = 0
+        self.joined = 0
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Await the in-flight computation for `key`, starting it with `compute()` if there is none."""
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t, k=key: self._finished(k, t))
+            self.started += 1
+        else:
+            self.joined += 1
+            logger.info("%s: joining in-flight request %s", self.name, key[:12])
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller has given up waiting
+
+    def stats(self) -> Dict[str, Any]:
+        return {"started": self.started, "joined": self.joined, "in_flight": len(self._in_flight)}
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from bank_statement_verifier import _find_document_type, _find_statement_date
+
+TODAY = datetime.today()
+
+
+def test_date_opened_is_not_the_statement_date():
+    text = f"FNB\nAccount Number: 62987654321\nDate opened: 2015-03-01\nDate: {TODAY:%d %B %Y}"
+    assert _find_statement_date(text).date() == TODAY.date()
+
+
+def test_most_recent_labelled_date_wins():
+    text = f"Date: 01 January 2020\nStatement Date: {TODAY:%Y-%m-%d}"
+    assert _find_statement_date(text).date() == TODAY.date()
+
+
+def test_unlabelled_dates_fall_back_to_most_recent():
+    text = f"Date opened: 2015-03-01\nPrinted {TODAY:%d/%m/%Y}"
+    assert _find_statement_date(text).date() == TODAY.date()
+
+
+def test_confirmation_letter_needs_confirmation_wording():
+    letter = "To whom it may concern\nWe hereby confirm that Acme Trading holds a cheque account with us."
+    assert _find_document_type(letter) == "bank_confirmation_letter"
+    assert _find_document_type("Invoice\nPlease confirm receipt of payment.\nAccount: 1234") is None
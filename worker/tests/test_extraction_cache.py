@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+import ocr_extractor
+from config import settings
+from extraction_cache import ExtractionCache
+from ocr_extractor import OCRExtractor
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExtractionCache(str(tmp_path / "cache"), max_bytes=1024 * 1024)
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "document.pdf"
+    path.write_bytes(b"%PDF-1.4 test document")
+    return str(path)
+
+
+def _value(n):
+    return {"text": f"page text {n:04d}"}
+
+
+def test_key_depends_on_content_kind_and_version(cache, document, tmp_path):
+    key = cache.make_key(document, "text", "1")
+    copy = tmp_path / "copy.pdf"
+    copy.write_bytes(open(document, "rb").read())
+    assert cache.make_key(str(copy), "text", "1") == key
+    assert cache.make_key(document, "roi-bank", "1") != key
+    assert cache.make_key(document, "text", "2") != key
+
+    copy.write_bytes(b"%PDF-1.4 other document")
+    assert cache.make_key(str(copy), "text", "1") != key
+
+
+def test_extractor_key_includes_ocr_settings(cache, document, monkeypatch):
+    monkeypatch.setattr(ocr_extractor, "get_extraction_cache", lambda: cache)
+    monkeypatch.setattr(settings, "ocr_dpi", 200, raising=False)
+    calls = []
+
+    def extract():
+        calls.append(1)
+        return {"text": "extracted"}
+
+    extractor = OCRExtractor()
+    extractor._cached(document, "text", extract)
+    extractor._cached(document, "text", extract)
+    assert len(calls) == 1
+
+    monkeypatch.setattr(settings, "ocr_dpi", 300, raising=False)
+    extractor._cached(document, "text", extract)
+    assert len(calls) == 2
+
+
+def test_overwrite_replaces_size(cache):
+    cache.put("a" * 64, _value(1))
+    cache.put("b" * 64, _value(2))
+    size = cache.stats()["size_bytes"]
+    cache.put("a" * 64, _value(3))
+    cache.put("a" * 64, {"text": "a longer page text than before"})
+    assert cache.stats()["size_bytes"] == cache._scan_size()
+    assert cache.stats()["size_bytes"] > size
+    assert cache.get("a" * 64) == {"text": "a longer page text than before"}
+
+
+def test_evicts_least_recently_used_to_90_percent(cache):
+    keys = [f"{n:02d}" * 32 for n in range(6)]
+    for n, key in enumerate(keys[:5]):
+        cache.put(key, _value(n))
+        os.utime(cache._entry_path(key), (n + 1, n + 1))  # entry 0 oldest
+    entry_size = os.path.getsize(cache._entry_path(keys[0]))
+
+    assert cache.get(keys[0]) is not None  # a hit makes entry 0 the most recently used
+    cache.max_bytes = 4 * entry_size
+    cache.put(keys[5], _value(5))
+
+    remaining = [key for key in keys if os.path.exists(cache._entry_path(key))]
+    assert remaining == [keys[0], keys[4], keys[5]]
+    assert cache.stats()["size_bytes"] <= cache.max_bytes * 0.9
+    assert cache.stats()["evictions"] == 3
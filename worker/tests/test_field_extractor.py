@@ -0,0 +1,39 @@
+from field_extractor import get_field_engine
+
+
+def _fields(text, document_type=""):
+    return [(match.field_name, match.value) for match in get_field_engine().extract(text, document_type)]
+
+
+def test_several_labels_on_one_line():
+    fields = _fields("Company Name: ACME (Pty) Ltd   Registration Number: 2019/123456/07")
+    assert ("company_name", "ACME (Pty) Ltd") in fields
+    assert ("registration_number", "2019/123456/07") in fields
+
+
+def test_value_stops_at_next_label_without_gap():
+    fields = _fields("Account Holder: ACME Trading Account Number: 62987654321 Branch Code: 250655", "bank")
+    assert ("account_holder", "ACME Trading") in fields
+    assert ("account_number", "62987654321") in fields
+    assert ("branch_code", "250655") in fields
+
+
+def test_excel_row_cells_are_separate_values():
+    fields = _fields("VAT Number:\t4123456789\tReg No:\t2019/123456/07")
+    assert ("vat_number", "4123456789") in fields
+    assert ("registration_number", "2019/123456/07") in fields
+
+
+def test_nested_label_is_not_duplicated():
+    fields = _fields("Physical Address: 12 Main Rd, Sandton\nEmail: info@acme.co.za")
+    assert fields.count(("address", "12 Main Rd, Sandton")) == 1
+    assert ("email", "info@acme.co.za") in fields
+
+
+def test_words_that_look_like_labels_stay_in_the_value():
+    assert ("company_name", "Smith Address Solutions") in _fields("Company Name: Smith Address Solutions")
+
+
+def test_page_numbers():
+    matches = get_field_engine().extract_pages(["Company Name: ACME", "VAT Number: 4123456789"])
+    assert [(m.field_name, m.page) for m in matches] == [("company_name", 1), ("vat_number", 2)]
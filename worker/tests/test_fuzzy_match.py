@@ -0,0 +1,30 @@
+from fuzzy_match import MATCH, MISMATCH, PARTIAL, match_address, match_company_name
+
+
+def test_legal_suffixes_and_label_are_ignored():
+    result = match_company_name("Acme Trading (Pty) Ltd", "Account Holder: ACME TRADING PROPRIETARY LIMITED")
+    assert result.status == MATCH
+    assert match_company_name("Acme Trading (Pty) Ltd", "ACME TRADING PTY LTD").status == MATCH
+
+
+def test_ocr_slip_still_matches():
+    assert match_company_name("Acme Trading", "ACRNE TRADING CC").status in (MATCH, PARTIAL)
+
+
+def test_extra_words_on_the_candidate_are_not_a_match():
+    assert match_company_name("Acme", "Acme Mining Holdings (Pty) Ltd").status != MATCH
+
+
+def test_names_are_not_matched_across_lines():
+    result = match_company_name("Blue Sky Trading", "Green Sky Trading CC\nBlue Crane")
+    assert result.status != MATCH
+
+
+def test_different_name_is_a_mismatch():
+    assert match_company_name("Acme Trading", "Globex Holdings (Pty) Ltd").status == MISMATCH
+
+
+def test_address_street_number_must_agree():
+    text = "Physical Address:\n12 Main Rd\nSandton\n2196"
+    assert match_address("12 Main Road, Sandton, 2196", text).status == MATCH
+    assert match_address("14 Main Road, Sandton, 2196", text).status != MATCH
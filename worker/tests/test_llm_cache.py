@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+
+import llm_cache
+from config import settings
+from llm_cache import LLMCache, cached_llm_call, llm_cache_bypassed
+from ollama_client import run_in_analysis_executor
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """A fresh cache in tmp_path, installed as the process-wide cache."""
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"), ttl_seconds=3600, max_bytes=1024 * 1024)
+    monkeypatch.setattr(settings, "llm_cache_enabled", True, raising=False)
+    monkeypatch.setattr(llm_cache, "_cache", cache)
+    return cache
+
+
+def _counting_call(response):
+    calls = []
+
+    def call():
+        calls.append(1)
+        return response
+    return call, calls
+
+
+def test_miss_then_hit(cache):
+    call, calls = _counting_call("answer")
+    assert cached_llm_call("model", {"temperature": 0}, "prompt", call) == "answer"
+    assert cached_llm_call("model", {"temperature": 0}, "prompt", call) == "answer"
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    cached_llm_call("model", {"temperature": 0.5}, "prompt", call)
+    cached_llm_call("other-model", {"temperature": 0}, "prompt", call)
+    assert len(calls) == 3
+
+
+def test_empty_response_is_not_cached(cache):
+    call, calls = _counting_call("")
+    cached_llm_call("model", {}, "prompt", call)
+    cached_llm_call("model", {}, "prompt", call)
+    assert len(calls) == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_entry_expires_after_ttl(cache, monkeypatch):
+    key = cache.make_key("model", {}, "prompt")
+    cache.put(key, "model", "answer", elapsed=1.0)
+    assert cache.get(key) == "answer"
+
+    later = time.time() + cache.ttl_seconds + 1
+    monkeypatch.setattr(llm_cache.time, "time", lambda: later)
+    assert cache.get(key) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_bypass_reaches_analysis_executor(cache):
+    call, calls = _counting_call("answer")
+    cached_llm_call("model", {}, "prompt", call)
+
+    async def run():
+        with llm_cache_bypassed():
+            return await run_in_analysis_executor(cached_llm_call, "model", {}, "prompt", call)
+
+    assert asyncio.run(run()) == "answer"
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 0
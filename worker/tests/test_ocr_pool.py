@@ -0,0 +1,61 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ocr_extractor import _bounded_pool_map
+
+
+class _CountingPool:
+    """ThreadPoolExecutor stand-in that records how many submitted tasks are unfinished at once."""
+
+    def __init__(self, workers):
+        self._executor = ThreadPoolExecutor(workers)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.max_pending = 0
+
+    def submit(self, func, *args):
+        with self._lock:
+            self.pending += 1
+            self.max_pending = max(self.max_pending, self.pending)
+        future = self._executor.submit(func, *args)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, _):
+        with self._lock:
+            self.pending -= 1
+
+
+def _slow_square(value, delay):
+    time.sleep(delay)
+    return value * value
+
+
+def test_results_are_in_submission_order():
+    pool = _CountingPool(4)
+    # Later tasks finish first
+    args = [(i, 0.02 * (8 - i)) for i in range(8)]
+    assert _bounded_pool_map(pool, _slow_square, args, threading.BoundedSemaphore(3)) == [i * i for i in range(8)]
+
+
+def test_pending_tasks_never_exceed_slots():
+    pool = _CountingPool(8)
+    _bounded_pool_map(pool, _slow_square, [(i, 0.01) for i in range(20)], threading.BoundedSemaphore(3))
+    assert pool.max_pending <= 3
+
+
+def test_slots_are_shared_between_concurrent_callers():
+    pool = _CountingPool(8)
+    slots = threading.BoundedSemaphore(2)
+    callers = [
+        threading.Thread(target=_bounded_pool_map, args=(pool, _slow_square, [(i, 0.01) for i in range(6)], slots))
+        for _ in range(3)
+    ]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    assert pool.max_pending <= 2
+    # Every slot was given back
+    assert all(slots.acquire(blocking=False) for _ in range(2))
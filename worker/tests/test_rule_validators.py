@@ -0,0 +1,79 @@
+from datetime import datetime
+
+from rule_validators import FAIL, NEEDS_REVIEW, PASS, digit_group_present, validate_bank_confirmation, validate_tax_clearance
+
+TODAY = datetime.today().strftime("%d %B %Y")
+
+
+def _letter(*lines):
+    return "\n".join(["FNB - First National Bank", "Bank Confirmation Letter", f"Date: {TODAY}", *lines])
+
+
+def _check(results, name):
+    return next(result for result in results if result.name == name)
+
+
+def test_digit_group_requires_whole_group():
+    text = "Account Number: 62987654321\nTel: 011 632 1234"
+    assert not digit_group_present("1632123", text)
+    assert not digit_group_present("987654", text)
+    assert not digit_group_present("6321234", text)
+    assert digit_group_present("62987654321", text)
+    assert digit_group_present("0116321234", text)
+    assert digit_group_present("62987654321", "Account 6298 765 4321.")
+
+
+def test_wrong_account_number_fails_despite_digits_elsewhere():
+    text = _letter("Account Number: 62987654321", "Tel: 011 632 1234")
+    results = validate_bank_confirmation(text, {"accountNumber": "1632123"})
+    assert _check(results, "ACCOUNT NUMBER VALIDATION").status == FAIL
+
+
+def test_matching_account_number_passes():
+    text = _letter("Account Number: 62987654321")
+    results = validate_bank_confirmation(text, {"accountNumber": "6298 7654 321"})
+    assert _check(results, "ACCOUNT NUMBER VALIDATION").status == PASS
+
+
+def test_account_number_in_text_must_be_whole_group():
+    text = _letter("We confirm account 62987654321 is held with us.", "Tel: 011 632 1234")
+    assert _check(validate_bank_confirmation(text, {"accountNumber": "62987654321"}), "ACCOUNT NUMBER VALIDATION").status == PASS
+    assert _check(validate_bank_confirmation(text, {"accountNumber": "1632123"}), "ACCOUNT NUMBER VALIDATION").status == FAIL
+
+
+def test_masked_account_number():
+    text = _letter("Account Number: ******4321")
+    assert _check(validate_bank_confirmation(text, {"accountNumber": "62987654321"}), "ACCOUNT NUMBER VALIDATION").status == PASS
+    assert _check(validate_bank_confirmation(text, {"accountNumber": "62987650000"}), "ACCOUNT NUMBER VALIDATION").status == FAIL
+
+
+def test_branch_code_substring_of_other_digits_does_not_pass():
+    text = _letter("Account Number: 62987654321", "Tel: 011 632 1234")
+    results = validate_bank_confirmation(text, {"branchNumber": "987654"})
+    assert _check(results, "BRANCH CODE VALIDATION").status != PASS
+
+
+def test_branch_code_mismatch_fails_but_universal_code_needs_review():
+    text = _letter("Account Number: 62987654321", "Branch Code: 254005")
+    assert _check(validate_bank_confirmation(text, {"branchNumber": "261251"}), "BRANCH CODE VALIDATION").status == FAIL
+    assert _check(validate_bank_confirmation(text, {"branchNumber": "254005"}), "BRANCH CODE VALIDATION").status == PASS
+    universal = _letter("Account Number: 62987654321", "Branch Code: 250655")
+    assert _check(validate_bank_confirmation(universal, {"branchNumber": "254005"}), "BRANCH CODE VALIDATION").status == NEEDS_REVIEW
+
+
+def test_authenticity_is_left_for_review_unless_out_of_date():
+    assert _check(validate_bank_confirmation(_letter("Account Number: 62987654321"), None), "DOCUMENT AUTHENTICITY").status == NEEDS_REVIEW
+    old = "FNB - First National Bank\nDate: 01 January 2020\nAccount Number: 62987654321"
+    assert _check(validate_bank_confirmation(old, None), "DOCUMENT AUTHENTICITY").status == FAIL
+
+
+def test_missing_tax_evidence_needs_review():
+    text = f"Tax Compliance Status\nTaxpayer Name: Acme Trading (Pty) Ltd\nDate: {TODAY}"
+    results = validate_tax_clearance(text, {})
+    assert _check(results, "TAX REFERENCE NUMBER").status == NEEDS_REVIEW
+    assert _check(results, "SARS/GOVERNMENT AUTHENTICITY").status == NEEDS_REVIEW
+
+    text = f"South African Revenue Service\nTax Reference Number: 9123456789\nDate: {TODAY}"
+    results = validate_tax_clearance(text, {})
+    assert _check(results, "TAX REFERENCE NUMBER").status == PASS
+    assert _check(results, "SARS/GOVERNMENT AUTHENTICITY").status == PASS
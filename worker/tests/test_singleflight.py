@@ -0,0 +1,58 @@
+import asyncio
+
+from singleflight import SingleFlight, request_key
+
+
+def test_concurrent_calls_share_one_computation():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(flights.do("key", compute), flights.do("key", compute))
+
+    assert asyncio.run(main()) == ["result", "result"]
+    assert len(calls) == 1
+    assert flights.stats() == {"started": 1, "joined": 1, "in_flight": 0}
+
+
+def test_exception_reaches_every_waiter():
+    flights = SingleFlight("test")
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        raise ValueError("analysis failed")
+
+    async def main():
+        return await asyncio.gather(flights.do("key", compute), flights.do("key", compute), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_waiter_timeout_does_not_cancel_shared_computation():
+    flights = SingleFlight("test")
+
+    async def compute():
+        await asyncio.sleep(0.1)
+        return "result"
+
+    async def main():
+        impatient = asyncio.wait_for(flights.do("key", compute), timeout=0.01)
+        patient = flights.do("key", compute)
+        return await asyncio.gather(impatient, patient, return_exceptions=True)
+
+    impatient, patient = asyncio.run(main())
+    assert isinstance(impatient, asyncio.TimeoutError)
+    assert patient == "result"
+
+
+def test_request_key_is_stable_and_distinguishes_parts():
+    assert request_key("text", {"b": 1, "a": 2}) == request_key("text", {"a": 2, "b": 1})
+    assert request_key("ab", "c") != request_key("a", "bc")
+    assert request_key(b"pdf bytes") != request_key(b"other bytes")